@@ -1,4 +1,28 @@
-def generate_embed_code(live_url):
+import json
+from urllib.parse import quote
+
+
+def generate_embed_code(live_url, api_url=None, namespace=None):
+    """
+    Build the HTML snippet that adds the chatbot to a website.
+
+    Without `api_url` the deployed Streamlit app is embedded in an iframe.
+    With it, the snippet is a self-contained chat widget that streams
+    answers from the headless API (`api.py`), so visitors do not open a
+    Streamlit session.
+
+    Args:
+        live_url (str): URL of the deployed Streamlit app
+        api_url (str): Base URL of the deployed chat API, e.g. https://my-bot-api.onrender.com
+        namespace (str): Site / tenant id whose knowledge base answers (None = default index)
+
+    Returns:
+        str: HTML to paste before </body>
+    """
+    if api_url:
+        return generate_api_widget_code(api_url, namespace)
+    if namespace:
+        live_url += ("&" if "?" in live_url else "?") + "namespace=" + quote(namespace)
     return f"""
 <!-- Xalt Chatbot Integration -->
 <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
@@ -18,3 +42,119 @@ def generate_embed_code(live_url):
 """
 
 
+def generate_api_widget_code(api_url, namespace=None):
+    """
+    Build a chat widget that talks to the chat API directly (POST /chat/stream, server-sent events).
+
+    The visitor's user_id and session_id are kept in localStorage, so the
+    conversation continues across page loads. Answers are inserted as text,
+    never as HTML.
+
+    Args:
+        api_url (str): Base URL of the deployed chat API
+        namespace (str): Site / tenant id whose knowledge base answers (None = default index)
+
+    Returns:
+        str: HTML to paste before </body>
+    """
+    api_url = api_url.rstrip("/")
+    namespace = json.dumps(namespace)
+    return f"""
+<!-- Xalt Chatbot Integration (API widget) -->
+<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
+<style>
+  #chatbot-button {{ position: fixed; bottom: 20px; right: 20px; background-color: #4CAF50; color: white; border: none; border-radius: 50%; padding: 15px; cursor: pointer; z-index: 1000; }}
+  #chatbot-panel {{ display: none; flex-direction: column; position: fixed; bottom: 80px; right: 20px; width: 380px; height: 520px; background: white; border-radius: 12px; z-index: 1000; box-shadow: 0px 0px 10px rgba(0,0,0,0.3); font-family: sans-serif; font-size: 14px; }}
+  #chatbot-log {{ flex: 1; overflow-y: auto; padding: 12px; }}
+  .chatbot-msg {{ margin: 6px 0; padding: 8px 10px; border-radius: 8px; white-space: pre-wrap; }}
+  .chatbot-user {{ background: #e8f5e9; margin-left: 40px; }}
+  .chatbot-bot {{ background: #f1f1f1; margin-right: 40px; }}
+  #chatbot-form {{ display: flex; border-top: 1px solid #ddd; }}
+  #chatbot-input {{ flex: 1; border: none; padding: 12px; outline: none; }}
+  #chatbot-send {{ border: none; background: #4CAF50; color: white; padding: 0 16px; cursor: pointer; }}
+</style>
+<button id="chatbot-button"><i class="fas fa-comment"></i></button>
+<div id="chatbot-panel">
+  <div id="chatbot-log"></div>
+  <form id="chatbot-form">
+    <input id="chatbot-input" placeholder="Ask me anything..." autocomplete="off">
+    <button id="chatbot-send" type="submit"><i class="fas fa-paper-plane"></i></button>
+  </form>
+</div>
+<script>
+(function () {{
+  const API = "{api_url}";
+  const NAMESPACE = {namespace};
+  const panel = document.getElementById('chatbot-panel');
+  const log = document.getElementById('chatbot-log');
+  const form = document.getElementById('chatbot-form');
+  const input = document.getElementById('chatbot-input');
+  const ids = JSON.parse(localStorage.getItem('chatbot-ids') || '{{}}');
+
+  document.getElementById('chatbot-button').addEventListener('click', () => {{
+    panel.style.display = panel.style.display === 'flex' ? 'none' : 'flex';
+  }});
+
+  function addMessage(text, cls) {{
+    const el = document.createElement('div');
+    el.className = 'chatbot-msg ' + cls;
+    el.textContent = text;
+    log.appendChild(el);
+    log.scrollTop = log.scrollHeight;
+    return el;
+  }}
+
+  function handleEvent(raw, bubble) {{
+    let event = 'message', data = '';
+    for (const line of raw.split('\\n')) {{
+      if (line.startsWith('event:')) event = line.slice(6).trim();
+      else if (line.startsWith('data:')) data += line.slice(5).trim();
+    }}
+    if (!data) return;
+    const payload = JSON.parse(data);
+    if (event === 'meta') {{
+      ids.session_id = payload.session_id;
+      ids.user_id = payload.user_id;
+      localStorage.setItem('chatbot-ids', JSON.stringify(ids));
+    }} else if (event === 'message') {{
+      bubble.textContent += payload.text;
+      log.scrollTop = log.scrollHeight;
+    }} else if (event === 'error') {{
+      bubble.textContent = payload.error;
+    }}
+  }}
+
+  form.addEventListener('submit', async (e) => {{
+    e.preventDefault();
+    const query = input.value.trim();
+    if (!query) return;
+    input.value = '';
+    addMessage(query, 'chatbot-user');
+    const bubble = addMessage('', 'chatbot-bot');
+    try {{
+      const res = await fetch(API + '/chat/stream', {{
+        method: 'POST',
+        headers: {{ 'Content-Type': 'application/json' }},
+        body: JSON.stringify({{ query: query, session_id: ids.session_id, user_id: ids.user_id, namespace: NAMESPACE }}),
+      }});
+      if (!res.ok) throw new Error('HTTP ' + res.status);
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {{
+        const {{ done, value }} = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, {{ stream: true }});
+        let end;
+        while ((end = buffer.indexOf('\\n\\n')) !== -1) {{
+          handleEvent(buffer.slice(0, end), bubble);
+          buffer = buffer.slice(end + 2);
+        }}
+      }}
+    }} catch (err) {{
+      bubble.textContent = 'Sorry, the assistant is unavailable right now.';
+    }}
+  }});
+}})();
+</script>
+"""
@@ -1,24 +1,37 @@
+import os
 import time
 from dotenv import load_dotenv
 from utils.github_utils import create_github_repo, commit_and_push_changes
+from utils.deploy_package import timed_phase, format_timings
 
 load_dotenv()
 
 class DeploymentAgent:
-    def __init__(self):
+    def __init__(self, repo_name=None, github_repo_url=None):
+        # Redeploying to an existing repo (DEPLOY_REPO_URL) keeps its staging
+        # directory, so only files changed since the last deploy are pushed
         ts = int(time.time())
-        self.repo_name = f"xalt-chatbot-repo-{ts}"
-        self.github_repo_url = None
+        self.github_repo_url = github_repo_url or os.getenv("DEPLOY_REPO_URL")
+        self.repo_name = repo_name or os.getenv("DEPLOY_REPO_NAME") or f"xalt-chatbot-repo-{ts}"
+        self.timings = {}
+        self.push_result = None
 
     def deploy_now(self) -> str:
+        self.timings = {}
+
         # 1️⃣ Create GitHub repo
-        print("[1/2] Creating GitHub repository…")
-        self.github_repo_url = create_github_repo(self.repo_name)
-        print(f"[✅] GitHub repo created: {self.github_repo_url}")
+        if self.github_repo_url:
+            print(f"[1/2] Redeploying to {self.github_repo_url}")
+        else:
+            print("[1/2] Creating GitHub repository…")
+            with timed_phase(self.timings, "create_repo"):
+                self.github_repo_url = create_github_repo(self.repo_name)
+            print(f"[✅] GitHub repo created: {self.github_repo_url}")
 
-        # 2️⃣ Push code
+        # 2️⃣ Push changed files
         print("[2/2] Pushing project files to GitHub…")
-        commit_and_push_changes(self.github_repo_url, self.repo_name)
-        print("[✅] Code pushed to GitHub")
+        self.push_result = commit_and_push_changes(self.github_repo_url, self.repo_name)
+        self.timings.update(self.push_result["timings"])
+        print(f"[⏱️] Deploy phases: {format_timings(self.timings)}")
 
         return self.github_repo_url
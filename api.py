@@ -0,0 +1,224 @@
+# api.py
+#
+# Headless chat API for the embed widget: JSON and server-sent-events
+# endpoints on top of the same pipeline as frontend.py, without a Streamlit
+# session per visitor.
+#
+#   python api.py                                   # API_WORKERS processes on $PORT
+#   uvicorn api:app --workers 4 --port 8000         # same, through uvicorn directly
+#
+# Workers are picked per connection, not per session. Each keeps a buffer of
+# recent turns, checked against MongoDB before use (HISTORY_BUFFER_VERIFY), so
+# any worker can serve any conversation.
+
+import os
+import json
+import uuid
+import asyncio
+import tempfile
+from contextlib import asynccontextmanager, aclosing
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from rag_pipeline import aget_rag_response, astream_rag_response, get_index_registry, warm_up, WARM_UP
+from utils.index_registry import validate_namespace
+from utils.metrics import render_workers, start_metrics_dump
+
+load_dotenv()
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("PORT", os.getenv("API_PORT", "8000")))  # Render sets PORT
+API_WORKERS = int(os.getenv("API_WORKERS", str(os.cpu_count() or 1)))
+API_CORS_ORIGINS = [o.strip() for o in os.getenv("API_CORS_ORIGINS", "*").split(",") if o.strip()]
+API_MAX_QUERY_CHARS = int(os.getenv("API_MAX_QUERY_CHARS", "2000"))
+
+
+class BadRequest(Exception):
+    pass
+
+
+async def _read_turn(request) -> tuple:
+    """
+    Read query, session_id, user_id and namespace from a JSON body (POST) or the query string (GET).
+
+    Missing ids are generated; the client keeps the returned ones for the next turn.
+
+    Returns:
+        tuple: (query, session_id, user_id, namespace)
+    """
+    if request.method == "POST":
+        try:
+            payload = await request.json()
+        except ValueError:
+            raise BadRequest("Body must be JSON")
+        if not isinstance(payload, dict):
+            raise BadRequest("Body must be a JSON object")
+    else:
+        payload = dict(request.query_params)
+
+    query = str(payload.get("query") or "").strip()
+    if not query:
+        raise BadRequest("'query' is required")
+    if len(query) > API_MAX_QUERY_CHARS:
+        raise BadRequest(f"'query' is longer than {API_MAX_QUERY_CHARS} characters")
+    session_id = str(payload.get("session_id") or uuid.uuid4())
+    user_id = str(payload.get("user_id") or uuid.uuid4())
+    try:
+        namespace = validate_namespace(payload.get("namespace"))
+    except ValueError as e:
+        raise BadRequest(str(e))
+    return query, session_id, user_id, namespace
+
+
+def _sources(docs) -> list:
+    """Distinct source file names of the retrieved chunks, in retrieval order (no server paths)."""
+    sources = []
+    for doc in docs:
+        source = os.path.basename(str(doc.metadata.get("source") or ""))
+        if source and source not in sources:
+            sources.append(source)
+    return sources
+
+
+def _sse(data, event=None) -> str:
+    """Format one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+async def chat(request):
+    """POST /chat: the whole answer as one JSON response."""
+    try:
+        query, session_id, user_id, namespace = await _read_turn(request)
+    except BadRequest as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    try:
+        answer, docs = await aget_rag_response(query, session_id, user_id, namespace)
+    except FileNotFoundError:
+        return JSONResponse({"error": f"No knowledge base for namespace '{namespace}'"}, status_code=404)
+    except Exception as e:
+        print(f"[❌] Chat failed for session {session_id}: {e}")
+        return JSONResponse({"error": "The assistant could not answer right now."}, status_code=500)
+    return JSONResponse({
+        "answer": answer,
+        "session_id": session_id,
+        "user_id": user_id,
+        "sources": _sources(docs),
+    })
+
+
+async def chat_stream(request):
+    """
+    GET or POST /chat/stream: the answer as server-sent events.
+
+    Events: `meta` (session_id, user_id), then one unnamed event per text
+    fragment ({"text": ...}), then `done` (timings, sources) or `error`.
+    """
+    try:
+        query, session_id, user_id, namespace = await _read_turn(request)
+    except BadRequest as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    async def events():
+        yield _sse({"session_id": session_id, "user_id": user_id}, event="meta")
+        metrics = {}
+        try:
+            # Closed with this generator, so a disconnect stores the partial answer right away
+            async with aclosing(astream_rag_response(
+                query, session_id, user_id, metrics=metrics, namespace=namespace
+            )) as tokens:
+                async for token in tokens:
+                    yield _sse({"text": token})
+        except FileNotFoundError:
+            yield _sse({"error": f"No knowledge base for namespace '{namespace}'"}, event="error")
+            return
+        except Exception as e:
+            print(f"[❌] Streaming failed for session {session_id}: {e}")
+            yield _sse({"error": "The assistant could not answer right now."}, event="error")
+            return
+        yield _sse({
+            "ttft": round(metrics.get("ttft", metrics.get("total", 0)), 3),
+            "total": round(metrics.get("total", 0), 3),
+            "sources": _sources(metrics.get("docs", [])),
+        }, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def clear(request):
+    """POST /chat/clear: forget a session's history and summary."""
+    from utils.mongo_utils import clear_chat
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict) or not payload.get("session_id") or not payload.get("user_id"):
+        return JSONResponse({"error": "'session_id' and 'user_id' are required"}, status_code=400)
+    await asyncio.to_thread(clear_chat, str(payload["user_id"]), str(payload["session_id"]))
+    return JSONResponse({"cleared": True})
+
+
+async def health(request):
+    """GET /health: liveness, the default index version and the open-index cache of this worker."""
+    registry = get_index_registry()
+    return JSONResponse({"status": "ok", "index_version": registry.version(), "indexes": registry.stats()})
+
+
+async def metrics(request):
+    """GET /metrics: Prometheus metrics summed over the workers sharing METRICS_DIR."""
+    body = await asyncio.to_thread(render_workers)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Each worker loads its models, index and connection pools before it
+    # accepts requests; the index files are memory-mapped (FAISS_MMAP=1), so
+    # workers share one copy of them in the OS page cache.
+    if WARM_UP:
+        await asyncio.to_thread(warm_up)
+    start_metrics_dump()
+    yield
+    get_index_registry().close()
+
+
+app = Starlette(
+    routes=[
+        Route("/chat", chat, methods=["POST"]),
+        Route("/chat/stream", chat_stream, methods=["GET", "POST"]),
+        Route("/chat/clear", clear, methods=["POST"]),
+        Route("/health", health, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ],
+    middleware=[
+        Middleware(
+            CORSMiddleware,
+            allow_origins=API_CORS_ORIGINS,
+            allow_methods=["GET", "POST"],
+            allow_headers=["Content-Type"],
+        ),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    from utils.mongo_utils import HISTORY_BUFFER_VERIFY
+
+    if API_WORKERS > 1 and not os.getenv("METRICS_DIR"):
+        # Workers are spawned after this and inherit it, so any of them can answer a scrape for all
+        os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="rag-metrics-")
+    if API_WORKERS > 1 and not HISTORY_BUFFER_VERIFY:
+        print(f"[⚠️] API_WORKERS={API_WORKERS} with HISTORY_BUFFER_VERIFY=0: a worker can serve "
+              "a conversation without the turns other workers added.")
+
+    uvicorn.run("api:app", host=API_HOST, port=API_PORT, workers=API_WORKERS)
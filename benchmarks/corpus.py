@@ -0,0 +1,59 @@
+# benchmarks/corpus.py
+
+import random
+import numpy as np
+
+# Small fixed vocabulary plus rare identifier-like terms, so keyword search
+# sees both common words and exact-match tokens (SKUs, error codes)
+_VOCAB = (
+    "account billing invoice refund plan upgrade downgrade team member role permission project "
+    "workspace export import report dashboard chart filter schedule backup restore region storage "
+    "limit quota error retry timeout upload download file folder share link password login token "
+    "api key webhook integration notification email support ticket priority response time policy"
+).split()
+
+
+def synthetic_texts(n, words=40, seed=0):
+    """
+    Deterministic chunk texts for a corpus of `n` chunks.
+
+    Every 50th chunk mentions a unique SKU (`SKU-<i>`) so exact-term queries
+    have a single right answer.
+    """
+    rng = random.Random(seed)
+    texts = []
+    for i in range(n):
+        body = " ".join(rng.choice(_VOCAB) for _ in range(words))
+        if i % 50 == 0:
+            body = f"SKU-{i:07d} {body}"
+        texts.append(f"Doc {i}: {body}.")
+    return texts
+
+
+def synthetic_vectors(n, dim, seed=0, batch=100000):
+    """Random unit vectors for `n` chunks, generated in batches to bound peak memory."""
+    rng = np.random.default_rng(seed)
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, batch):
+        block = rng.standard_normal((min(batch, n - start), dim)).astype(np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        out[start:start + len(block)] = block
+    return out
+
+
+def synthetic_queries(n, seed=1, exact_every=0, corpus_size=0):
+    """
+    Query strings for the latency benchmark.
+
+    With `exact_every` > 0, every `exact_every`-th query asks for a SKU from
+    the corpus (hits the keyword fast path); the rest are free text.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for i in range(n):
+        if exact_every and corpus_size and i % exact_every == 0:
+            sku = rng.randrange(0, corpus_size, 50)
+            queries.append(f"What do we know about SKU-{sku:07d}?")
+        else:
+            queries.append("How do I " + " ".join(rng.choice(_VOCAB) for _ in range(6)) + f" #{i}?")
+    return queries
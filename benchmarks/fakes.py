@@ -0,0 +1,325 @@
+# benchmarks/fakes.py
+#
+# Offline test doubles for the benchmarks and tests (never imported by the app).
+
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from types import SimpleNamespace
+import numpy as np
+from pymongo.errors import DuplicateKeyError
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeRateLimitError(Exception):
+    """Stand-in for an HTTP 429 from the embedding API."""
+    status_code = 429
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic, offline stand-in for CohereEmbeddings.
+
+    Vectors are derived from a hash of the text, so the same text always gets
+    the same unit vector. `latency` simulates the network round-trip per call
+    and `rate_limit_rate` makes that fraction of calls fail with a 429.
+    """
+
+    symmetric_queries = True
+
+    def __init__(self, dim=64, latency=0.0, rate_limit_rate=0.0, seed=0):
+        self.dim = dim
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.calls = 0
+        self.texts_embedded = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _vector(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        rng = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+        vector = rng.standard_normal(self.dim).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def _start_call(self):
+        with self._lock:
+            self.calls += 1
+            return self._random.random() < self.rate_limit_rate
+
+    def _finish_call(self, texts, limited):
+        if limited:
+            raise FakeRateLimitError("429 Too Many Requests (simulated)")
+        with self._lock:
+            self.texts_embedded += len(texts)
+        return [self._vector(t) for t in texts]
+
+    def _call(self, texts):
+        limited = self._start_call()
+        if self.latency:
+            time.sleep(self.latency)
+        return self._finish_call(texts, limited)
+
+    async def _acall(self, texts):
+        # Awaiting (not sleeping a thread) like a real network client would
+        limited = self._start_call()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._finish_call(texts, limited)
+
+    def embed_documents(self, texts: list) -> list:
+        return self._call(texts)
+
+    def embed_query(self, text: str) -> list:
+        return self._call([text])[0]
+
+    async def aembed_documents(self, texts: list) -> list:
+        return await self._acall(texts)
+
+    async def aembed_query(self, text: str) -> list:
+        return (await self._acall([text]))[0]
+
+
+_WORDS = (
+    "the answer depends on your plan settings account billing export import report user team project "
+    "limit error retry upload invoice refund support region storage backup restore schedule api key"
+).split()
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic, offline stand-in for ChatCohere.
+
+    Replies with `answer_tokens` words derived from a hash of the prompt.
+    `latency` is the time to the first token and `token_latency` the gap
+    between tokens, for both `invoke` and streaming.
+    """
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+    answer_tokens: int = 40
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _tokens(self, messages):
+        digest = hashlib.sha256(str(messages[-1].content).encode("utf-8")).digest()
+        rng = random.Random(digest)
+        return [rng.choice(_WORDS) + " " for _ in range(self.answer_tokens)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        time.sleep(self.latency + self.token_latency * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.latency + self.token_latency * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        for i, token in enumerate(self._tokens(messages)):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+def _matches(doc, query):
+    return all(_match_value(doc.get(k), v) for k, v in (query or {}).items())
+
+
+def _match_value(value, condition):
+    if isinstance(condition, dict) and "$gt" in condition:
+        return value is not None and value > condition["$gt"]
+    return value == condition
+
+
+def _project(doc, projection):
+    if not projection:
+        return dict(doc)
+    return {k: doc[k] for k, keep in projection.items() if keep and k in doc}
+
+
+class FakeCursor:
+    """Result of `FakeCollection.find`; supports sort/limit and motor's `to_list`."""
+
+    def __init__(self, docs, projection):
+        self._docs = docs
+        self._projection = projection
+        self._limit = 0
+
+    def sort(self, key, direction=1):
+        self._docs.sort(key=lambda d: d.get(key), reverse=direction == -1)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def __iter__(self):
+        docs = self._docs[:self._limit] if self._limit else self._docs
+        return (_project(d, self._projection) for d in docs)
+
+    async def to_list(self, length=None):
+        return list(self)[:length] if length else list(self)
+
+
+class FakeCollection:
+    """
+    In-memory stand-in for the pymongo collection calls the app makes
+    (find/find_one, bulk_write of UpdateOne upserts, update_one,
+    delete_one/delete_many, create_index). Unique indexes are enforced; `latency`
+    simulates the round-trip of every call.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.docs = []
+        self._unique = []
+        self._lock = threading.RLock()
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def create_index(self, keys, unique=False, **kwargs):
+        fields = [keys] if isinstance(keys, str) else [k for k, _ in keys]
+        if unique:
+            self._unique.append((fields, kwargs.get("sparse", False)))
+        return kwargs.get("name") or "_".join(fields)
+
+    def _check_unique(self, doc):
+        for fields, sparse in self._unique:
+            if sparse and any(f not in doc for f in fields):
+                continue
+            key = {f: doc.get(f) for f in fields}
+            if any(_matches(other, key) for other in self.docs if other is not doc):
+                raise DuplicateKeyError(f"duplicate key {key}")
+
+    def _update(self, query, update, upsert):
+        matched = next((d for d in self.docs if _matches(d, query)), None)
+        if matched is not None:
+            doc = dict(matched)
+            doc.update(update.get("$set", {}))
+            for k, v in update.get("$inc", {}).items():
+                doc[k] = doc.get(k, 0) + v
+            self._check_unique(doc)
+            matched.clear()
+            matched.update(doc)
+            return SimpleNamespace(matched_count=1, upserted_id=None)
+        if not upsert:
+            return SimpleNamespace(matched_count=0, upserted_id=None)
+        doc = {k: v for k, v in query.items() if not isinstance(v, dict)}
+        doc.update(update.get("$setOnInsert", {}))
+        doc.update(update.get("$set", {}))
+        doc.update(update.get("$inc", {}))
+        doc["_id"] = len(self.docs) + 1
+        self._check_unique(doc)
+        self.docs.append(doc)
+        return SimpleNamespace(matched_count=0, upserted_id=doc["_id"])
+
+    def find(self, query=None, projection=None):
+        self._wait()
+        with self._lock:
+            return FakeCursor([d for d in self.docs if _matches(d, query)], projection)
+
+    def find_one(self, query=None, projection=None, sort=None):
+        cursor = self.find(query, projection)
+        for key, direction in sort or []:
+            cursor.sort(key, direction)
+        return next(iter(cursor.limit(1)), None)
+
+    def update_one(self, query, update, upsert=False):
+        self._wait()
+        with self._lock:
+            return self._update(query, update, upsert)
+
+    def bulk_write(self, requests, ordered=True):
+        self._wait()
+        with self._lock:
+            for op in requests:
+                # pymongo.UpdateOne keeps its arguments in these attributes
+                self._update(op._filter, op._doc, op._upsert)
+
+    def delete_many(self, query):
+        self._wait()
+        with self._lock:
+            before = len(self.docs)
+            self.docs = [d for d in self.docs if not _matches(d, query)]
+            return SimpleNamespace(deleted_count=before - len(self.docs))
+
+    def delete_one(self, query):
+        self._wait()
+        with self._lock:
+            return self._delete_one(query)
+
+    def _delete_one(self, query):
+        matched = next((d for d in self.docs if _matches(d, query)), None)
+        if matched is None:
+            return SimpleNamespace(deleted_count=0)
+        self.docs = [d for d in self.docs if d is not matched]
+        return SimpleNamespace(deleted_count=1)
+
+    def count_documents(self, query):
+        with self._lock:
+            return sum(1 for d in self.docs if _matches(d, query))
+
+
+class FakeAsyncCollection:
+    """motor-style async view of a `FakeCollection` (shares its documents)."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def _wait(self):
+        if self._collection.latency:
+            await asyncio.sleep(self._collection.latency)
+
+    def find(self, query=None, projection=None):
+        with self._collection._lock:
+            return FakeCursor([d for d in self._collection.docs if _matches(d, query)], projection)
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        await self._wait()
+        cursor = self.find(query, projection)
+        for key, direction in sort or []:
+            cursor.sort(key, direction)
+        return next(iter(cursor.limit(1)), None)
+
+    async def update_one(self, query, update, upsert=False):
+        await self._wait()
+        with self._collection._lock:
+            return self._collection._update(query, update, upsert)
+
+    async def delete_one(self, query):
+        await self._wait()
+        with self._collection._lock:
+            return self._collection._delete_one(query)
+
+    async def bulk_write(self, requests, ordered=True):
+        await self._wait()
+        with self._collection._lock:
+            for op in requests:
+                self._collection._update(op._filter, op._doc, op._upsert)
+
+
+def install_fake_mongo(latency=0.0):
+    """
+    Point utils.mongo_utils (sync and async paths) at in-memory collections.
+
+    Returns:
+        dict: collection name -> FakeCollection
+    """
+    import utils.mongo_utils as mongo_utils
+
+    collections = {"chat_history": FakeCollection(latency), "chat_summaries": FakeCollection(latency)}
+    mongo_utils.get_collection = lambda name="chat_history": collections[name]
+    mongo_utils.get_async_collection = lambda name="chat_history": FakeAsyncCollection(collections[name])
+    return collections
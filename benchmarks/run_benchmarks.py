@@ -0,0 +1,323 @@
+# benchmarks/run_benchmarks.py
+"""
+Offline, reproducible benchmarks for the RAG pipeline and ingestion.
+
+Cohere (embeddings + chat) and MongoDB are replaced by deterministic local
+fakes with configurable latency, so runs need no network and no API keys.
+For each corpus size the suite ingests a synthetic .txt corpus through
+`vector_database.build_or_update_vector_db` (full build, one-file update
+and no-op rerun, with per-stage timings), then reports index load time and
+memory and per-turn latency percentiles under concurrent sessions, as one
+JSON document.
+
+Usage:
+    python -m benchmarks.run_benchmarks --sizes 1000,10000,100000,1000000 --sessions 16 --turns 5 --out bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import contextlib
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+
+# Offline defaults; must be set before the app modules read their env vars
+os.environ.setdefault("COHERE_API_KEY", "offline-benchmark")
+os.environ.setdefault("ANSWER_CACHE_POLICY", "off")
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("INDEX_POLL_INTERVAL", "0")
+
+from benchmarks.corpus import synthetic_texts, synthetic_vectors, synthetic_queries  # noqa: E402
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def dir_size_mb(path) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total / (1024 * 1024)
+
+
+def percentiles_ms(samples) -> dict:
+    if not samples:
+        return {}
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {"p50_ms": round(p50, 2), "p95_ms": round(p95, 2), "p99_ms": round(p99, 2),
+            "mean_ms": round(float(np.mean(samples)) * 1000, 2), "n": len(samples)}
+
+
+def model_id_for(dim) -> str:
+    return f"fake/hash-{dim}"
+
+
+def stage_deltas(before, after) -> dict:
+    """Count and mean duration of each pipeline stage between two `stage_seconds` snapshots."""
+    stages = {}
+    for key, series in after.items():
+        prev = before.get(key, {"sum": 0.0, "count": 0})
+        count = series["count"] - prev["count"]
+        if count:
+            stages[dict(key)["stage"]] = {
+                "count": count, "mean_ms": round((series["sum"] - prev["sum"]) / count * 1000, 3)
+            }
+    return stages
+
+
+def write_corpus(txt_dir, texts, per_file):
+    """Write the chunk texts as .txt files of `per_file` paragraphs each; returns the file paths."""
+    os.makedirs(txt_dir, exist_ok=True)
+    paths = []
+    for n, i in enumerate(range(0, len(texts), per_file)):
+        path = os.path.join(txt_dir, f"part-{n:05d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n\n".join(texts[i:i + per_file]))
+        paths.append(path)
+    return paths
+
+
+# (1) + (2) Ingestion through vector_database.build_or_update_vector_db: chunking,
+# manifest diff, batched embedding into the embedding store, index build/update and save
+def bench_build(path, size, args):
+    import vector_database as vd
+    from benchmarks.fakes import FakeEmbeddings
+    from utils.ingest_manifest import load_manifest
+    from utils.metrics import stage_seconds
+
+    work = tempfile.mkdtemp(prefix="bench-build-")
+    try:
+        txt_dir = os.path.join(work, "txt")
+        files = write_corpus(txt_dir, synthetic_texts(size, words=args.chunk_words), args.file_chunks)
+        vd.FAISS_DB_PATH = path
+        vd.EMBEDDING_STORE_PATH = os.path.join(work, "embeddings")
+        vd.EMBEDDING_MODEL_NAME = model_id_for(args.dim)
+        vd.FAISS_INDEX_TYPE = args.index_type
+        vd.EMBED_BATCH_SIZE = args.batch_size
+        vd.EMBED_CONCURRENCY = args.concurrency
+        backend = FakeEmbeddings(dim=args.dim, latency=args.embed_latency)
+
+        def build():
+            before = stage_seconds.snapshot()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(sys.stderr):  # keep stdout for the JSON results
+                ok = vd.build_or_update_vector_db(txt_dir, backend=backend)
+            elapsed = time.perf_counter() - start
+            if not ok:
+                raise RuntimeError(f"build_or_update_vector_db failed for {size} chunks")
+            chunks = sum(len(ids) for ids in load_manifest(path)["sources"].values())
+            return {"chunks": chunks, "elapsed_sec": round(elapsed, 3),
+                    "chunks_per_sec": round(chunks / elapsed, 1) if elapsed else 0.0,
+                    "stages": stage_deltas(before, stage_seconds.snapshot())}
+
+        # Full build, then an edit to one file (incremental update), then a run with no changes
+        result = {"full": build()}
+        with open(files[0], "a", encoding="utf-8") as f:
+            f.write("\n\n" + synthetic_texts(1, words=args.chunk_words, seed=99)[0])
+        result["update"] = build()
+        result["noop"] = build()
+        result["index_type"] = args.index_type
+        result["disk_mb"] = round(dir_size_mb(path), 1)
+        return result
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+# (3) Cold index load in a fresh process, so memory is not mixed with the corpus held here
+def probe_load(path, dim):
+    from benchmarks.fakes import FakeEmbeddings
+    from utils.vectorstore_utils import load_vectorstore
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    faiss_db = load_vectorstore(path, FakeEmbeddings(dim=dim), mmap=True, embedding_model=model_id_for(dim))
+    load_sec = time.perf_counter() - start
+    rss_loaded = rss_mb()
+
+    start = time.perf_counter()
+    faiss_db.similarity_search_with_score_by_vector(synthetic_vectors(1, dim, seed=7)[0].tolist(), k=12)
+    first_query_sec = time.perf_counter() - start
+    return {"load_sec": round(load_sec, 4), "first_query_sec": round(first_query_sec, 4),
+            "rss_before_mb": round(rss_before, 1), "rss_after_load_mb": round(rss_loaded, 1),
+            "rss_after_query_mb": round(rss_mb(), 1)}
+
+
+def measure_load(path, dim):
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run_benchmarks", "--probe-load", path, "--dim", str(dim)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# (4) Per-turn latency with N concurrent sessions through aget_rag_response
+def bench_queries(path, corpus_size, args, batching=False):
+    import rag_pipeline as rp
+    from utils.async_utils import run_sync
+    from utils.embedding_cache import CachedEmbeddings
+    from benchmarks.fakes import FakeEmbeddings, FakeChatModel, install_fake_mongo
+    from utils.index_registry import IndexRegistry
+    from utils.metrics import stage_seconds
+
+    install_fake_mongo(latency=args.mongo_latency)
+    embeddings = FakeEmbeddings(dim=args.dim, latency=args.embed_latency)
+    rp.get_embedding_model.override(CachedEmbeddings(embeddings, model_name=model_id_for(args.dim)))
+    rp.EMBEDDING_MODEL_NAME = model_id_for(args.dim)
+    rp.FAISS_DB_PATH = path
+    rp.get_index_registry.override(IndexRegistry(path, rp.load_faiss_db, poll_interval=0))
+    rp.get_llm.override(FakeChatModel(latency=args.llm_latency, token_latency=args.token_latency))
+    rp.get_chain.reset()  # rebuilt on the fake LLM
+    rp.QUERY_BATCHING = batching
+    rp.get_query_batcher.reset()  # rebuilt on this run's embedding model
+    rp.answer_cache.clear()  # earlier runs must not answer this one's queries
+
+    total_turns = args.sessions * args.turns
+    queries = synthetic_queries(total_turns, exact_every=args.exact_every, corpus_size=corpus_size)
+    run_id = uuid.uuid4().hex[:8]
+    latencies = []
+
+    async def session(s):
+        for t in range(args.turns):
+            query = queries[s * args.turns + t]
+            start = time.perf_counter()
+            await rp.aget_rag_response(query, f"{run_id}-s{s}", "bench-user")
+            latencies.append(time.perf_counter() - start)
+
+    async def main():
+        await rp.aget_rag_response("warm up", f"{run_id}-warmup", "bench-user")  # loads the index
+        before = stage_seconds.snapshot()
+        start = time.perf_counter()
+        await asyncio.gather(*(session(s) for s in range(args.sessions)))
+        elapsed = time.perf_counter() - start
+        # Let background persistence / summary tasks finish before the next size
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        await asyncio.gather(*pending, return_exceptions=True)
+        return elapsed, before, stage_seconds.snapshot()
+
+    embed_calls_before = embeddings.calls
+    with contextlib.redirect_stdout(sys.stderr):  # the pipeline's logs must not mix with the JSON results
+        elapsed, before, after = run_sync(main())
+        rp.get_index_registry().close()
+
+    stages = stage_deltas(before, after)
+    result = {"sessions": args.sessions, "turns": total_turns, "elapsed_sec": round(elapsed, 3),
+              "turns_per_sec": round(total_turns / elapsed, 1), "latency": percentiles_ms(latencies),
+              "embed_calls": embeddings.calls - embed_calls_before, "stages": stages}
+    if batching:
+        result["batcher"] = rp.get_query_batcher().stats()
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    results = {
+        "meta": {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("out", "probe_load")},
+        },
+        "runs": [],
+    }
+    for size in args.sizes:
+        print(f"[🏁] Corpus of {size} chunks", file=sys.stderr)
+        run_result = {"corpus_size": size}
+
+        path = tempfile.mkdtemp(prefix="bench-vectorstore-")
+        try:
+            run_result["build"] = bench_build(path, size, args)
+            run_result["load"] = measure_load(path, args.dim)
+            if args.query_batching in ("off", "both"):
+                run_result["query"] = bench_queries(path, size, args)
+            if args.query_batching in ("on", "both"):
+                run_result["query_batched"] = bench_queries(path, size, args, batching=True)
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+        for name in ("query", "query_batched"):
+            if name not in run_result:
+                continue
+            query = run_result[name]["latency"]
+            print(f"[✅] {size} chunks ({name}): ingest {run_result['build']['full']['chunks_per_sec']} chunks/s · "
+                  f"load {run_result['load']['load_sec']}s · {run_result[name]['turns_per_sec']} turns/s · "
+                  f"p50 {query['p50_ms']}ms · p95 {query['p95_ms']}ms · p99 {query['p99_ms']}ms", file=sys.stderr)
+        if "query" in run_result and "query_batched" in run_result:
+            gain = run_result["query_batched"]["turns_per_sec"] / run_result["query"]["turns_per_sec"]
+            run_result["query_batching_speedup"] = round(gain, 2)
+            print(f"[📊] Query batching: {gain:.2f}x turns/s · "
+                  f"batcher {run_result['query_batched']['batcher']}", file=sys.stderr)
+        results["runs"].append(run_result)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline RAG latency and ingestion benchmarks")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000",
+                        type=lambda s: [int(float(x)) for x in s.split(",")],
+                        help="Corpus sizes in chunks, comma separated (up to 1e6)")
+    parser.add_argument("--dim", type=int, default=1024, help="Embedding dimension (Cohere v3: 1024)")
+    parser.add_argument("--index-type", default="flat", help="FAISS index type (see utils.faiss_index)")
+    parser.add_argument("--chunk-words", type=int, default=110,
+                        help="Words per synthetic paragraph (110 keeps one paragraph per 1000-char chunk)")
+    parser.add_argument("--file-chunks", type=int, default=1000, help="Paragraphs per source .txt file")
+    parser.add_argument("--sessions", type=int, default=16, help="Concurrent simulated sessions")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per session")
+    parser.add_argument("--exact-every", type=int, default=0,
+                        help="Every Nth query asks for a SKU (keyword fast path); 0 = never")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Simulated embedding call latency (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Simulated LLM time to first token (s)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Simulated LLM gap between tokens (s)")
+    parser.add_argument("--mongo-latency", type=float, default=0.002, help="Simulated MongoDB round-trip (s)")
+    parser.add_argument("--batch-size", type=int, default=96, help="Ingestion embedding batch size")
+    parser.add_argument("--concurrency", type=int, default=4, help="Ingestion requests in flight")
+    parser.add_argument("--query-batching", choices=("off", "on", "both"), default="off",
+                        help="Run the query benchmark without / with cross-session batching, or both")
+    parser.add_argument("--out", help="Write the JSON results here (default: stdout)")
+    parser.add_argument("--probe-load", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.probe_load:
+        print(json.dumps(probe_load(args.probe_load, args.dim)))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory(prefix="bench-cache-") as cache_dir:
+        os.environ.setdefault("EMBEDDING_CACHE_PATH", os.path.join(cache_dir, "query_embeddings.sqlite"))
+        results = run(args)
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"[📦] Results written to {args.out}", file=sys.stderr)
+    else:
+        print(output)
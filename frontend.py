@@ -1,17 +1,35 @@
+import threading
+from contextlib import closing
 import streamlit as st
-from rag_pipeline import get_rag_response
-from utils.mongo_utils import store_chat, clear_chat
+from rag_pipeline import stream_rag_response, warm_up, WARM_UP
+from utils.mongo_utils import clear_chat
 from utils.session_utils import init_user_session, get_user_and_session
 
 # ------------------------ Streamlit Page Config ------------------------ #
 st.set_page_config(page_title="Chatbot", page_icon="🤖")
 st.title("🤖 AI Assistant")
 
+# ------------------------ Warm-up ------------------------ #
+# Once per server process: load models, index and DB connections in the
+# background while the first page renders (questions wait only for what they need)
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+if WARM_UP:
+    start_warm_up()
+
 # ------------------------ Session Setup ------------------------ #
 # Automatically set user_id and session_id
 init_user_session()
 user_id, session_id = get_user_and_session()
 
+# Tenant / site whose knowledge base answers (?namespace=<id> in the embed URL)
+namespace = st.query_params.get("namespace") or None
+
 # Display session and user IDs
 st.markdown(f"🔑 **Session ID:** `{session_id}`")
 st.markdown(f"🧑 **User ID:** `{user_id}`")
@@ -20,32 +38,43 @@ st.markdown(f"🧑 **User ID:** `{user_id}`")
 if "conversation" not in st.session_state:
     st.session_state.conversation = []
 
+# ------------------------ Display Conversation ------------------------ #
+for chat in st.session_state.conversation:
+    if chat["role"] == "user":
+        st.markdown(f"**You:** {chat['message']}")
+    else:
+        st.markdown(f"**Assistant:** {chat['message']}")
+
 # ------------------------ Chat Interface ------------------------ #
 user_input = st.chat_input("💬 Ask me anything...")
 
 if user_input:
+    st.markdown(f"**You:** {user_input}")
     try:
-        with st.spinner("🧠 Thinking..."):
-            # Get response from the model
-            answer, sources = get_rag_response(user_input, session_id=session_id, user_id=user_id)
+        # Stream the response from the model; the pipeline stores the chat once it
+        # completes, or the partial answer if a rerun interrupts it (closing the stream)
+        metrics = {}
+        with closing(stream_rag_response(
+            user_input, session_id=session_id, user_id=user_id, metrics=metrics, namespace=namespace
+        )) as tokens:
+            with st.spinner("🧠 Thinking..."):
+                answer = next(tokens, "")
+
+            placeholder = st.empty()
+            placeholder.markdown(f"**Assistant:** {answer}▌")
+            for token in tokens:
+                answer += token
+                placeholder.markdown(f"**Assistant:** {answer}▌")
+        placeholder.markdown(f"**Assistant:** {answer}")
+        st.caption(f"⏱️ First token in {metrics.get('ttft', 0):.2f}s · total {metrics.get('total', 0):.2f}s")
 
         # Append the conversation to session state
         st.session_state.conversation.append({"role": "user", "message": user_input})
         st.session_state.conversation.append({"role": "assistant", "message": answer})
 
-        # Store the chat interaction in the database
-        store_chat(user_id, session_id, user_input, answer)
-
     except Exception as e:
         st.error(f"❌ Error occurred: {str(e)}")
 
-# ------------------------ Display Conversation ------------------------ #
-for chat in st.session_state.conversation:
-    if chat["role"] == "user":
-        st.markdown(f"**You:** {chat['message']}")
-    else:
-        st.markdown(f"**Assistant:** {chat['message']}")
-
 # ------------------------ Clear Chat Option ------------------------ #
 if st.button("🗑️ Clear Chat"):
     clear_chat(user_id, session_id)
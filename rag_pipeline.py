@@ -1,23 +1,75 @@
 # rag_pipeline.py
 
 import os
+import time
+import uuid
+import asyncio
 from dotenv import load_dotenv
-from langchain_community.vectorstores import FAISS
-from langchain_cohere import CohereEmbeddings, ChatCohere
-from langchain_core.prompts import ChatPromptTemplate
+from utils.resources import lazy_resource
+from utils.index_registry import IndexRegistry
+from utils.vectorstore_utils import load_vectorstore
+from utils.embedding_cache import CachedEmbeddings
+from utils.embedding_providers import get_embedding_backend, embedding_model_id
+from utils.answer_cache import SemanticAnswerCache
+from utils.async_utils import run_sync, run_in_background
+from utils.context_builder import build_context, estimate_tokens
+from utils.metrics import span, record, start_metrics_server
+from utils.hybrid_search import lexical_search, confident_lexical_hits, reciprocal_rank_fusion
+from utils.query_batcher import QueryBatcher, batch_similarity_search
 
 # Load environment
 load_dotenv()
 COHERE_API_KEY = os.getenv("COHERE_API_KEY")
 
-# Paths & models
+# Paths & models: the default index lives in FAISS_DB_PATH, each namespace
+# (tenant / site id) in FAISS_DB_PATH/<namespace>
 FAISS_DB_PATH = "vectorstore"
-EMBEDDING_MODEL = CohereEmbeddings(model="embed-english-v3.0")
+INDEX_POLL_INTERVAL = float(os.getenv("INDEX_POLL_INTERVAL", "5"))
+INDEX_CACHE_MAX = int(os.getenv("INDEX_CACHE_MAX", "32"))  # open indexes per process
+INDEX_MEMORY_BUDGET_MB = float(os.getenv("INDEX_MEMORY_BUDGET_MB", "1024"))  # 0 = no limit
+FAISS_MMAP = os.getenv("FAISS_MMAP", "1") == "1"
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "0")) or None
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "0")) or None
+
+# Context assembly: fetch extra candidates, merge overlapping chunks, pack into a token budget
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "4"))
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "12"))
+RETRIEVAL_MMR = os.getenv("RETRIEVAL_MMR", "0") == "1"
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.5"))
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))  # context + chat history
+
+# Hybrid retrieval: BM25 keyword hits fused with vector hits (RRF); when the
+# query's exact terms (product names, codes) match at most LEXICAL_MAX_HITS
+# chunks, those chunks are used without calling the embedding API at all
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") == "1"
+RRF_K = int(os.getenv("RRF_K", "60"))
+LEXICAL_FAST_PATH = os.getenv("LEXICAL_FAST_PATH", "1") == "1"
+LEXICAL_MAX_HITS = int(os.getenv("LEXICAL_MAX_HITS", str(RETRIEVAL_K)))
+# Cross-session micro-batching: queries arriving within QUERY_BATCH_WINDOW_MS of
+# each other (up to QUERY_BATCH_MAX) share one embedding call and one FAISS search
+QUERY_BATCHING = os.getenv("QUERY_BATCHING", "0") == "1"
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "10"))
+QUERY_BATCH_MAX = int(os.getenv("QUERY_BATCH_MAX", "32"))
+EMBEDDING_MODEL_NAME = embedding_model_id()  # EMBEDDING_PROVIDER: cohere or local
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/query_embeddings.sqlite")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+
+# Set WARM_UP=0 to skip preloading clients and the index when the app starts
+WARM_UP = os.getenv("WARM_UP", "1") == "1"
+
+# Semantic answer cache: "off", "no_history" (only first turns) or "always"
+ANSWER_CACHE_POLICY = os.getenv("ANSWER_CACHE_POLICY", "no_history")
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "512")),
+)
 
-# LLM + Prompt chain
-llm = ChatCohere(model="command-r-plus", temperature=0.3)
 PROMPT = """
-You are a helpful assistant in a multi-turn conversation. Use the following chat history and relevant documents to respond to the user's new question.
+You are a helpful assistant in a multi-turn conversation. Use the following conversation summary, chat history and relevant documents to respond to the user's new question.
+
+Conversation Summary (earlier turns):
+{summary}
 
 Chat History:  
 {chat_history}
@@ -30,56 +82,544 @@ New Question:
 
 Answer:
 """
-prompt = ChatPromptTemplate.from_template(PROMPT)
-chain = prompt | llm
 
 
-def load_faiss_db():
-    """Load FAISS index from disk (raise if missing)."""
-    index_file = os.path.join(FAISS_DB_PATH, "index.faiss")
+# Clients, models and the index are built on first use, once per process
+# (Streamlit reruns and API workers share them), so importing this module is cheap
+@lazy_resource
+def get_embedding_model():
+    """Query embeddings, cached in memory and on disk so repeat questions skip the model call."""
+    return CachedEmbeddings(
+        get_embedding_backend(),
+        model_name=EMBEDDING_MODEL_NAME,
+        max_entries=EMBEDDING_CACHE_SIZE,
+        db_path=EMBEDDING_CACHE_PATH,
+    )
+
+
+@lazy_resource
+def get_llm():
+    """Chat model used for answers and history summaries."""
+    from langchain_cohere import ChatCohere
+    return ChatCohere(model="command-r-plus", temperature=0.3)
+
+
+@lazy_resource
+def get_chain():
+    """Prompt | LLM chain."""
+    from langchain_core.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_template(PROMPT) | get_llm()
+
+# Per-stage latency histograms and counters at :METRICS_PORT/metrics (off by default)
+start_metrics_server()
+
+
+def load_faiss_db(path=None):
+    """Load the FAISS index in `path` (FAISS_DB_PATH by default) from disk (raise if missing)."""
+    path = path or FAISS_DB_PATH
+    index_file = os.path.join(path, "index.faiss")
     if not os.path.exists(index_file):
         raise FileNotFoundError(
             f"❌ FAISS index not found at {index_file}. "
             "Please run the embedding pipeline first."
         )
-    return FAISS.load_local(
+    with span("index_load") as s:
+        faiss_db = load_vectorstore(
+            path,
+            get_embedding_model(),
+            mmap=FAISS_MMAP,
+            nprobe=FAISS_NPROBE,
+            ef_search=FAISS_EF_SEARCH,
+            embedding_model=EMBEDDING_MODEL_NAME,
+        )
+        s["docs"] = faiss_db.index.ntotal
+    return faiss_db
+
+
+@lazy_resource
+def get_index_registry():
+    """Open indexes of this process, one shared hot-swappable index per namespace, LRU-evicted."""
+    from utils.deploy_package import unpack_artifacts
+    unpack_artifacts(FAISS_DB_PATH)  # large index files arrive compressed on deployments
+    return IndexRegistry(
         FAISS_DB_PATH,
-        EMBEDDING_MODEL,
-        allow_dangerous_deserialization=True
+        load_faiss_db,
+        poll_interval=INDEX_POLL_INTERVAL,
+        max_indexes=INDEX_CACHE_MAX,
+        memory_budget_mb=INDEX_MEMORY_BUDGET_MB,
     )
 
 
-def get_rag_response(query: str, session_id: str, user_id: str):
+def get_index_manager(namespace=None):
+    """Manager of one namespace's index (the default index when `namespace` is None)."""
+    return get_index_registry().get(namespace)
+
+
+def warm_up(namespaces=None):
+    """
+    Build the clients, models and index now instead of on the first question.
+
+    `namespaces` (WARM_UP_NAMESPACES, comma separated, by default) are
+    preloaded next to the default index; the rest load on first use.
+
+    Each step only logs a warning if it fails, so a missing index or an
+    unreachable database never keeps the app from starting.
+    """
+    from utils.mongo_utils import ensure_indexes
+    import utils.history_summary  # noqa: F401  (pulls in the MongoDB helpers)
+
+    start = time.perf_counter()
+    with span("warm_up"):
+        # (1) Models and the prompt chain
+        backend = get_embedding_model().embeddings
+        if hasattr(backend, "load"):
+            backend.load()
+        get_chain()
+
+        # (2) The shared indexes (also starts their reload watchers)
+        if namespaces is None:
+            namespaces = [n.strip() for n in os.getenv("WARM_UP_NAMESPACES", "").split(",") if n.strip()]
+        for namespace in [None] + list(namespaces):
+            try:
+                get_index_registry().snapshot(namespace)
+            except Exception as e:
+                print(f"[⚠️] Index '{namespace or 'default'}' not preloaded: {e}")
+
+        # (3) MongoDB connection pool and indexes
+        ensure_indexes()
+    print(f"[🔥] Warm-up finished in {time.perf_counter() - start:.2f}s")
+
+
+def use_answer_cache(chat_history: str) -> bool:
+    """Decide whether a turn may be served from / stored into the answer cache."""
+    if ANSWER_CACHE_POLICY == "always":
+        return True
+    if ANSWER_CACHE_POLICY == "no_history":
+        return not chat_history
+    return False
+
+
+def _start_turn(query, session_id, user_id, namespace, query_vector, index_version, history) -> dict:
+    """Build the per-turn state and consult the answer cache."""
+    summary, chat_history = history
+    turn = {
+        "turn_id": uuid.uuid4().hex,  # idempotency key for persistence
+        "query": query,
+        "session_id": session_id,
+        "user_id": user_id,
+        "namespace": namespace,
+        "query_vector": query_vector,
+        # Answers are only shared between turns against the same index version of the same namespace
+        "index_version": (namespace, index_version),
+        "summary": summary,
+        "chat_history": chat_history,
+        # Keyword fast-path turns have no query vector to match on
+        "cacheable": query_vector is not None and use_answer_cache(summary + chat_history),
+        "cached_answer": None,
+    }
+
+    # Serve near-duplicate questions from the answer cache
+    if turn["cacheable"]:
+        with span("answer_cache") as s:
+            cached = answer_cache.lookup(query_vector, turn["index_version"], scope=namespace)
+            s["cache_hits"] = int(cached is not None)
+        if cached:
+            turn.update(cached_answer=cached["answer"], docs=cached["docs"])
+    return turn
+
+
+def embed_query(query: str) -> list:
+    """Embed the query (through the query-embedding cache)."""
+    with span("query_embedding") as s:
+        query_vector, hit = get_embedding_model().embed_query_cached(query)
+        s["cache_hits"] = int(hit)
+    return query_vector
+
+
+async def aembed_query(query: str) -> list:
+    """Async `embed_query`."""
+    with span("query_embedding") as s:
+        query_vector, hit = await get_embedding_model().aembed_query_cached(query)
+        s["cache_hits"] = int(hit)
+    return query_vector
+
+
+def _search(faiss_db, query_vector):
+    if RETRIEVAL_MMR:
+        try:
+            return faiss_db.max_marginal_relevance_search_with_score_by_vector(
+                query_vector, k=RETRIEVAL_FETCH_K, fetch_k=RETRIEVAL_FETCH_K * 2, lambda_mult=MMR_LAMBDA
+            )
+        except RuntimeError:
+            pass  # index cannot reconstruct vectors (e.g. IVF without a direct map)
+    return faiss_db.similarity_search_with_score_by_vector(query_vector, k=RETRIEVAL_FETCH_K)
+
+
+async def _asearch(faiss_db, query_vector):
+    if RETRIEVAL_MMR:
+        try:
+            return await faiss_db.amax_marginal_relevance_search_with_score_by_vector(
+                query_vector, k=RETRIEVAL_FETCH_K, fetch_k=RETRIEVAL_FETCH_K * 2, lambda_mult=MMR_LAMBDA
+            )
+        except RuntimeError:
+            pass
+    return await faiss_db.asimilarity_search_with_score_by_vector(query_vector, k=RETRIEVAL_FETCH_K)
+
+
+def _search_batch(faiss_db, query_vectors):
+    if RETRIEVAL_MMR:
+        return [_search(faiss_db, query_vector) for query_vector in query_vectors]
+    return batch_similarity_search(faiss_db, query_vectors, RETRIEVAL_FETCH_K)
+
+
+@lazy_resource
+def get_query_batcher():
+    """Coalescer for the embed + vector search step of concurrent turns (QUERY_BATCHING=1)."""
+    return QueryBatcher(
+        get_embedding_model().aembed_queries_cached,
+        _search_batch,
+        window=QUERY_BATCH_WINDOW_MS / 1000,
+        max_batch=QUERY_BATCH_MAX,
+    )
+
+
+def retrieve_candidates(faiss_db, query_vector):
+    """Fetch RETRIEVAL_FETCH_K (doc, score) candidates, optionally diversified with MMR."""
+    with span("faiss_search") as s:
+        candidates = _search(faiss_db, query_vector)
+        s["docs"] = len(candidates)
+    return candidates
+
+
+async def aretrieve_candidates(faiss_db, query_vector):
+    """Async `retrieve_candidates`."""
+    with span("faiss_search") as s:
+        candidates = await _asearch(faiss_db, query_vector)
+        s["docs"] = len(candidates)
+    return candidates
+
+
+def lexical_candidates(faiss_db, query):
+    """
+    Keyword candidates for `query`.
+
+    Returns:
+        tuple: (BM25 candidates, or [] when hybrid search is off or
+        unsupported; True if they are conclusive and vector search can be skipped)
+    """
+    if not HYBRID_SEARCH:
+        return [], False
+    with span("lexical_search") as s:
+        lexical = lexical_search(faiss_db, query, RETRIEVAL_FETCH_K)
+        exact = confident_lexical_hits(faiss_db, query, LEXICAL_MAX_HITS) if LEXICAL_FAST_PATH else None
+        s["docs"] = len(lexical)
+        s["fast_path"] = int(bool(exact))  # the embedding call is skipped
+    if exact:
+        return reciprocal_rank_fusion(exact, lexical, k=RRF_K, limit=RETRIEVAL_FETCH_K), True
+    return lexical, False
+
+
+def fuse_candidates(vector_hits: list, lexical: list) -> list:
+    """Merge vector and keyword candidates with reciprocal-rank fusion."""
+    if not lexical:
+        return vector_hits
+    return reciprocal_rank_fusion(vector_hits, lexical, k=RRF_K, limit=RETRIEVAL_FETCH_K)
+
+
+def _attach_docs(turn: dict, candidates: list):
+    with span("context_build") as s:
+        context, docs, stats = build_context(
+            candidates,
+            k=RETRIEVAL_K,
+            token_budget=PROMPT_TOKEN_BUDGET,
+            chat_history=turn["summary"] + turn["chat_history"],
+        )
+        s.update(docs=len(docs), tokens=stats["context_tokens"], tokens_saved=stats["tokens_saved"])
+    turn["docs"] = docs
+    turn["context_stats"] = stats
+    turn["inputs"] = {
+        "question": turn["query"],
+        "context": context,
+        "summary": turn["summary"] or "(none)",
+        "chat_history": turn["chat_history"],
+    }
+
+
+def _cache_answer(turn: dict, answer: str):
+    if turn["cacheable"] and turn["cached_answer"] is None:
+        answer_cache.store(
+            turn["query"], turn["query_vector"], answer, turn["docs"], turn["index_version"], scope=turn["namespace"]
+        )
+
+
+def prepare_turn(query: str, session_id: str, user_id: str, namespace: str = None) -> dict:
+    """
+    Run the retrieval half of a turn, shared by the blocking and streaming pipelines.
+
+    Args:
+        query (str): User's query
+        session_id (str): Unique session identifier
+        user_id (str): Unique user identifier
+        namespace (str): Tenant / site whose index is searched (None = default index)
+
+    Returns:
+        dict: "docs", "inputs" for the chain, "cached_answer" (None unless the
+        answer cache hit) plus the state needed by `finish_turn`
+    """
+    # (1) Get the namespace's shared FAISS index (loaded once, reloaded when it changes)
+    faiss_db, index_version = get_index_registry().snapshot(namespace)
+
+    # (2) Keyword search locally; unless it is conclusive, embed the query
+    # once (reused for the answer cache and the vector search)
+    lexical, fast_path = lexical_candidates(faiss_db, query)
+    query_vector, candidates = None, None
+    if not fast_path and QUERY_BATCHING:
+        # Embedded and searched together with other sessions' turns on the shared loop
+        query_vector, candidates = run_sync(get_query_batcher().submit(faiss_db, query))
+    elif not fast_path:
+        query_vector = embed_query(query)
+
+    # (3) Fetch the session summary and recent turns from MongoDB
+    from utils.history_summary import get_prompt_history  # Import here to avoid circular imports
+    with span("history_fetch"):
+        history = get_prompt_history(user_id=user_id, session_id=session_id)
+
+    # (4) Check the answer cache
+    turn = _start_turn(query, session_id, user_id, namespace, query_vector, index_version, history)
+    if turn["cached_answer"] is not None:
+        return turn
+
+    # (5) Get top relevant documents from the DB
+    if fast_path:
+        _attach_docs(turn, lexical)
+    else:
+        if candidates is None:
+            candidates = retrieve_candidates(faiss_db, query_vector)
+        _attach_docs(turn, fuse_candidates(candidates, lexical))
+    return turn
+
+
+def finish_turn(turn: dict, answer: str, complete: bool = True):
+    """
+    Cache a freshly generated answer, store the interaction once and update the summary in the background.
+
+    An answer cut short (`complete=False`: the reader went away mid-stream)
+    is stored in the history but never cached.
+    """
+    from utils.mongo_utils import store_chat  # Import here to avoid circular imports
+    from utils.history_summary import afold_history
+
+    if complete:
+        _cache_answer(turn, answer)
+    with span("persistence"):
+        store_chat(turn["user_id"], turn["session_id"], turn["query"], answer, turn_id=turn["turn_id"])
+    run_in_background(afold_history(get_llm(), turn["user_id"], turn["session_id"]))
+
+
+async def aprepare_turn(query: str, session_id: str, user_id: str, namespace: str = None) -> dict:
+    """
+    Async `prepare_turn`: retrieval and the Mongo history read run concurrently.
+
+    Returns:
+        dict: Same turn state as `prepare_turn`
+    """
+    from utils.history_summary import aget_prompt_history  # Import here to avoid circular imports
+
+    # (1) Get the namespace's shared FAISS index; only its first load touches the disk
+    registry = get_index_registry()
+    if registry.version(namespace) is None:
+        faiss_db, index_version = await asyncio.to_thread(registry.snapshot, namespace)
+    else:
+        faiss_db, index_version = registry.snapshot(namespace)
+
+    # (2) Keyword search, embed + vector search overlapped with the history fetch
+    async def retrieve():
+        lexical, fast_path = await asyncio.to_thread(lexical_candidates, faiss_db, query)
+        if fast_path:
+            return None, lexical
+        if QUERY_BATCHING:
+            query_vector, candidates = await get_query_batcher().submit(faiss_db, query)
+        else:
+            query_vector = await aembed_query(query)
+            candidates = await aretrieve_candidates(faiss_db, query_vector)
+        return query_vector, fuse_candidates(candidates, lexical)
+
+    async def fetch_history():
+        with span("history_fetch"):
+            return await aget_prompt_history(user_id=user_id, session_id=session_id)
+
+    (query_vector, candidates), history = await asyncio.gather(retrieve(), fetch_history())
+
+    # (3) Check the answer cache, otherwise use the retrieved documents
+    turn = _start_turn(query, session_id, user_id, namespace, query_vector, index_version, history)
+    if turn["cached_answer"] is None:
+        _attach_docs(turn, candidates)
+    return turn
+
+
+async def afinish_turn(turn: dict, answer: str, complete: bool = True):
+    """Async `finish_turn`, storing the interaction through the async Mongo driver."""
+    from utils.mongo_utils import astore_chat  # Import here to avoid circular imports
+    from utils.history_summary import afold_history
+
+    if complete:
+        _cache_answer(turn, answer)
+    with span("persistence"):
+        await astore_chat(turn["user_id"], turn["session_id"], turn["query"], answer, turn_id=turn["turn_id"])
+    await afold_history(get_llm(), turn["user_id"], turn["session_id"])
+
+
+async def aget_rag_response(query: str, session_id: str, user_id: str, namespace: str = None):
+    """
+    Async version of `get_rag_response`.
+
+    The chat turn is persisted (and older turns folded into the session
+    summary) by a background task, so the reply does not wait for the Mongo
+    write or the summary LLM call.
+
+    Args:
+        query (str): User's query
+        session_id (str): Unique session identifier
+        user_id (str): Unique user identifier
+        namespace (str): Tenant / site whose index is searched (None = default index)
+
+    Returns:
+        tuple: (Generated response string, list of retrieved documents)
+    """
+    start = time.perf_counter()
+    turn = await aprepare_turn(query, session_id, user_id, namespace)
+
+    answer = turn["cached_answer"]
+    if answer is None:
+        # Call LLM with context + history + new question
+        with span("llm") as s:
+            answer = (await get_chain().ainvoke(turn["inputs"])).content
+            s["tokens"] = estimate_tokens(answer)
+
+    run_in_background(afinish_turn(turn, answer))
+    record("turn", time.perf_counter() - start, docs=len(turn["docs"]))
+    return answer, turn["docs"]
+
+
+def get_rag_response(query: str, session_id: str, user_id: str, namespace: str = None):
     """
     Process a query using RAG and session-based memory from MongoDB.
 
+    Synchronous wrapper around `aget_rag_response` for existing callers.
+
     Args:
         query (str): User's query
         session_id (str): Unique session identifier
         user_id (str): Unique user identifier
+        namespace (str): Tenant / site whose index is searched (None = default index)
 
     Returns:
         tuple: (Generated response string, list of retrieved documents)
     """
-    # (1) Load FAISS index
-    faiss_db = load_faiss_db()
+    return run_sync(aget_rag_response(query, session_id, user_id, namespace))
+
 
-    # (2) Get top relevant documents from the DB
-    docs = faiss_db.similarity_search(query)
-    context = "\n\n".join(d.page_content for d in docs)
+def stream_rag_response(query: str, session_id: str, user_id: str, metrics: dict = None, namespace: str = None):
+    """
+    Streaming variant of `get_rag_response` that yields answer tokens as the LLM produces them.
 
-    # (3) Fetch recent chat history from MongoDB
-    from utils.mongo_utils import store_chat, fetch_chat_history  # Import here to avoid circular imports
-    chat_history = fetch_chat_history(user_id=user_id, session_id=session_id, limit=5)
+    The answer is stored once, after the last token, or with whatever was
+    streamed if the generator is closed early (a Streamlit rerun). Timings
+    are written into `metrics` (if given) when the generator is exhausted.
 
-    # (4) Call LLM with context + history + new question
-    response = chain.invoke({
-        "question": query,
-        "context": context,
-        "chat_history": chat_history
-    })
+    Args:
+        query (str): User's query
+        session_id (str): Unique session identifier
+        user_id (str): Unique user identifier
+        metrics (dict): Optional dict filled with "ttft" and "total" (seconds) and "docs"
+        namespace (str): Tenant / site whose index is searched (None = default index)
+
+    Yields:
+        str: Answer text fragments
+    """
+    metrics = metrics if metrics is not None else {}
+    start = time.perf_counter()
+    turn = prepare_turn(query, session_id, user_id, namespace)
+    metrics["docs"] = turn["docs"]
+    metrics.update(turn.get("context_stats", {}))
+
+    parts, complete = [], False
+    try:
+        if turn["cached_answer"] is not None:
+            metrics["ttft"] = time.perf_counter() - start
+            parts.append(turn["cached_answer"])
+            yield turn["cached_answer"]
+        else:
+            with span("llm") as s:
+                llm_start = time.perf_counter()
+                for chunk in get_chain().stream(turn["inputs"]):
+                    if not chunk.content:
+                        continue
+                    if not parts:
+                        metrics["ttft"] = time.perf_counter() - start
+                        record("llm_first_token", time.perf_counter() - llm_start)
+                    parts.append(chunk.content)
+                    yield chunk.content
+                s["tokens"] = estimate_tokens("".join(parts))
+        complete = True
+    finally:
+        # A Streamlit rerun closes the generator mid-answer: keep what was shown
+        if parts:
+            finish_turn(turn, "".join(parts), complete=complete)
+
+    metrics["total"] = time.perf_counter() - start
+    record("turn", metrics["total"], docs=len(turn["docs"]))
+    record("turn_first_token", metrics.get("ttft", metrics["total"]))
+
+
+async def astream_rag_response(query: str, session_id: str, user_id: str, metrics: dict = None,
+                              namespace: str = None):
+    """
+    Async `stream_rag_response`, for callers that run on their own event loop (the HTTP API).
+
+    The turn is persisted by a background task after the last token, as in
+    `aget_rag_response`, or with the partial answer if the client disconnects.
+
+    Args:
+        query (str): User's query
+        session_id (str): Unique session identifier
+        user_id (str): Unique user identifier
+        metrics (dict): Optional dict filled with "ttft" and "total" (seconds) and "docs"
+        namespace (str): Tenant / site whose index is searched (None = default index)
+
+    Yields:
+        str: Answer text fragments
+    """
+    metrics = metrics if metrics is not None else {}
+    start = time.perf_counter()
+    turn = await aprepare_turn(query, session_id, user_id, namespace)
+    metrics["docs"] = turn["docs"]
+    metrics.update(turn.get("context_stats", {}))
 
-    # (5) Store current interaction
-    store_chat(user_id, session_id, query, response.content)
+    parts, complete = [], False
+    try:
+        if turn["cached_answer"] is not None:
+            metrics["ttft"] = time.perf_counter() - start
+            parts.append(turn["cached_answer"])
+            yield turn["cached_answer"]
+        else:
+            with span("llm") as s:
+                llm_start = time.perf_counter()
+                async for chunk in get_chain().astream(turn["inputs"]):
+                    if not chunk.content:
+                        continue
+                    if not parts:
+                        metrics["ttft"] = time.perf_counter() - start
+                        record("llm_first_token", time.perf_counter() - llm_start)
+                    parts.append(chunk.content)
+                    yield chunk.content
+                s["tokens"] = estimate_tokens("".join(parts))
+        complete = True
+    finally:
+        # A client disconnect cancels or closes the generator mid-answer: keep what was sent
+        if parts:
+            run_in_background(afinish_turn(turn, "".join(parts), complete=complete))
 
-    return response.content, docs
+    metrics["total"] = time.perf_counter() - start
+    record("turn", metrics["total"], docs=len(turn["docs"]))
+    record("turn_first_token", metrics.get("ttft", metrics["total"]))
@@ -0,0 +1,46 @@
+# tests/test_answer_cache.py
+
+from utils.answer_cache import SemanticAnswerCache
+
+VECTOR = [1.0, 0.0, 0.0]
+OTHER = [0.0, 1.0, 0.0]
+
+
+def test_equivalent_question_hits_the_same_version():
+    cache = SemanticAnswerCache(threshold=0.95)
+    assert cache.lookup(VECTOR, "v1") is None
+    cache.store("q", VECTOR, "answer", [], "v1")
+
+    assert cache.lookup([0.99, 0.05, 0.0], "v1")["answer"] == "answer"
+    assert cache.lookup(OTHER, "v1") is None
+
+
+def test_new_version_drops_the_old_answers_of_that_index_only():
+    cache = SemanticAnswerCache()
+    for scope in ("acme", "globex"):
+        cache.lookup(VECTOR, "v1", scope=scope)
+        cache.store("q", VECTOR, f"{scope} v1", [], "v1", scope=scope)
+    assert cache.stats()["entries"] == 2
+
+    assert cache.lookup(VECTOR, "v2", scope="acme") is None  # hot swap of acme
+    assert cache.stats()["entries"] == 1
+    assert cache.lookup(VECTOR, "v1", scope="globex")["answer"] == "globex v1"
+
+
+def test_answer_from_a_replaced_version_is_not_stored():
+    cache = SemanticAnswerCache()
+    cache.lookup(VECTOR, "v1")
+    cache.lookup(VECTOR, "v2")  # another turn already sees the new index
+    cache.store("q", VECTOR, "stale", [], "v1")  # slow turn that started on v1
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_past_max_entries():
+    cache = SemanticAnswerCache(max_entries=2)
+    cache.lookup(VECTOR, "v1")
+    for i, vector in enumerate([VECTOR, OTHER, [0.0, 0.0, 1.0]]):
+        cache.store(f"q{i}", vector, f"a{i}", [], "v1")
+
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup(VECTOR, "v1") is None
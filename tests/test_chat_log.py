@@ -0,0 +1,105 @@
+# tests/test_chat_log.py
+
+import time
+import asyncio
+from datetime import datetime
+import pytest
+import utils.mongo_utils as mongo_utils
+from benchmarks.fakes import FakeCollection
+from utils.mongo_utils import ChatLogWriter
+
+
+class FlakyCollection(FakeCollection):
+    """Fails the first `failures` bulk writes, like an unreachable MongoDB."""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def bulk_write(self, requests, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("MongoDB unreachable")
+        return super().bulk_write(requests, ordered=ordered)
+
+
+def record(i, session="s"):
+    return {"turn_id": f"t{i}", "user_id": "u", "session_id": session,
+            "query": f"q{i}", "response": f"a{i}", "timestamp": datetime(2026, 1, 1, 0, 0, i)}
+
+
+def writer(collection, tmp_path, **kwargs):
+    return ChatLogWriter(collection, batch_size=10, flush_interval=0.01, retry_max=0.05,
+                         spill_path=str(tmp_path / "spill.jsonl"), **kwargs)
+
+
+def turn_ids(collection):
+    return sorted(doc["turn_id"] for doc in collection.docs)
+
+
+def test_failed_batches_are_retried_and_stay_readable(tmp_path):
+    collection = FlakyCollection(failures=10_000)
+    log = writer(collection, tmp_path)
+    for i in range(3):
+        log.submit(record(i))
+
+    time.sleep(0.2)  # several failed attempts
+    assert collection.docs == []
+    assert [r["turn_id"] for r in log.queued(("u", "s"))] == ["t0", "t1", "t2"]
+
+    collection.failures = 0  # MongoDB is back
+    log.flush(timeout=5)
+    assert turn_ids(collection) == ["t0", "t1", "t2"]
+    assert log.queued(("u", "s")) == []
+    assert log.pending == 0
+
+
+def test_unwritten_turns_are_spilled_at_close_and_written_back(tmp_path):
+    down = FlakyCollection(failures=10_000)
+    log = writer(down, tmp_path)
+    log.submit(record(0))
+    log.submit(record(1, session="other"))
+    log.flush = lambda timeout=10.0, key=None: None  # MongoDB stays down through shutdown
+    log.close()
+    assert (tmp_path / "spill.jsonl").exists()
+
+    up = FlakyCollection(failures=0)
+    restarted = writer(up, tmp_path)
+    restarted.submit(record(2))
+    restarted.flush(timeout=5)
+    assert turn_ids(up) == ["t0", "t1", "t2"]
+    assert isinstance(up.docs[0]["timestamp"], datetime)
+    assert not (tmp_path / "spill.jsonl").exists()
+    down.failures = 0  # let the first writer's thread finish its retries
+
+
+def test_closed_writer_never_blocks_async_callers(tmp_path):
+    collection = FlakyCollection(failures=10_000)
+    log = writer(collection, tmp_path)
+    log.close()
+
+    start = time.monotonic()
+    assert log.submit(record(0), block=False) is False  # astore_chat writes it through motor instead
+    assert time.monotonic() - start < 0.1
+
+
+def test_closed_writer_spills_blocking_writes_it_cannot_make(tmp_path):
+    log = writer(FlakyCollection(failures=1), tmp_path)
+    log.close()
+    log.submit(record(0))
+    assert (tmp_path / "spill.jsonl").read_text().count("\n") == 1
+
+
+def test_astore_chat_on_a_closed_writer_uses_the_async_driver(tmp_path, monkeypatch):
+    written = []
+
+    class AsyncCollection:
+        async def bulk_write(self, requests, ordered=True):
+            written.extend(requests)
+
+    log = writer(FlakyCollection(failures=10_000), tmp_path)
+    log.close()
+    monkeypatch.setattr(mongo_utils, "chat_log", log)
+    monkeypatch.setattr(mongo_utils, "get_async_collection", lambda name="chat_history": AsyncCollection())
+    asyncio.run(mongo_utils.astore_chat("u", f"s-{time.time_ns()}", "q", "a"))
+    assert len(written) == 1
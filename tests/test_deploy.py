@@ -0,0 +1,206 @@
+# tests/test_deploy.py
+
+import os
+import json
+import time
+import shutil
+import asyncio
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import pytest
+from utils import deploy_package
+from utils.github_utils import commit_and_push_changes, GitError
+from utils.render_utils import wait_until_live, http_probe, render_api_probe, DeployFailed
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+# Local bare remote
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.setattr(deploy_package, "DEPLOY_COMPRESS_MIN_MB", 0.5)
+    src = tmp_path / "src"
+    (src / "utils" / "__pycache__").mkdir(parents=True)
+    (src / "agents").mkdir()
+    (src / "vectorstore" / "acme").mkdir(parents=True)
+    (src / "frontend.py").write_text("print('app')\n")
+    (src / ".env").write_text("SECRET=1\n")
+    (src / "utils" / "a.py").write_text("x = 1\n")
+    (src / "utils" / "__pycache__" / "a.cpython-311.pyc").write_bytes(b"junk")
+    (src / "agents" / "b.py").write_text("y = 1\n")
+    (src / "vectorstore" / "index.faiss").write_bytes(os.urandom(200_000) + b"\0" * 800_000)
+    (src / "vectorstore" / "acme" / "index.faiss").write_bytes(b"small index")
+    remote = tmp_path / "remote.git"
+    subprocess.run(["git", "init", "-q", "--bare", str(remote)], check=True)
+    return src, str(remote), str(tmp_path / "staging")
+
+
+def push(src, remote, staging):
+    return commit_and_push_changes(remote, staging, source_dir=str(src))
+
+
+def remote_files(remote, tmp_path):
+    clone = tmp_path / f"clone-{time.monotonic_ns()}"
+    subprocess.run(["git", "clone", "-q", "-b", "main", remote, str(clone)], check=True)
+    files = subprocess.run(["git", "ls-files"], cwd=clone, capture_output=True, text=True, check=True).stdout
+    return clone, sorted(files.split())
+
+
+def test_first_deploy_pushes_everything_but_secrets_and_caches(project, tmp_path):
+    src, remote, staging = project
+    result = push(src, remote, staging)
+
+    assert result["pushed"]
+    _, files = remote_files(remote, tmp_path)
+    assert files == [".gitignore", "agents/b.py", "frontend.py", "utils/a.py",
+                     "vectorstore/acme/index.faiss", "vectorstore/index.faiss.gz"]
+    assert set(result["timings"]) == {"prepare", "package", "stage", "push"}
+
+
+def test_redeploy_pushes_only_changes(project, tmp_path):
+    src, remote, staging = project
+    push(src, remote, staging)
+
+    unchanged = push(src, remote, staging)
+    assert not unchanged["pushed"]
+    assert unchanged["changed"] == []
+
+    (src / "utils" / "a.py").write_text("x = 2\n")
+    (src / "agents" / "b.py").unlink()
+    result = push(src, remote, staging)
+    assert sorted(result["staged"]) == ["agents/b.py", "utils/a.py"]
+    assert result["removed"] == ["agents/b.py"]
+    _, files = remote_files(remote, tmp_path)
+    assert "agents/b.py" not in files
+
+
+def test_lost_staging_directory_recovers_from_the_remote(project, tmp_path):
+    src, remote, staging = project
+    push(src, remote, staging)
+    shutil.rmtree(staging)
+
+    result = push(src, remote, staging)
+    assert not result["pushed"]  # same content as the remote: nothing to send
+
+
+def test_compressed_artifacts_unpack_to_the_original(project, tmp_path):
+    src, remote, staging = project
+    push(src, remote, staging)
+    clone, _ = remote_files(remote, tmp_path)
+
+    root = str(clone / "vectorstore")
+    assert deploy_package.unpack_artifacts(root) == 1
+    assert deploy_package.unpack_artifacts(root) == 0  # already unpacked
+    assert (clone / "vectorstore" / "index.faiss").read_bytes() == (src / "vectorstore" / "index.faiss").read_bytes()
+
+
+def test_failed_git_command_raises(project, tmp_path):
+    src, _, staging = project
+    with pytest.raises(GitError, match="ls-remote"):
+        push(src, str(tmp_path / "missing.git"), staging)
+
+
+# Stub status server
+
+class StatusServer(ThreadingHTTPServer):
+    """Render-like deploys API and an app that turn live after a few requests."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StatusHandler)
+        self.requests = 0
+        self.live_after = 3
+        self.status = None  # fixed deploy status, e.g. "build_failed"
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        live = server.requests > server.live_after
+        if self.path.startswith("/v1/services/"):
+            status = server.status or ("live" if live else "build_in_progress")
+            code, body = 200, json.dumps([{"deploy": {"status": status}}]).encode()
+        else:
+            code, body = (200, b"ok") if live else (503, b"starting")
+        self.send_response(code)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def status_server():
+    server = StatusServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def poll(probes_factory, **kwargs):
+    async def main():
+        async with httpx.AsyncClient() as client:
+            return await wait_until_live(probes_factory(client), **kwargs)
+    return asyncio.run(main())
+
+
+def test_polls_until_the_api_reports_live(status_server):
+    rounds = poll(
+        lambda client: [render_api_probe("srv-test", "key", client, api_url=status_server.url + "/v1")],
+        timeout=5, initial_interval=0.01, max_interval=0.05,
+    )
+    assert rounds == 4
+
+
+def test_probes_run_concurrently_and_first_live_wins(status_server):
+    status_server.live_after = 4
+    rounds = poll(
+        lambda client: [
+            render_api_probe("srv-test", "key", client, api_url=status_server.url + "/v1"),
+            http_probe(status_server.url + "/", client),
+            http_probe("http://127.0.0.1:1/", client),  # unreachable probes count as not live
+        ],
+        timeout=5, initial_interval=0.01, max_interval=0.05,
+    )
+    assert rounds == 3  # two requests per round reach the server
+
+
+def test_failed_deploy_stops_polling(status_server):
+    status_server.status = "build_failed"
+    with pytest.raises(DeployFailed, match="build_failed"):
+        poll(lambda client: [render_api_probe("srv-test", "key", client, api_url=status_server.url + "/v1")],
+             timeout=5, initial_interval=0.01)
+    assert status_server.requests == 1
+
+
+def test_gives_up_at_the_timeout(status_server):
+    status_server.live_after = 10_000
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        poll(lambda client: [http_probe(status_server.url + "/", client)],
+             timeout=0.3, initial_interval=0.05, max_interval=0.1)
+    assert time.monotonic() - start < 2
+
+
+def test_first_check_waits_the_initial_interval():
+    async def live():
+        return True
+
+    start = time.monotonic()
+    assert poll(lambda client: [live], timeout=5, initial_interval=0.2) == 1
+    assert time.monotonic() - start >= 0.2
+
+    start = time.monotonic()
+    assert poll(lambda client: [live], timeout=5, initial_interval=0.2, initial_delay=0) == 1
+    assert time.monotonic() - start < 0.2
@@ -0,0 +1,72 @@
+# tests/test_embedding_store.py
+
+import os
+import numpy as np
+from utils.embedding_store import EmbeddingStore
+
+MODEL = "fake/hash-4"
+
+
+def vectors(start, count, dim=4):
+    return [[float(start + i)] * dim for i in range(count)]
+
+
+def test_vectors_round_trip_across_reopen(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    assert store.put_many(MODEL, ["a", "b", "a"], vectors(0, 3)) == 2
+    assert store.put_many(MODEL, ["b", "c"], vectors(10, 2)) == 1
+
+    reopened = EmbeddingStore(str(tmp_path))
+    assert reopened.count(MODEL) == 3
+    assert reopened.get_many(MODEL, ["a", "b", "c"]) == {"a": [0.0] * 4, "b": [1.0] * 4, "c": [11.0] * 4}
+
+
+def test_torn_row_is_cut_before_the_next_append(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.put_many(MODEL, ["a", "b"], vectors(0, 2))
+    data_file, _ = store._files(MODEL)
+    with open(data_file, "ab") as f:
+        f.write(np.ones(4, dtype=np.float32).tobytes()[:6])  # crash mid-row
+
+    reopened = EmbeddingStore(str(tmp_path))
+    reopened.put_many(MODEL, ["c", "d"], vectors(20, 2))
+    assert os.path.getsize(data_file) == 4 * 4 * 4
+    assert reopened.get_many(MODEL, ["a", "c", "d"]) == {"a": [0.0] * 4, "c": [20.0] * 4, "d": [21.0] * 4}
+    assert EmbeddingStore(str(tmp_path)).get_many(MODEL, ["d"]) == {"d": [21.0] * 4}
+
+
+def test_rows_never_logged_keep_later_offsets_aligned(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.put_many(MODEL, ["a"], vectors(0, 1))
+    data_file, _ = store._files(MODEL)
+    with open(data_file, "ab") as f:
+        f.write(np.full(4, 9.0, dtype=np.float32).tobytes())  # crash before the offsets were logged
+
+    reopened = EmbeddingStore(str(tmp_path))
+    assert reopened.count(MODEL) == 1
+    reopened.put_many(MODEL, ["b"], vectors(5, 1))
+    assert EmbeddingStore(str(tmp_path)).get_many(MODEL, ["a", "b"]) == {"a": [0.0] * 4, "b": [5.0] * 4}
+
+
+def test_data_without_a_logged_header_is_discarded(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    data_file, _ = store._files(MODEL)
+    with open(data_file, "wb") as f:
+        f.write(b"\x00" * 10)  # first append crashed before the log existed
+
+    store.put_many(MODEL, ["a"], vectors(3, 1))
+    assert os.path.getsize(data_file) == 16
+    assert EmbeddingStore(str(tmp_path)).get_many(MODEL, ["a"]) == {"a": [3.0] * 4}
+
+
+def test_torn_log_line_is_dropped(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.put_many(MODEL, ["a", "b"], vectors(0, 2))
+    _, log_file = store._files(MODEL)
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write("c\t")  # crash mid-line
+
+    reopened = EmbeddingStore(str(tmp_path))
+    assert reopened.count(MODEL) == 2
+    reopened.put_many(MODEL, ["c"], vectors(7, 1))
+    assert EmbeddingStore(str(tmp_path)).get_many(MODEL, ["b", "c"]) == {"b": [1.0] * 4, "c": [7.0] * 4}
@@ -0,0 +1,78 @@
+# tests/test_history_cache.py
+
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+import utils.mongo_utils as mongo_utils
+from benchmarks.fakes import install_fake_mongo
+from utils.mongo_utils import afetch_chat_records, fetch_chat_records, store_chat
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    monkeypatch.setattr(mongo_utils, "get_collection", mongo_utils.get_collection)
+    monkeypatch.setattr(mongo_utils, "get_async_collection", mongo_utils.get_async_collection)
+    return install_fake_mongo()
+
+
+def write_turn(collections, session_id, i):
+    """A turn stored by another process, bypassing this process's buffer."""
+    collections["chat_history"].docs.append({
+        "user_id": "u", "session_id": session_id, "turn_id": f"t{i}",
+        "query": f"question {i}", "response": f"answer {i}", "timestamp": START + timedelta(seconds=i),
+    })
+
+
+def queries(records):
+    return [r["query"] for r in records]
+
+
+@pytest.mark.parametrize("fetch", [
+    fetch_chat_records,
+    lambda *args: asyncio.run(afetch_chat_records(*args)),
+])
+def test_turns_from_other_processes_are_served(mongo, fetch):
+    session = uuid.uuid4().hex
+    write_turn(mongo, session, 0)
+    assert queries(fetch("u", session, 5)) == ["question 0"]  # buffer filled
+
+    write_turn(mongo, session, 1)
+    assert queries(fetch("u", session, 5)) == ["question 0", "question 1"]
+
+
+def test_chat_cleared_elsewhere_does_not_come_back(mongo):
+    session = uuid.uuid4().hex
+    for i in range(3):
+        write_turn(mongo, session, i)
+    assert len(fetch_chat_records("u", session, 5)) == 3
+
+    mongo["chat_history"].docs.clear()  # clear_chat in another process
+    assert fetch_chat_records("u", session, 5) == []
+
+
+def test_buffer_serves_own_turns_without_rereading(mongo):
+    session = uuid.uuid4().hex
+    write_turn(mongo, session, 0)
+    fetch_chat_records("u", session, 5)
+    store_chat("u", session, "mine", "reply")
+    mongo_utils.chat_log.flush(key=("u", session))
+
+    reads = []
+    find = mongo["chat_history"].find
+    mongo["chat_history"].find = lambda *args: reads.append(args) or find(*args)
+    assert queries(fetch_chat_records("u", session, 5)) == ["question 0", "mine"]
+    assert len(reads) == 1  # only the newest-turn check
+
+
+def test_summary_saved_elsewhere_is_served(mongo):
+    session = uuid.uuid4().hex
+    assert mongo_utils.fetch_summary("u", session)["summary"] == ""
+
+    mongo["chat_summaries"].docs.append({  # folded by another process
+        "user_id": "u", "session_id": session, "summary": "earlier turns", "summarized_until": START,
+    })
+    assert mongo_utils.fetch_summary("u", session)["summary"] == "earlier turns"
+    assert asyncio.run(mongo_utils.afetch_summary("u", session))["summary"] == "earlier turns"
@@ -0,0 +1,138 @@
+# tests/test_history_summary.py
+
+import os
+import sys
+import uuid
+import asyncio
+import subprocess
+from datetime import datetime, timedelta
+import pytest
+import utils.mongo_utils as mongo_utils
+from benchmarks.fakes import FakeChatModel, install_fake_mongo
+from utils import history_summary
+from utils.history_summary import afold_history, aget_prompt_history, get_prompt_history
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    monkeypatch.setattr(mongo_utils, "get_collection", mongo_utils.get_collection)
+    monkeypatch.setattr(mongo_utils, "get_async_collection", mongo_utils.get_async_collection)
+    return install_fake_mongo()
+
+
+def add_turns(collections, session_id, count, first=0):
+    for i in range(first, first + count):
+        collections["chat_history"].docs.append({
+            "user_id": "u", "session_id": session_id, "turn_id": f"t{i}",
+            "query": f"question {i}", "response": f"answer {i}", "timestamp": START + timedelta(seconds=i),
+        })
+
+
+def add_summary(collections, session_id, until):
+    collections["chat_summaries"].docs.append({
+        "user_id": "u", "session_id": session_id, "summary": "earlier turns",
+        "summarized_until": START + timedelta(seconds=until), "turns_summarized": until + 1,
+    })
+
+
+def questions(history):
+    return [line for line in history.split("\n") if line.startswith("User: ")]
+
+
+def test_prompt_keeps_every_unsummarized_turn_after_missed_folds(mongo):
+    session = uuid.uuid4().hex
+    window = history_summary._history_window()
+    add_turns(mongo, session, window + 4)
+    add_summary(mongo, session, until=1)  # turns 0-1 folded, the next folds never happened
+
+    summary, history = get_prompt_history("u", session)
+    assert summary == "earlier turns"
+    assert questions(history) == [f"User: question {i}" for i in range(2, window + 4)]
+
+    _, async_history = asyncio.run(aget_prompt_history("u", session))
+    assert async_history == history
+
+
+def test_prompt_reads_only_the_window_when_folds_keep_up(mongo):
+    session = uuid.uuid4().hex
+    add_turns(mongo, session, 20)
+    add_summary(mongo, session, until=15)
+
+    _, history = get_prompt_history("u", session)
+    assert questions(history) == [f"User: question {i}" for i in range(16, 20)]
+
+
+def test_fold_catches_up_on_every_unsummarized_turn(mongo):
+    session = uuid.uuid4().hex
+    turns = mongo_utils.history_cache.max_turns + 5  # more than the history buffer holds
+    add_turns(mongo, session, turns)
+
+    asyncio.run(afold_history(FakeChatModel(answer_tokens=5), "u", session))
+
+    saved = mongo["chat_summaries"].docs[0]
+    verbatim = history_summary.HISTORY_VERBATIM_TURNS
+    assert saved["turns_summarized"] == turns - verbatim
+    assert saved["summarized_until"] == START + timedelta(seconds=turns - verbatim - 1)
+    _, history = get_prompt_history("u", session)
+    assert len(questions(history)) == verbatim
+
+
+def test_fold_waits_for_a_full_window(mongo):
+    session = uuid.uuid4().hex
+    add_turns(mongo, session, history_summary._history_window() - 1)
+
+    asyncio.run(afold_history(FakeChatModel(answer_tokens=5), "u", session))
+    assert mongo["chat_summaries"].docs == []
+
+
+class ClearingChatModel(FakeChatModel):
+    """Clears the chat while the summary is being written."""
+
+    session: tuple = ()
+
+    async def ainvoke(self, *args, **kwargs):
+        mongo_utils.clear_chat(*self.session)
+        return await super().ainvoke(*args, **kwargs)
+
+
+def test_fold_does_not_bring_back_a_cleared_chat(mongo):
+    session = uuid.uuid4().hex
+    add_turns(mongo, session, history_summary._history_window())
+    llm = ClearingChatModel(answer_tokens=5, session=("u", session))
+
+    asyncio.run(afold_history(llm, "u", session))
+    assert mongo["chat_summaries"].docs == []
+    assert get_prompt_history("u", session) == ("", "")
+
+
+def test_summary_saved_during_a_clear_is_removed(mongo):
+    session = uuid.uuid4().hex
+    add_turns(mongo, session, history_summary._history_window())
+    summaries = mongo["chat_summaries"]
+    update = summaries._update
+
+    def clear_then_update(*args):
+        # clear_chat runs after the save checked the turns, before it writes
+        summaries._update = update
+        mongo_utils.clear_chat("u", session)
+        return update(*args)
+
+    summaries._update = clear_then_update
+    asyncio.run(afold_history(FakeChatModel(answer_tokens=5), "u", session))
+    assert summaries.docs == []
+
+
+@pytest.mark.parametrize("env", [
+    {"HISTORY_VERBATIM_TURNS": "8", "SUMMARY_FOLD_EVERY": "3", "HISTORY_BUFFER_TURNS": "10"},
+    {"SUMMARY_FOLD_EVERY": "0"},
+])
+def test_invalid_history_config_fails_at_import(env):
+    result = subprocess.run(
+        [sys.executable, "-c", "import utils.history_summary"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**os.environ, **env}, capture_output=True, text=True,
+    )
+    assert result.returncode != 0
+    assert "ValueError" in result.stderr
@@ -0,0 +1,40 @@
+# tests/test_index_registry.py
+
+import pytest
+from utils.index_registry import IndexRegistry
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / "index.faiss").write_bytes(b"\0" * 1024 * 1024)
+    (tmp_path / "acme").mkdir()
+    (tmp_path / "acme" / "index.faiss").write_bytes(b"\0" * 1024)
+    return tmp_path
+
+
+def test_none_and_empty_namespace_share_the_default_index(root):
+    registry = IndexRegistry(str(root), loader=lambda path: {"path": path}, poll_interval=3600)
+    try:
+        store, _ = registry.snapshot("")
+        assert registry.stats()["memory_mb"] == pytest.approx(1.0)
+        assert registry.snapshot(None)[0] is store
+        assert list(registry._managers) == [None]
+    finally:
+        registry.close()
+
+
+@pytest.mark.parametrize("namespace", [None, "", "acme"])
+def test_failed_first_load_forgets_the_namespace(root, namespace):
+    def loader(path):
+        raise RuntimeError("corrupt index")
+
+    registry = IndexRegistry(str(root), loader=loader, poll_interval=3600)
+    with pytest.raises(RuntimeError):
+        registry.snapshot(namespace)
+    assert registry.stats()["open"] == 0
+
+
+def test_invalid_namespace_is_rejected(root):
+    registry = IndexRegistry(str(root), loader=lambda path: {"path": path})
+    with pytest.raises(ValueError):
+        registry.snapshot("../etc")
@@ -0,0 +1,132 @@
+# tests/test_ingestion_engine.py
+
+import time
+import pytest
+from benchmarks.fakes import FakeEmbeddings, FakeRateLimitError
+from utils.embedding_store import EmbeddingStore, text_hash
+from utils.ingestion_engine import IngestionEngine, is_rate_limited
+
+MODEL = "fake/hash-8"
+
+
+class FailingAfter(FakeEmbeddings):
+    """Embeds `ok_calls` batches, then fails every call (a crash mid-run)."""
+
+    def __init__(self, ok_calls, **kwargs):
+        super().__init__(**kwargs)
+        self.ok_calls = ok_calls
+
+    def embed_documents(self, texts):
+        if self.calls >= self.ok_calls:
+            self.calls += 1
+            raise RuntimeError("connection reset")
+        return super().embed_documents(texts)
+
+
+class RateLimitedOnce(FakeEmbeddings):
+    """Answers the first call with a 429 carrying `retry_after`, then succeeds."""
+
+    def __init__(self, retry_after, **kwargs):
+        super().__init__(**kwargs)
+        self.retry_after = retry_after
+
+    def embed_documents(self, texts):
+        if self.calls == 0:
+            self.calls += 1
+            error = FakeRateLimitError("429 Too Many Requests")
+            error.retry_after = self.retry_after
+            raise error
+        return super().embed_documents(texts)
+
+
+def make_engine(embeddings, store, **kwargs):
+    options = dict(batch_size=10, concurrency=1, max_retries=3, base_delay=0.001, max_delay=0.01, progress=None)
+    options.update(kwargs)
+    return IngestionEngine(embeddings, store, MODEL, **options)
+
+
+def texts(n):
+    return [f"chunk number {i}" for i in range(n)]
+
+
+def test_interrupted_run_resumes_from_the_store(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    corpus = texts(50)
+
+    with pytest.raises(RuntimeError):
+        make_engine(FailingAfter(ok_calls=2, dim=8), store, max_retries=1).embed_all(corpus)
+    assert store.count(MODEL) == 20  # the two finished batches were checkpointed
+
+    # A new process: reopen the store and run again
+    resumed = FakeEmbeddings(dim=8)
+    stats = make_engine(resumed, EmbeddingStore(str(tmp_path))).embed_all(corpus)
+
+    assert stats["skipped"] == 20
+    assert stats["done"] == 30
+    assert resumed.texts_embedded == 30
+    vectors = EmbeddingStore(str(tmp_path)).get_many(MODEL, [text_hash(t) for t in corpus])
+    assert len(vectors) == 50
+    assert vectors[text_hash(corpus[0])] == pytest.approx(FakeEmbeddings(dim=8).embed_query(corpus[0]))
+
+
+def test_completed_run_embeds_nothing_again(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    make_engine(FakeEmbeddings(dim=8), store).embed_all(texts(25))
+
+    again = FakeEmbeddings(dim=8)
+    stats = make_engine(again, store).embed_all(texts(25) + texts(25))  # duplicates are skipped too
+
+    assert stats == {**stats, "done": 0, "total": 0, "skipped": 25}
+    assert again.calls == 0
+
+
+def test_rate_limit_pauses_for_retry_after(tmp_path):
+    embeddings = RateLimitedOnce(retry_after=0.2, dim=8)
+    start = time.monotonic()
+    stats = make_engine(embeddings, EmbeddingStore(str(tmp_path))).embed_all(texts(5))
+
+    assert time.monotonic() - start >= 0.2
+    assert stats["done"] == 5
+    assert embeddings.calls == 2
+
+
+def test_rate_limited_batches_back_off_and_finish(tmp_path):
+    embeddings = FakeEmbeddings(dim=8, rate_limit_rate=0.5, seed=3)
+    engine = make_engine(embeddings, EmbeddingStore(str(tmp_path)), concurrency=4, max_retries=20)
+
+    stats = engine.embed_all(texts(200))
+
+    assert stats["done"] == 200
+    assert embeddings.calls > 20  # some of the 20 batches were retried
+    assert embeddings.texts_embedded == 200
+
+
+def test_backoff_gives_up_after_max_retries(tmp_path):
+    embeddings = FakeEmbeddings(dim=8, rate_limit_rate=1.0)
+    engine = make_engine(embeddings, EmbeddingStore(str(tmp_path)), max_retries=3)
+
+    with pytest.raises(FakeRateLimitError):
+        engine.embed_all(texts(5))
+    assert embeddings.calls == 3
+
+
+def test_backoff_delay_grows_exponentially(tmp_path, monkeypatch):
+    delays = []
+    monkeypatch.setattr("utils.ingestion_engine.time.sleep", delays.append)
+    monkeypatch.setattr("utils.ingestion_engine.random.random", lambda: 1.0)  # no jitter
+    engine = make_engine(FailingAfter(ok_calls=0, dim=8), EmbeddingStore(str(tmp_path)),
+                         max_retries=4, base_delay=1.0, max_delay=3.0)
+
+    with pytest.raises(RuntimeError):
+        engine.embed_all(texts(3))
+    assert delays == [1.0, 2.0, 3.0]
+
+
+@pytest.mark.parametrize("error, expected", [
+    (FakeRateLimitError("slow down"), True),
+    (RuntimeError("HTTP 429: Too Many Requests"), True),
+    (RuntimeError("rate limit exceeded"), True),
+    (RuntimeError("connection reset"), False),
+])
+def test_is_rate_limited(error, expected):
+    assert is_rate_limited(error) is expected
@@ -0,0 +1,38 @@
+# tests/test_metrics.py
+
+import json
+from utils import metrics
+from utils.metrics import MetricsRegistry, render_workers
+
+
+def worker_registry(requests, seconds):
+    registry = MetricsRegistry()
+    registry.counter("rag_requests_total", "requests").inc(requests, stage="chat")
+    for value in seconds:
+        registry.histogram("rag_stage_duration_seconds", "stage time").observe(value, stage="chat")
+    return registry
+
+
+def test_scrape_sums_every_worker(tmp_path, monkeypatch):
+    # Another worker's last dump
+    other = worker_registry(3, [0.002, 0.3])
+    (tmp_path / "worker-1.json").write_text(json.dumps(other.state()))
+    # This worker, dumped on scrape
+    monkeypatch.setattr(metrics, "registry", worker_registry(2, [0.002]))
+
+    text = render_workers(str(tmp_path))
+    assert 'rag_requests_total{stage="chat"} 5' in text
+    assert 'rag_stage_duration_seconds_count{stage="chat"} 3' in text
+    assert 'rag_stage_duration_seconds_bucket{stage="chat",le="0.0025"} 2' in text
+
+
+def test_unreadable_dump_is_skipped(tmp_path, monkeypatch):
+    (tmp_path / "worker-1.json").write_text("{not json")
+    monkeypatch.setattr(metrics, "registry", worker_registry(2, []))
+    assert 'rag_requests_total{stage="chat"} 2' in render_workers(str(tmp_path))
+
+
+def test_without_a_directory_only_this_worker_is_rendered(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", "")
+    monkeypatch.setattr(metrics, "registry", worker_registry(1, []))
+    assert render_workers() == metrics.registry.render()
@@ -0,0 +1,95 @@
+# tests/test_streaming.py
+
+import asyncio
+from types import SimpleNamespace
+import pytest
+import rag_pipeline
+import utils.mongo_utils as mongo_utils
+
+TOKENS = ["Paris ", "is ", "the ", "capital."]
+
+
+class FakeChain:
+    """Prompt | LLM stand-in that streams TOKENS."""
+
+    def stream(self, inputs):
+        for token in TOKENS:
+            yield SimpleNamespace(content=token)
+
+    async def astream(self, inputs):
+        for token in TOKENS:
+            await asyncio.sleep(0)
+            yield SimpleNamespace(content=token)
+
+
+def fake_turn(*args):
+    return {
+        "turn_id": "t1", "user_id": "u", "session_id": "s", "query": "capital of France?",
+        "cached_answer": None, "docs": [], "inputs": {},
+    }
+
+
+async def afake_turn(*args):
+    return fake_turn()
+
+
+@pytest.fixture
+def finished(monkeypatch):
+    calls = []
+
+    async def afinish_turn(turn, answer, complete=True):
+        calls.append((answer, complete))
+
+    monkeypatch.setattr(rag_pipeline, "get_chain", lambda: FakeChain())
+    monkeypatch.setattr(rag_pipeline, "prepare_turn", fake_turn)
+    monkeypatch.setattr(rag_pipeline, "aprepare_turn", afake_turn)
+    monkeypatch.setattr(rag_pipeline, "finish_turn", lambda turn, answer, complete=True: calls.append((answer, complete)))
+    monkeypatch.setattr(rag_pipeline, "afinish_turn", afinish_turn)
+    monkeypatch.setattr(rag_pipeline, "run_in_background", asyncio.run)
+    return calls
+
+
+def test_complete_stream_is_stored_once(finished):
+    assert "".join(rag_pipeline.stream_rag_response("q", "s", "u")) == "".join(TOKENS)
+    assert finished == [("".join(TOKENS), True)]
+
+
+def test_interrupted_stream_stores_the_partial_answer(finished):
+    tokens = rag_pipeline.stream_rag_response("q", "s", "u")
+    assert [next(tokens), next(tokens)] == TOKENS[:2]
+    tokens.close()  # Streamlit rerun
+    assert finished == [("Paris is ", False)]
+
+
+def test_stream_closed_before_any_token_stores_nothing(finished):
+    tokens = rag_pipeline.stream_rag_response("q", "s", "u")
+    tokens.close()
+    assert finished == []
+
+
+def test_async_stream_stores_the_partial_answer_on_disconnect(finished, monkeypatch):
+    pending = []
+    monkeypatch.setattr(rag_pipeline, "run_in_background", pending.append)
+
+    async def consume():
+        tokens = rag_pipeline.astream_rag_response("q", "s", "u")
+        assert await anext(tokens) == TOKENS[0]
+        await tokens.aclose()  # client disconnected
+
+    asyncio.run(consume())
+    assert len(pending) == 1
+    asyncio.run(pending[0])
+    assert finished == [("Paris ", False)]
+
+
+def test_partial_answers_are_stored_but_not_cached(monkeypatch):
+    cached, stored, background = [], [], []
+    monkeypatch.setattr(rag_pipeline, "_cache_answer", lambda turn, answer: cached.append(answer))
+    monkeypatch.setattr(mongo_utils, "store_chat", lambda *args, **kwargs: stored.append(args[3]))
+    monkeypatch.setattr(rag_pipeline, "get_llm", lambda: None)
+    monkeypatch.setattr(rag_pipeline, "run_in_background", lambda coro: background.append(coro.close()))
+
+    rag_pipeline.finish_turn(fake_turn(), "Paris is ", complete=False)
+    rag_pipeline.finish_turn(fake_turn(), "Paris is the capital.")
+    assert stored == ["Paris is ", "Paris is the capital."]
+    assert cached == ["Paris is the capital."]
@@ -0,0 +1,46 @@
+# tests/test_vector_database.py
+
+import pytest
+from langchain_core.documents import Document
+import vector_database as vd
+from benchmarks.fakes import FakeEmbeddings
+from utils.faiss_index import apply_search_params
+from utils.vectorstore_utils import save_vectorstore
+
+
+def chunks(source, count):
+    return [Document(page_content=f"{source} chunk {i}: " + " ".join(f"w{source}{i}x{j}" for j in range(8)),
+                     metadata={"source": source}) for i in range(count)]
+
+
+def self_retrieval_misses(faiss_db):
+    missed = 0
+    for docstore_id in faiss_db.index_to_docstore_id.values():
+        doc = faiss_db.docstore.search(docstore_id)
+        hit = faiss_db.similarity_search(doc.page_content, k=1)[0]
+        missed += hit.page_content != doc.page_content
+    return missed
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "ivf_sq", "hnsw"])
+def test_deleted_source_keeps_every_other_chunk_retrievable(tmp_path, monkeypatch, index_type):
+    monkeypatch.setattr(vd, "FAISS_INDEX_TYPE", index_type)
+    monkeypatch.setattr(vd, "FAISS_NLIST", 4)
+    embeddings = FakeEmbeddings(dim=32)
+    first, second = chunks("a", 100), chunks("b", 100)
+    ids = [f"a{i}" for i in range(100)] + [f"b{i}" for i in range(100)]
+
+    faiss_db, params = vd.create_vectorstore(first + second, ids, embeddings)
+    assert params["index_type"] == index_type
+    save_vectorstore(faiss_db, str(tmp_path), index=params)
+
+    # Source "a" was deleted; source "b" got one new chunk
+    added = chunks("c", 1)
+    faiss_db, _ = vd.apply_changes(faiss_db, added, ["c0"], ids[:100], embeddings, db_path=str(tmp_path))
+
+    assert sorted(faiss_db.index_to_docstore_id.values()) == sorted(ids[100:] + ["c0"])
+    assert faiss_db.index.ntotal == 101
+    if index_type == "hnsw":
+        return  # approximate: self-retrieval is not guaranteed
+    apply_search_params(faiss_db.index, nprobe=4)  # every list: exact search
+    assert self_retrieval_misses(faiss_db) == 0
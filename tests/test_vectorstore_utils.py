@@ -0,0 +1,65 @@
+# tests/test_vectorstore_utils.py
+
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+import utils.vectorstore_utils as vectorstore_utils
+from benchmarks.fakes import FakeEmbeddings
+from utils.faiss_index import new_faiss_index
+from utils.index_manager import IndexManager
+from utils.vectorstore_utils import VectorstoreChanged, load_vectorstore, save_vectorstore
+
+EMBEDDINGS = FakeEmbeddings(dim=16)
+
+
+def store(texts):
+    faiss_db = FAISS(EMBEDDINGS, new_faiss_index(16, {"index_type": "flat"}), InMemoryDocstore(), {})
+    faiss_db.add_texts(texts, ids=[f"id-{t}" for t in texts])
+    return faiss_db
+
+
+def top_hit(faiss_db, text):
+    return faiss_db.similarity_search(text, k=1)[0].page_content
+
+
+@pytest.fixture
+def half_saved(tmp_path, monkeypatch):
+    """A store whose second save stopped after the file renames, before the manifest."""
+    path = str(tmp_path)
+    save_vectorstore(store(["alpha", "beta"]), path)
+    with monkeypatch.context() as m:
+        m.setattr(vectorstore_utils, "write_vectorstore_meta", lambda *args, **kwargs: None)
+        save_vectorstore(store(["gamma", "delta", "epsilon"]), path)
+    return path
+
+
+def test_saved_store_loads_with_matching_docstore(tmp_path):
+    save_vectorstore(store(["alpha", "beta"]), str(tmp_path))
+    faiss_db = load_vectorstore(str(tmp_path), EMBEDDINGS)
+    assert top_hit(faiss_db, "beta") == "beta"
+
+
+def test_docstore_newer_than_manifest_is_refused(half_saved):
+    with pytest.raises(VectorstoreChanged):
+        load_vectorstore(half_saved, EMBEDDINGS)
+    # Ingestion is the only writer and can always reopen its own store
+    faiss_db = load_vectorstore(half_saved, EMBEDDINGS, writable=True)
+    assert top_hit(faiss_db, "delta") == "delta"
+
+
+def test_manager_retries_a_load_that_raced_a_save(tmp_path, monkeypatch):
+    monkeypatch.setattr("utils.index_manager.LOAD_RETRY_DELAY", 0)
+    path = str(tmp_path)
+    save_vectorstore(store(["alpha", "beta"]), path)
+    attempts = []
+
+    def loader():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise VectorstoreChanged("save in progress")
+        return load_vectorstore(path, EMBEDDINGS)
+
+    manager = IndexManager(path, loader, poll_interval=0)
+    assert top_hit(manager.get(), "alpha") == "alpha"
+    assert len(attempts) == 2
+
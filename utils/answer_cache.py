@@ -0,0 +1,114 @@
+# utils/answer_cache.py
+
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Cache of generated answers keyed by query embedding.
+
+    A new question whose embedding has cosine similarity >= `threshold` with
+    a cached question gets the cached answer back instead of an LLM call.
+    Entries expire after `ttl` seconds, the least recently used entry is
+    evicted past `max_entries`. Each entry belongs to the vectorstore version
+    it was generated from and only matches lookups against that version, so
+    several indexes (namespaces) can share one cache. The first lookup
+    against a new version of an index (`scope`) drops that index's older
+    answers, so they do not hold capacity they can never be hit with.
+    """
+
+    def __init__(self, threshold=0.95, ttl=3600, max_entries=512):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._versions = {}  # scope -> version its latest lookup was made against
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, now):
+        expired = [key for key, entry in self._entries.items() if now - entry["created_at"] > self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    def _switch_version(self, scope, version):
+        if self._versions.get(scope, version) != version:
+            stale = [
+                key for key, entry in self._entries.items()
+                if entry["scope"] == scope and entry["version"] != version
+            ]
+            for key in stale:
+                del self._entries[key]
+        self._versions[scope] = version
+
+    def lookup(self, vector, version, scope=None):
+        """
+        Find a cached answer for a semantically equivalent question.
+
+        Args:
+            vector (list[float]): Embedding of the new question
+            version (hashable): Version of the vectorstore the answer must come from
+            scope (hashable): Index the version belongs to (namespace)
+
+        Returns:
+            dict | None: Entry with "query", "answer" and "docs", or None on a miss
+        """
+        with self._lock:
+            self._expire(time.time())
+            self._switch_version(scope, version)
+            keys = [key for key, entry in self._entries.items() if entry["version"] == version]
+            if not keys:
+                self.misses += 1
+                return None
+
+            matrix = np.vstack([self._entries[key]["vector"] for key in keys])
+            scores = matrix @ self._normalize(vector)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(keys[best])
+            self.hits += 1
+            return self._entries[keys[best]]
+
+    def store(self, query, vector, answer, docs, version, scope=None):
+        """
+        Remember an answer generated against the given vectorstore version.
+
+        Answers from a version the scope has already moved past are not kept.
+        """
+        with self._lock:
+            if self._versions.get(scope, version) != version:
+                return
+            self._entries[self._next_id] = {
+                "query": query,
+                "vector": self._normalize(vector),
+                "answer": answer,
+                "docs": docs,
+                "version": version,
+                "scope": scope,
+                "created_at": time.time(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -0,0 +1,71 @@
+# utils/async_utils.py
+
+import atexit
+import asyncio
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+_background_tasks = set()
+
+
+def get_shared_loop():
+    """Return the process-wide event loop used by sync wrappers, starting it on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-utils-loop", daemon=True).start()
+        return _loop
+
+
+def run_sync(coro, timeout=None):
+    """
+    Run a coroutine on the shared event loop and block until it finishes.
+
+    Using one long-lived loop (instead of `asyncio.run` per call) keeps async
+    clients and background tasks alive between calls.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_shared_loop()).result(timeout)
+
+
+def run_in_background(coro):
+    """
+    Schedule a coroutine on the running loop without awaiting it.
+
+    Called from synchronous code (no running loop), the coroutine goes to
+    the shared loop instead. A reference is kept until the task is done so
+    it is not garbage collected mid-flight, and failures are logged instead
+    of lost.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        get_shared_loop().call_soon_threadsafe(run_in_background, coro)
+        return None
+    task = loop.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_done)
+    return task
+
+
+def _on_background_done(task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[⚠️] Background task failed: {task.exception()}")
+
+
+async def _wait_for_background():
+    pending = [t for t in _background_tasks if t.get_loop() is asyncio.get_running_loop()]
+    if pending:
+        await asyncio.wait(pending, timeout=10)
+
+
+@atexit.register
+def _drain_shared_loop():
+    # Let background writes scheduled from sync callers finish before exit
+    if _loop is not None and _loop.is_running():
+        try:
+            asyncio.run_coroutine_threadsafe(_wait_for_background(), _loop).result(15)
+        except Exception:
+            pass
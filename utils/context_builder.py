@@ -0,0 +1,127 @@
+# utils/context_builder.py
+
+from langchain_core.documents import Document
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def _text_overlap(a: str, b: str, min_overlap=30, max_overlap=400) -> int:
+    """Length of the longest suffix of `a` that is also a prefix of `b`."""
+    for size in range(min(len(a), len(b), max_overlap), min_overlap - 1, -1):
+        if a.endswith(b[:size]):
+            return size
+    return 0
+
+
+def _merge_into(blocks, text, start):
+    """Fold `text` into an overlapping block of the same source; return that block or None."""
+    for block in blocks:
+        if text in block["text"]:
+            return block
+        if start is not None and block["start"] is not None:
+            end = block["start"] + len(block["text"])
+            # Trust the offsets only when the text really overlaps where they say
+            if block["start"] <= start <= end and block["text"].endswith(text[:end - start]):
+                block["text"] += text[end - start:]
+                return block
+        # No (or inconsistent) offsets: match text overlap both ways
+        overlap = _text_overlap(block["text"], text)
+        if overlap:
+            block["text"] += text[overlap:]
+            return block
+        overlap = _text_overlap(text, block["text"])
+        if overlap:
+            block["text"] = text + block["text"][overlap:]
+            return block
+    return None
+
+
+def merge_overlapping(docs_with_scores):
+    """
+    Merge chunks from the same source whose text overlaps or repeats.
+
+    Chunks with a `start_index` are merged by character span when their text
+    agrees with it; older chunks without one, or with offsets that do not
+    line up, fall back to suffix/prefix text matching. Each merged block
+    keeps the best (lowest) score of its parts.
+
+    Args:
+        docs_with_scores (list[tuple[Document, float]]): Candidates, best first
+
+    Returns:
+        list[tuple[Document, float, int]]: Merged blocks, best first, with the
+        estimated token count of the chunks that went into each block
+    """
+    by_source = {}
+    for rank, (doc, score) in enumerate(docs_with_scores):
+        by_source.setdefault(doc.metadata.get("source"), []).append((rank, doc, score))
+
+    blocks = []
+    for items in by_source.values():
+        items.sort(key=lambda item: (item[1].metadata.get("start_index", float("inf")), item[0]))
+        source_blocks = []
+        for rank, doc, score in items:
+            text = doc.page_content
+            start = doc.metadata.get("start_index")
+            block = _merge_into(source_blocks, text, start)
+            if block is None:
+                block = {"text": text, "start": start, "rank": rank, "score": score,
+                         "raw_tokens": 0, "metadata": dict(doc.metadata)}
+                source_blocks.append(block)
+            block["raw_tokens"] += estimate_tokens(text)
+            block["rank"] = min(block["rank"], rank)
+            block["score"] = min(block["score"], score)
+        blocks.extend(source_blocks)
+
+    blocks.sort(key=lambda block: block["rank"])
+    return [
+        (Document(page_content=b["text"], metadata=b["metadata"]), b["score"], b["raw_tokens"])
+        for b in blocks
+    ]
+
+
+def build_context(candidates, k=4, token_budget=3000, chat_history="", min_context_tokens=500):
+    """
+    Assemble the prompt context from retrieval candidates within a token budget.
+
+    Candidates are merged/deduplicated first, then up to `k` blocks are
+    packed into the budget. The budget is shared with the chat history:
+    whatever the history uses is taken off the context budget (but the
+    context always gets at least `min_context_tokens`).
+
+    Args:
+        candidates (list[tuple[Document, float]]): Retrieved (doc, score) pairs, best first
+        k (int): Maximum number of context blocks
+        token_budget (int): Tokens for context + chat history together
+        chat_history (str): Formatted history that shares the budget
+        min_context_tokens (int): Floor for the context part
+
+    Returns:
+        tuple: (context string, docs used, stats dict with "context_tokens",
+        "raw_tokens" (the same chunks joined as-is) and "tokens_saved")
+    """
+    budget = max(min_context_tokens, token_budget - estimate_tokens(chat_history))
+
+    parts, docs, used, raw = [], [], 0, 0
+    for doc, _, raw_tokens in merge_overlapping(candidates)[:k]:
+        tokens = estimate_tokens(doc.page_content)
+        if used + tokens > budget:
+            remaining = budget - used
+            if remaining >= 100:
+                # Partially include the block rather than leave the budget unused
+                doc = Document(page_content=doc.page_content[:remaining * 4], metadata=doc.metadata)
+                parts.append(doc.page_content)
+                docs.append(doc)
+                used += remaining
+                raw += raw_tokens
+            break
+        parts.append(doc.page_content)
+        docs.append(doc)
+        used += tokens
+        raw += raw_tokens
+
+    stats = {"context_tokens": used, "raw_tokens": raw, "tokens_saved": raw - used}
+    return "\n\n".join(parts), docs, stats
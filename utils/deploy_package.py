@@ -0,0 +1,206 @@
+# utils/deploy_package.py
+
+import os
+import gzip
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from utils.metrics import span
+
+# What a deployment ships (.env never leaves the machine)
+DEPLOY_FILES = ["frontend.py", "api.py", "requirements.txt", "rag_pipeline.py", "vector_database.py", "README.md"]
+DEPLOY_FOLDERS = ["vectorstore", "agents", "utils"]
+
+# Vectorstore files at least this large are pushed gzip-compressed and
+# unpacked by the app at startup (0 = never compress)
+DEPLOY_COMPRESS_MIN_MB = float(os.getenv("DEPLOY_COMPRESS_MIN_MB", "1"))
+COMPRESSED_DIRS = ("vectorstore",)
+PACKED_SUFFIX = ".gz"
+
+# Kept in the staging repo, never committed: source path -> hash of the last deployed content
+DEPLOY_MANIFEST = ".deploy_manifest.json"
+
+_HASH_BLOCK = 1024 * 1024
+
+
+@contextmanager
+def timed_phase(timings, name):
+    """
+    Time one deployment phase into `timings[name]` (seconds) and the `deploy_<name>` metric.
+
+    Usage:
+        with timed_phase(timings, "push"):
+            push(...)
+    """
+    start = time.perf_counter()
+    try:
+        with span(f"deploy_{name}"):
+            yield
+    finally:
+        timings[name] = round(time.perf_counter() - start, 3)
+
+
+def format_timings(timings) -> str:
+    """One-line summary of phase timings, e.g. "package 0.41s · push 2.3s"."""
+    return " · ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+
+
+def file_sha256(path) -> str:
+    """Hash of a file's content, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_deploy_files(source_dir=".", files=None, folders=None):
+    """
+    Relative paths (with "/") of every file a deployment ships.
+
+    Caches, bytecode and hidden files (temporary index writes, locks) are skipped.
+    """
+    files = DEPLOY_FILES if files is None else files
+    folders = DEPLOY_FOLDERS if folders is None else folders
+    paths = [f for f in files if os.path.isfile(os.path.join(source_dir, f))]
+    for folder in folders:
+        for root, dirs, names in os.walk(os.path.join(source_dir, folder)):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__" and not d.startswith("."))
+            for name in sorted(names):
+                if name.startswith(".") or name.endswith((".pyc", ".pyo")):
+                    continue
+                full_path = os.path.join(root, name)
+                paths.append(os.path.relpath(full_path, source_dir).replace(os.sep, "/"))
+    return paths
+
+
+def packed_name(rel_path, size) -> str:
+    """Name a file has in the deployed repo: `<path>.gz` for large vectorstore files, else unchanged."""
+    if (
+        DEPLOY_COMPRESS_MIN_MB
+        and rel_path.split("/", 1)[0] in COMPRESSED_DIRS
+        and size >= DEPLOY_COMPRESS_MIN_MB * 1024 * 1024
+    ):
+        return rel_path + PACKED_SUFFIX
+    return rel_path
+
+
+def _compress(src, dest):
+    # mtime=0 and no file name in the header: the same content always gives
+    # the same bytes, so git sees an unchanged blob
+    with open(src, "rb") as f_in, open(dest, "wb") as raw:
+        with gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0, compresslevel=6) as f_out:
+            shutil.copyfileobj(f_in, f_out, _HASH_BLOCK)
+
+
+def _load_manifest(staging_dir):
+    path = os.path.join(staging_dir, DEPLOY_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(staging_dir, manifest):
+    fd, tmp_path = tempfile.mkstemp(dir=staging_dir, prefix=".deploy-manifest-", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(staging_dir, DEPLOY_MANIFEST))
+
+
+def package_files(source_dir, staging_dir, tracked=(), files=None, folders=None) -> dict:
+    """
+    Bring the staging repo in line with the source tree, touching only what changed.
+
+    Every shipped file is identified by the SHA-256 of its content (re-hashed
+    only when its size or mtime moved). Files whose hash matches the last
+    deployment are left alone; changed ones are copied, or compressed when
+    they are large vectorstore artifacts; files that are no longer shipped
+    are deleted.
+
+    Args:
+        source_dir (str): Project root to deploy
+        staging_dir (str): Working tree of the deployment repo
+        tracked (iterable[str]): Files the staging repo already tracks (found stale if not shipped anymore)
+        files (list[str]): Top-level files to ship (DEPLOY_FILES by default)
+        folders (list[str]): Folders to ship (DEPLOY_FOLDERS by default)
+
+    Returns:
+        dict: "changed" and "removed" (repo paths to stage), "unchanged" count and "bytes_written"
+    """
+    previous = _load_manifest(staging_dir)
+    manifest, changed, unchanged, bytes_written = {}, [], 0, 0
+
+    for rel_path in list_deploy_files(source_dir, files, folders):
+        src = os.path.join(source_dir, rel_path)
+        stat = os.stat(src)
+        entry = previous.get(rel_path)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            sha = entry["sha256"]  # untouched since it was last hashed
+        else:
+            sha = file_sha256(src)
+
+        packed = packed_name(rel_path, stat.st_size)
+        dest = os.path.join(staging_dir, packed)
+        if entry and entry["sha256"] == sha and entry["packed"] == packed and os.path.exists(dest):
+            unchanged += 1
+        else:
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            if packed != rel_path:
+                _compress(src, dest)
+            else:
+                shutil.copyfile(src, dest)
+            bytes_written += os.path.getsize(dest)
+            changed.append(packed)
+        manifest[rel_path] = {
+            "sha256": sha, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "packed": packed
+        }
+
+    # Anything deployed before (tracked, or in the old manifest) that is not shipped now
+    shipped = {entry["packed"] for entry in manifest.values()}
+    candidates = set(tracked) | {entry["packed"] for entry in previous.values()}
+    removed = sorted(p for p in candidates - shipped if p != ".gitignore")
+    for rel_path in removed:
+        dest = os.path.join(staging_dir, rel_path)
+        if os.path.exists(dest):
+            os.remove(dest)
+
+    _save_manifest(staging_dir, manifest)
+    return {"changed": changed, "removed": removed, "unchanged": unchanged, "bytes_written": bytes_written}
+
+
+def unpack_artifacts(root) -> int:
+    """
+    Decompress the `*.gz` vectorstore files of a deployment next to themselves.
+
+    Called by the app before it opens its indexes; a file is only unpacked
+    when its decompressed copy is missing or older than the archive.
+
+    Args:
+        root (str): Vectorstore root
+
+    Returns:
+        int: Number of files unpacked
+    """
+    unpacked = 0
+    if not os.path.isdir(root):
+        return unpacked
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if not name.endswith(PACKED_SUFFIX):
+                continue
+            packed = os.path.join(dirpath, name)
+            target = packed[: -len(PACKED_SUFFIX)]
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(packed):
+                continue
+            fd, tmp_path = tempfile.mkstemp(dir=dirpath, prefix=".unpack-")
+            with os.fdopen(fd, "wb") as f_out, gzip.open(packed, "rb") as f_in:
+                shutil.copyfileobj(f_in, f_out, _HASH_BLOCK)
+            os.replace(tmp_path, target)
+            unpacked += 1
+    if unpacked:
+        print(f"[📦] Unpacked {unpacked} compressed vectorstore file(s) in {root}")
+    return unpacked
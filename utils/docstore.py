@@ -0,0 +1,192 @@
+# utils/docstore.py
+
+import re
+import json
+import sqlite3
+import threading
+from collections.abc import Mapping
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore, AddableMixin
+
+DOCSTORE_FILE = "docs.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS id_map (pos INTEGER PRIMARY KEY, doc_id TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+    text, content='docs', content_rowid='rowid', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS docs_ai AFTER INSERT ON docs BEGIN
+    INSERT INTO docs_fts (rowid, text) VALUES (new.rowid, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_ad AFTER DELETE ON docs BEGIN
+    INSERT INTO docs_fts (docs_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_au AFTER UPDATE ON docs BEGIN
+    INSERT INTO docs_fts (docs_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+    INSERT INTO docs_fts (rowid, text) VALUES (new.rowid, new.text);
+END;
+"""
+
+# Upsert rather than INSERT OR REPLACE: REPLACE deletes without firing docs_ad
+_UPSERT = """
+INSERT INTO docs (id, text, metadata) VALUES (?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET text = excluded.text, metadata = excluded.metadata
+"""
+
+
+def fts_query(text: str, match_all=False) -> str:
+    """
+    Turn free text into an FTS5 MATCH expression: any (or, with
+    `match_all`, every one) of the query's terms.
+
+    Each whitespace-separated term is quoted, so punctuation inside product
+    names or error codes ("ERR-1042", "v2.3") is matched as a phrase instead
+    of being parsed as FTS syntax.
+    """
+    terms = []
+    for term in text.split():
+        term = term.strip(".,;:!?()[]{}'\"")
+        if re.search(r"\w", term):
+            terms.append('"' + term.replace('"', '""') + '"')
+    return (" AND " if match_all else " OR ").join(terms)
+
+
+def write_docstore(db_path, faiss_db, version=None):
+    """
+    Write every chunk of `faiss_db` plus its FAISS row -> docstore id map to a new SQLite file.
+
+    The BM25 full-text index over the chunks (`docs_fts`) is filled by
+    triggers as the rows go in, so it always matches the FAISS index.
+
+    Args:
+        db_path (str): File to create (must not exist yet)
+        faiss_db (FAISS): Vectorstore whose docstore is exported
+        version (str): Vectorstore version the file belongs to (checked by the loader)
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(_SCHEMA)
+        if version:
+            conn.execute("INSERT INTO store_meta (key, value) VALUES ('version', ?)", (version,))
+        rows = sorted(faiss_db.index_to_docstore_id.items())
+        conn.executemany("INSERT INTO id_map (pos, doc_id) VALUES (?, ?)", rows)
+        docs = ((doc_id, faiss_db.docstore.search(doc_id)) for _, doc_id in rows)
+        conn.executemany(_UPSERT, ((doc_id, doc.page_content, json.dumps(doc.metadata)) for doc_id, doc in docs))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    Docstore that reads chunks from SQLite on demand.
+
+    Opening it costs the same regardless of corpus size: only the k
+    documents a search returns are ever read. The same file holds an FTS5
+    index of the chunks for BM25 keyword search. One connection is shared (under
+    a lock) so the store keeps reading the file it was opened on even after
+    the vectorstore is replaced on disk.
+    """
+
+    def __init__(self, db_path, read_only=True):
+        uri = f"file:{db_path}?mode=ro" if read_only else f"file:{db_path}"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._has_fts = None
+        if not read_only:
+            self._conn.executescript(_SCHEMA)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def search(self, search: str):
+        rows = self._query("SELECT text, metadata FROM docs WHERE id = ?", (search,))
+        if not rows:
+            return f"ID {search} not found."
+        text, metadata = rows[0]
+        return Document(id=search, page_content=text, metadata=json.loads(metadata))
+
+    def add(self, texts: dict) -> None:
+        with self._lock:
+            self._conn.executemany(_UPSERT, ((i, d.page_content, json.dumps(d.metadata)) for i, d in texts.items()))
+            self._conn.commit()
+
+    def delete(self, ids: list) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM docs WHERE id = ?", ((i,) for i in ids))
+            self._conn.commit()
+
+    @property
+    def version(self):
+        """Vectorstore version stamped by `write_docstore` (None for older files)."""
+        rows = self._query("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'store_meta'")
+        if not rows:
+            return None
+        rows = self._query("SELECT value FROM store_meta WHERE key = 'version'")
+        return rows[0][0] if rows else None
+
+    @property
+    def has_lexical_index(self) -> bool:
+        """False for stores written before the full-text index existed."""
+        if self._has_fts is None:
+            rows = self._query("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'docs_fts'")
+            self._has_fts = bool(rows)
+        return self._has_fts
+
+    def lexical_search(self, query: str, k: int = 10, match_all=False):
+        """
+        BM25 keyword search over the chunks.
+
+        Args:
+            query (str): Free-text query
+            k (int): Number of results
+            match_all (bool): Only return chunks containing every term
+
+        Returns:
+            list[tuple[Document, float]]: Best first, with the BM25 score
+            (higher is better); empty if nothing matches
+        """
+        match = fts_query(query, match_all)
+        if not match or not self.has_lexical_index:
+            return []
+        rows = self._query(
+            "SELECT d.id, d.text, d.metadata, bm25(docs_fts) AS rank FROM docs_fts "
+            "JOIN docs d ON d.rowid = docs_fts.rowid WHERE docs_fts MATCH ? ORDER BY rank LIMIT ?",
+            (match, int(k)),
+        )
+        return [
+            (Document(id=doc_id, page_content=text, metadata=json.loads(metadata)), -rank)
+            for doc_id, text, metadata, rank in rows
+        ]
+
+    def id_map(self):
+        """Lazy FAISS row -> docstore id mapping backed by the same connection."""
+        return SQLiteIdMap(self)
+
+
+class SQLiteIdMap(Mapping):
+    """Read-only `index_to_docstore_id` that looks rows up in SQLite instead of holding them all."""
+
+    def __init__(self, docstore):
+        self._docstore = docstore
+
+    def __getitem__(self, pos):
+        rows = self._docstore._query("SELECT doc_id FROM id_map WHERE pos = ?", (int(pos),))
+        if not rows:
+            raise KeyError(pos)
+        return rows[0][0]
+
+    def __len__(self):
+        return self._docstore._query("SELECT COUNT(*) FROM id_map")[0][0]
+
+    def __iter__(self):
+        return (pos for (pos,) in self._docstore._query("SELECT pos FROM id_map ORDER BY pos"))
+
+    def items(self):
+        return self._docstore._query("SELECT pos, doc_id FROM id_map ORDER BY pos")
+
+    def values(self):
+        return [doc_id for (doc_id,) in self._docstore._query("SELECT doc_id FROM id_map ORDER BY pos")]
@@ -0,0 +1,163 @@
+# utils/embedding_cache.py
+
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+from utils.embedding_providers import embed_queries, aembed_queries
+
+
+def normalize_query(text: str) -> str:
+    """Lower-case and collapse whitespace so trivially different queries share a key."""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Two-tier cache in front of an embedding model for query embeddings.
+
+    Lookups go to a bounded in-memory LRU first, then to a SQLite file that
+    survives restarts, and only then to the wrapped model. Document
+    embeddings are passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, max_entries: int = 1024, db_path: str = None):
+        """
+        Args:
+            embeddings (Embeddings): The model to wrap
+            model_name (str): Model identity, part of every cache key
+            max_entries (int): Size of the in-memory LRU tier
+            db_path (str): SQLite file for the persistent tier (None disables it)
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+            )
+            self._db.commit()
+
+    def _key(self, text: str) -> str:
+        raw = f"{self.model_name}\n{normalize_query(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key):
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                return vector
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT vector FROM query_embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    vector = array("f", row[0]).tolist()
+                    self._remember(key, vector)
+                    self.hits_disk += 1
+                    return vector
+            self.misses += 1
+            return None
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _store(self, key, vector):
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (key, vector) VALUES (?, ?)",
+                    (key, array("f", vector).tobytes()),
+                )
+                self._db.commit()
+
+    def embed_query_cached(self, text: str) -> tuple:
+        """Embed a query, also reporting whether the vector came from the cache: (vector, hit)."""
+        key = self._key(text)
+        vector = self._lookup(key)
+        if vector is not None:
+            return vector, True
+        vector = self.embeddings.embed_query(text)
+        self._store(key, vector)
+        return vector, False
+
+    async def aembed_query_cached(self, text: str) -> tuple:
+        """Async `embed_query_cached`."""
+        key = self._key(text)
+        vector = self._lookup(key)
+        if vector is not None:
+            return vector, True
+        vector = await self.embeddings.aembed_query(text)
+        self._store(key, vector)
+        return vector, False
+
+    def _split_cached(self, texts):
+        keys = [self._key(text) for text in texts]
+        vectors = [self._lookup(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        return keys, vectors, missing
+
+    def _fill_missing(self, keys, vectors, missing, embedded):
+        for i, vector in zip(missing, embedded):
+            vectors[i] = vector
+            self._store(keys[i], vector)
+        missing = set(missing)
+        return vectors, [i not in missing for i in range(len(vectors))]
+
+    def embed_queries_cached(self, texts: list) -> tuple:
+        """
+        Embed several queries; the ones not cached go to the model in one batched call.
+
+        Returns:
+            tuple: (list of vectors, list of bools telling which came from the cache)
+        """
+        keys, vectors, missing = self._split_cached(texts)
+        embedded = embed_queries(self.embeddings, [texts[i] for i in missing]) if missing else []
+        return self._fill_missing(keys, vectors, missing, embedded)
+
+    async def aembed_queries_cached(self, texts: list) -> tuple:
+        """Async `embed_queries_cached`."""
+        keys, vectors, missing = self._split_cached(texts)
+        embedded = await aembed_queries(self.embeddings, [texts[i] for i in missing]) if missing else []
+        return self._fill_missing(keys, vectors, missing, embedded)
+
+    def embed_query(self, text: str) -> list:
+        return self.embed_query_cached(text)[0]
+
+    async def aembed_query(self, text: str) -> list:
+        return (await self.aembed_query_cached(text))[0]
+
+    def embed_documents(self, texts: list) -> list:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list) -> list:
+        return await self.embeddings.aembed_documents(texts)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for both tiers."""
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
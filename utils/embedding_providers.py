@@ -0,0 +1,178 @@
+# utils/embedding_providers.py
+
+import os
+import asyncio
+import threading
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+# Which embedding backend indexes and queries use: cohere or local
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "cohere")
+COHERE_EMBEDDING_MODEL = os.getenv("COHERE_EMBEDDING_MODEL", "embed-english-v3.0")  # or embed-multilingual-v3.0
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", "0"))  # 0 = library default
+LOCAL_EMBEDDING_DEVICE = os.getenv("LOCAL_EMBEDDING_DEVICE", "cpu")
+# "" (float32), "int8" (dynamic torch quantization), "onnx" or "onnx-int8" (ONNX Runtime)
+LOCAL_EMBEDDING_QUANTIZE = os.getenv("LOCAL_EMBEDDING_QUANTIZE", "")
+LOCAL_EMBEDDING_ONNX_FILE = os.getenv("LOCAL_EMBEDDING_ONNX_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+PROVIDERS = ("cohere", "local")
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    sentence-transformers model run in-process, so neither queries nor
+    ingestion make a network round-trip.
+
+    Texts are encoded in batches of `batch_size`; `threads` sets the CPU
+    threads used per batch. With `quantize="int8"` the model's linear
+    layers are dynamically quantized to int8; "onnx" runs it on ONNX
+    Runtime and "onnx-int8" loads the quantized ONNX export
+    (`LOCAL_EMBEDDING_ONNX_FILE`) shipped with most sentence-transformers
+    models. The model is loaded on first use.
+    """
+
+    # One in-process model already uses every core; parallel batches only contend
+    max_concurrency = 1
+    # Queries and documents are encoded the same way, so queries can be batched as documents
+    symmetric_queries = True
+
+    def __init__(self, model_name, batch_size=64, threads=0, device="cpu", quantize="", onnx_file=None):
+        if quantize not in ("", "int8", "onnx", "onnx-int8"):
+            raise ValueError(f"Unknown LOCAL_EMBEDDING_QUANTIZE '{quantize}'")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.threads = threads
+        self.device = device
+        self.quantize = quantize
+        self.onnx_file = onnx_file
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load the model now (it is otherwise loaded by the first embedding call)."""
+        with self._lock:
+            if self._model is not None:
+                return self._model
+            import torch
+            from sentence_transformers import SentenceTransformer
+
+            if self.threads:
+                torch.set_num_threads(self.threads)
+            if self.quantize.startswith("onnx"):
+                model_kwargs = {"file_name": self.onnx_file} if self.quantize == "onnx-int8" else None
+                model = SentenceTransformer(
+                    self.model_name, device=self.device, backend="onnx", model_kwargs=model_kwargs
+                )
+            else:
+                model = SentenceTransformer(self.model_name, device=self.device)
+                if self.quantize == "int8":
+                    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            print(f"[✅] Loaded local embedding model {self.model_name} ({self.quantize or 'float32'})")
+            self._model = model
+            return model
+
+    def _encode(self, texts):
+        vectors = self.load().encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        return self._encode(list(texts))
+
+    def embed_query(self, text: str) -> list:
+        return self._encode([text])[0]
+
+
+def embedding_model_id(provider=None) -> str:
+    """
+    Identity of the configured embedding model.
+
+    It keys stored and cached vectors and is stamped into the vectorstore
+    manifest, so an index is never queried with vectors from another model.
+    Cohere ids are the bare model name, as used before providers existed.
+    """
+    provider = provider or EMBEDDING_PROVIDER
+    if provider == "cohere":
+        return COHERE_EMBEDDING_MODEL
+    if provider == "local":
+        suffix = f"+{LOCAL_EMBEDDING_QUANTIZE}" if LOCAL_EMBEDDING_QUANTIZE else ""
+        return f"local/{LOCAL_EMBEDDING_MODEL}{suffix}"
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER '{provider}'. Choose one of {PROVIDERS}")
+
+
+def get_embedding_backend(provider=None) -> Embeddings:
+    """
+    Create the embedding model for `provider` (EMBEDDING_PROVIDER by default).
+
+    Returns:
+        Embeddings: CohereEmbeddings or LocalEmbeddings
+    """
+    provider = provider or EMBEDDING_PROVIDER
+    if provider == "cohere":
+        from langchain_cohere import CohereEmbeddings
+        return CohereEmbeddings(model=COHERE_EMBEDDING_MODEL)
+    if provider == "local":
+        return LocalEmbeddings(
+            LOCAL_EMBEDDING_MODEL,
+            batch_size=LOCAL_EMBEDDING_BATCH_SIZE,
+            threads=LOCAL_EMBEDDING_THREADS,
+            device=LOCAL_EMBEDDING_DEVICE,
+            quantize=LOCAL_EMBEDDING_QUANTIZE,
+            onnx_file=LOCAL_EMBEDDING_ONNX_FILE,
+        )
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER '{provider}'. Choose one of {PROVIDERS}")
+
+
+def embed_queries(backend, texts) -> list:
+    """
+    Embed several queries with one model call where the backend allows it.
+
+    Cohere embeds queries with input_type="search_query", so they cannot go
+    through `embed_documents`; symmetric backends (`symmetric_queries`) can. Other
+    backends get one call per query.
+
+    Args:
+        backend (Embeddings): The embedding model
+        texts (list[str]): Queries
+
+    Returns:
+        list[list[float]]: One vector per query
+    """
+    if getattr(backend, "symmetric_queries", False):
+        return backend.embed_documents(list(texts))
+    if hasattr(backend, "embed"):  # CohereEmbeddings.embed(texts, input_type=...)
+        return backend.embed(list(texts), input_type="search_query")
+    return [backend.embed_query(text) for text in texts]
+
+
+async def aembed_queries(backend, texts) -> list:
+    """Async `embed_queries`."""
+    if getattr(backend, "symmetric_queries", False):
+        return await backend.aembed_documents(list(texts))
+    if hasattr(backend, "aembed"):
+        return await backend.aembed(list(texts), input_type="search_query")
+    return list(await asyncio.gather(*(backend.aembed_query(text) for text in texts)))
+
+
+def check_embedding_model(meta, model_id):
+    """
+    Raise if a vectorstore was built with a different embedding model than `model_id`.
+
+    Args:
+        meta (dict): The vectorstore manifest
+        model_id (str): Identity of the model about to embed queries/chunks
+    """
+    stamped = meta.get("embedding_model")
+    if stamped and stamped != model_id:
+        raise ValueError(
+            f"❌ Vectorstore was built with embedding model '{stamped}' but '{model_id}' is configured. "
+            "Set EMBEDDING_PROVIDER/model back, or delete the vectorstore and ingest again with the new model."
+        )
@@ -0,0 +1,227 @@
+# utils/embedding_store.py
+
+import os
+import re
+import hashlib
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def text_hash(text: str) -> str:
+    """Content hash used as the embedding key of a chunk."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Persistent chunk embeddings keyed by (model name, chunk hash).
+
+    Each model gets a raw row-major matrix file (`<model>.<dtype>.bin`) that
+    is only ever appended to and read through `np.memmap`, plus an
+    append-only offset log (`<model>.<dtype>.idx`, one "hash<TAB>row" line
+    per vector after a "#dim" header). A batch only appends its own rows to
+    both files, so writing stays O(batch) however large the store grows.
+    """
+
+    def __init__(self, path=".cache/embeddings", dtype="float32"):
+        if dtype not in ("float32", "float16"):
+            raise ValueError("dtype must be 'float32' or 'float16'")
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self._models = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _files(self, model):
+        safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", model)
+        base = os.path.join(self.path, safe)
+        return f"{base}.{self.dtype.name}.bin", f"{base}.{self.dtype.name}.idx"
+
+    def _state(self, model):
+        state = self._models.get(model)
+        if state is None:
+            _, log_file = self._files(model)
+            state = {"dim": None, "rows": {}, "matrix": None}
+            if os.path.exists(log_file):
+                state.update(self._read_log(log_file))
+            stored = self._truncate_torn_row(model, state["dim"])
+            # Offsets logged for rows that never reached the data file are dropped
+            state["rows"] = {k: row for k, row in state["rows"].items() if row < stored}
+            self._models[model] = state
+        return state
+
+    @staticmethod
+    def _read_log(log_file):
+        dim, rows, valid = None, {}, 0
+        with open(log_file, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn last line of a crashed append
+                valid += len(line)
+                line = line.decode("utf-8").rstrip("\n")
+                if line.startswith("#dim "):
+                    dim = int(line[5:])
+                    continue
+                key, _, row = line.partition("\t")
+                if row:
+                    rows.setdefault(key, int(row))
+        if valid < os.path.getsize(log_file):
+            os.truncate(log_file, valid)  # so the next append starts on a fresh line
+        return {"dim": dim, "rows": rows}
+
+    @staticmethod
+    def _append_log(log_file, dim, rows, header=False):
+        lines = [f"#dim {dim}\n"] if header else []
+        lines.extend(f"{key}\t{row}\n" for key, row in rows)
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _truncate_torn_row(self, model, dim):
+        # A crash mid-append leaves part of a row at the end of the data file;
+        # appending after it would shift every later vector off its logged
+        # offset. Cut the file back to whole rows (to nothing if no row was
+        # ever logged) and return the row count.
+        data_file, _ = self._files(model)
+        if not os.path.exists(data_file):
+            return 0
+        size = os.path.getsize(data_file)
+        whole = size - size % (dim * self.dtype.itemsize) if dim else 0
+        if whole < size:
+            os.truncate(data_file, whole)
+        return whole // (dim * self.dtype.itemsize) if dim else 0
+
+    def _stored_rows(self, model, dim):
+        # Row count comes from the file size, so rows appended before a crash
+        # (but never indexed) still keep later offsets aligned.
+        data_file, _ = self._files(model)
+        if not os.path.exists(data_file):
+            return 0
+        return os.path.getsize(data_file) // (dim * self.dtype.itemsize)
+
+    def _matrix(self, model, state):
+        n = self._stored_rows(model, state["dim"])
+        matrix = state["matrix"]
+        if matrix is None or matrix.shape[0] < n:
+            data_file, _ = self._files(model)
+            matrix = np.memmap(data_file, dtype=self.dtype, mode="r", shape=(n, state["dim"]))
+            state["matrix"] = matrix
+        return matrix
+
+    def count(self, model) -> int:
+        with self._lock:
+            return len(self._state(model)["rows"])
+
+    def get_many(self, model, keys):
+        """
+        Look up stored vectors.
+
+        Returns:
+            dict: chunk hash -> vector (float32 list) for the keys that are stored
+        """
+        with self._lock:
+            state = self._state(model)
+            found = [(k, state["rows"][k]) for k in keys if k in state["rows"]]
+            if not found:
+                return {}
+            matrix = self._matrix(model, state)
+            return {k: matrix[row].astype(np.float32).tolist() for k, row in found}
+
+    def put_many(self, model, keys, vectors):
+        """Append vectors for keys that are not stored yet and log their offsets."""
+        # Dedupe and convert outside the lock; only the appends are serialized
+        rows, seen = [], set()
+        for key, vector in zip(keys, vectors):
+            if key not in seen:
+                seen.add(key)
+                rows.append((key, vector))
+        if not rows:
+            return 0
+        matrix = np.asarray([v for _, v in rows], dtype=self.dtype)
+
+        with self._lock:
+            state = self._state(model)
+            new = [i for i, (key, _) in enumerate(rows) if key not in state["rows"]]
+            if not new:
+                return 0
+            if len(new) < len(rows):
+                matrix = matrix[new]
+            needs_header = state["dim"] is None
+            if needs_header:
+                state["dim"] = int(matrix.shape[1])
+            elif matrix.shape[1] != state["dim"]:
+                raise ValueError(f"Embedding dim {matrix.shape[1]} != stored dim {state['dim']} for {model}")
+
+            data_file, log_file = self._files(model)
+            start = self._truncate_torn_row(model, state["dim"])  # also after a failed write in this process
+            with open(data_file, "ab") as f:
+                f.write(matrix.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            # Data first, offsets second: a crash in between only loses the tail rows
+            offsets = [(rows[i][0], start + n) for n, i in enumerate(new)]
+            self._append_log(log_file, state["dim"], offsets, header=needs_header)
+            state["rows"].update(offsets)
+            return len(offsets)
+
+    def export(self, out_path, model):
+        """Export every stored vector of `model` to a portable `.npz` file."""
+        with self._lock:
+            state = self._state(model)
+            keys = sorted(state["rows"], key=state["rows"].get)
+            if keys:
+                matrix = np.asarray(self._matrix(model, state))[[state["rows"][k] for k in keys]]
+            else:
+                matrix = np.zeros((0, 0), self.dtype)
+        np.savez_compressed(out_path, model=np.array(model), keys=np.array(keys), vectors=matrix)
+        return len(keys)
+
+    def import_(self, in_path):
+        """
+        Import vectors exported by another deployment.
+
+        Returns:
+            tuple: (model name, number of new vectors added)
+        """
+        with np.load(in_path) as data:
+            model = str(data["model"])
+            keys = [str(k) for k in data["keys"]]
+            vectors = data["vectors"]
+        return model, self.put_many(model, keys, vectors)
+
+
+class StoredEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that reads document vectors from an `EmbeddingStore`
+    before calling the wrapped model, and saves every new vector it computes.
+
+    With `offline=True` the wrapped model is never called and a missing
+    vector raises instead.
+    """
+
+    def __init__(self, embeddings: Embeddings, store: EmbeddingStore, model_name: str, offline: bool = False):
+        self.embeddings = embeddings
+        self.store = store
+        self.model_name = model_name
+        self.offline = offline
+
+    def embed_documents(self, texts: list) -> list:
+        keys = [text_hash(t) for t in texts]
+        found = self.store.get_many(self.model_name, keys)
+        missing = [i for i, k in enumerate(keys) if k not in found]
+        if missing:
+            if self.offline:
+                raise KeyError(f"{len(missing)} chunk embeddings missing from the store for {self.model_name}")
+            vectors = self.embeddings.embed_documents([texts[i] for i in missing])
+            self.store.put_many(self.model_name, [keys[i] for i in missing], vectors)
+            for i, vector in zip(missing, vectors):
+                found[keys[i]] = vector
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> list:
+        if self.offline:
+            raise RuntimeError("Query embedding is not available in offline mode")
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,117 @@
+# utils/faiss_index.py
+
+import math
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq", "ivf_sq")
+
+
+def _faiss():
+    import faiss
+    return faiss
+
+
+def resolve_index_params(index_type, n_vectors, dim, nlist=None, hnsw_m=32, pq_m=16, sq_bits=8):
+    """
+    Pick concrete build parameters for `index_type` given the corpus size.
+
+    Falls back to "flat" when there are too few vectors to train the
+    requested index, so small corpora always get a working (exact) index.
+
+    Returns:
+        dict: {"index_type": ..., plus the parameters used}
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type '{index_type}'. Choose one of {INDEX_TYPES}")
+
+    if index_type == "flat":
+        return {"index_type": "flat"}
+    if index_type == "hnsw":
+        return {"index_type": "hnsw", "hnsw_m": hnsw_m}
+
+    # IVF: ~4*sqrt(n) lists, but keep >= 39 training points per list
+    nlist = nlist or int(4 * math.sqrt(max(n_vectors, 1)))
+    nlist = min(nlist, n_vectors // 39)
+    if nlist < 1:
+        print(f"[⚠️] {n_vectors} vectors are too few to train {index_type}, using a flat index")
+        return {"index_type": "flat"}
+
+    params = {"index_type": index_type, "nlist": nlist}
+    if index_type == "ivf_pq":
+        # 8-bit PQ codebooks have 256 centroids; faiss wants ~39 points per centroid
+        if dim % pq_m or n_vectors < 39 * 256:
+            print(f"[⚠️] ivf_pq needs dim divisible by pq_m ({dim} % {pq_m}) and >= 9984 vectors, using ivf_sq")
+            params["index_type"] = "ivf_sq"
+        else:
+            params["pq_m"] = pq_m
+    if params["index_type"] == "ivf_sq":
+        params["sq_bits"] = sq_bits
+    return params
+
+
+def new_faiss_index(dim, params, train_vectors=None):
+    """
+    Create an empty FAISS index for `params`, trained on `train_vectors` when needed.
+
+    Args:
+        dim (int): Vector dimension
+        params (dict): Output of `resolve_index_params`
+        train_vectors (np.ndarray): Training sample (IVF types only)
+    """
+    faiss = _faiss()
+    index_type = params["index_type"]
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    if index_type == "hnsw":
+        return faiss.IndexHNSWFlat(dim, params["hnsw_m"])
+
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dim, params["nlist"])
+    elif index_type == "ivf_pq":
+        index = faiss.IndexIVFPQ(quantizer, dim, params["nlist"], params["pq_m"], 8)
+    else:
+        qtype = faiss.ScalarQuantizer.QT_4bit if params.get("sq_bits") == 4 else faiss.ScalarQuantizer.QT_8bit
+        index = faiss.IndexIVFScalarQuantizer(quantizer, dim, params["nlist"], qtype)
+
+    index.train(np.ascontiguousarray(train_vectors, dtype=np.float32))
+    return index
+
+
+def training_sample(vectors, sample_size=50000, seed=0):
+    """Random subset of `vectors` used to train IVF/PQ/SQ indexes."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if len(vectors) <= sample_size:
+        return vectors
+    rows = np.random.default_rng(seed).choice(len(vectors), sample_size, replace=False)
+    return vectors[rows]
+
+
+def supports_remove(index_type) -> bool:
+    """
+    Only flat indexes delete vectors in place.
+
+    HNSW graphs cannot delete at all, and IVF `remove_ids` leaves the
+    remaining vectors under their old labels while LangChain renumbers its
+    id map 0..n-1, so every later hit would point at the wrong chunk.
+    Those indexes are rebuilt instead.
+    """
+    return index_type == "flat"
+
+
+def mmap_io_flags(index_type) -> int:
+    """Read-only memory-mapping flags for `faiss.read_index` that work for `index_type`."""
+    faiss = _faiss()
+    if index_type.startswith("ivf"):
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def apply_search_params(index, nprobe=None, ef_search=None):
+    """Set search-time knobs (IVF nprobe, HNSW efSearch) on a loaded index."""
+    faiss = _faiss()
+    space = faiss.ParameterSpace()
+    if nprobe and faiss.try_extract_index_ivf(index) is not None:
+        space.set_index_parameter(index, "nprobe", int(nprobe))
+    if ef_search and hasattr(index, "hnsw"):
+        space.set_index_parameter(index, "efSearch", int(ef_search))
@@ -3,7 +3,6 @@
 import requests
 import os
 import subprocess
-import shutil
 
 def create_github_repo(repo_name):
     token = os.getenv("GITHUB_TOKEN")
@@ -31,44 +30,105 @@ def create_github_repo(repo_name):
         raise Exception(f"GitHub repo creation failed: {response.json()}")
 
 
-def commit_and_push_changes(repo_url: str, repo_name="xalt-chatbot-repo"):
-    if not os.path.exists(repo_name):
-        os.makedirs(repo_name)
+class GitError(Exception):
+    pass
 
-    # Files and folders to copy
-    files_to_include = ["frontend.py", "requirements.txt", ".env", "rag_pipeline.py", "vector_database.py", "README.md"]
-    folders_to_include = ["vectorstore", "agents", "utils"]
 
-    # Copy files
-    for f in files_to_include:
-        if os.path.exists(f):
-            shutil.copy(f, repo_name)
+def run_git(args, cwd, check=True) -> subprocess.CompletedProcess:
+    """
+    Run a git command in `cwd`.
 
-    # Copy folders
-    for d in folders_to_include:
-        if os.path.exists(d):
-            if os.path.isdir(d):
-                shutil.copytree(d, os.path.join(repo_name, d), dirs_exist_ok=True)
-            else:
-                shutil.copy(d, os.path.join(repo_name, d))
+    Raises:
+        GitError: If it exits non-zero (with git's own error message) and `check` is set
+    """
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+    if check and result.returncode != 0:
+        message = (result.stderr or result.stdout).strip()
+        raise GitError(f"git {args[0]} failed ({result.returncode}): {message}")
+    return result
 
-    # Move into the repo directory
-    os.chdir(repo_name)
 
-    # Write .gitignore to exclude .env
-    with open(".gitignore", "w") as f:
-        f.write(".env\n")
+def prepare_staging_repo(staging_dir, repo_url, branch="main") -> list:
+    """
+    Make `staging_dir` a clone-like working tree of `repo_url` that can push incrementally.
 
-    # Initialize Git and commit
-    subprocess.run(["git", "init"])
-    subprocess.run(["git", "remote", "add", "origin", repo_url])
-    subprocess.run(["git", "checkout", "-b", "main"])
+    A staging repo kept from the last deployment is reused as is. Otherwise
+    the remote branch, if it exists, is fetched (shallow), so only files
+    that differ from it are pushed.
 
-    # Stage everything except .env
-    subprocess.run(["git", "add", "."])
-    subprocess.run(["git", "rm", "--cached", ".env"], stderr=subprocess.DEVNULL)  # In case it was staged
-
-    subprocess.run(["git", "commit", "-m", "Initial commit without secrets"])
-    subprocess.run(["git", "push", "-u", "origin", "main"])
-
-    print("[✅] Code pushed to GitHub without .env file")
+    Returns:
+        list[str]: Files the staging repo currently tracks
+    """
+    os.makedirs(staging_dir, exist_ok=True)
+    if not os.path.isdir(os.path.join(staging_dir, ".git")):
+        run_git(["init"], staging_dir)
+        run_git(["symbolic-ref", "HEAD", f"refs/heads/{branch}"], staging_dir)
+    if run_git(["remote", "get-url", "origin"], staging_dir, check=False).returncode == 0:
+        run_git(["remote", "set-url", "origin", repo_url], staging_dir)
+    else:
+        run_git(["remote", "add", "origin", repo_url], staging_dir)
+    if run_git(["config", "user.email"], staging_dir, check=False).returncode != 0:
+        run_git(["config", "user.email", os.getenv("DEPLOY_GIT_EMAIL", "deploy@xalt.local")], staging_dir)
+        run_git(["config", "user.name", os.getenv("DEPLOY_GIT_NAME", "Xalt Deploy")], staging_dir)
+
+    has_commits = run_git(["rev-parse", "--verify", "-q", "HEAD"], staging_dir, check=False).returncode == 0
+    if not has_commits and run_git(["ls-remote", "--heads", "origin", branch], staging_dir).stdout.strip():
+        run_git(["fetch", "--depth", "1", "origin", branch], staging_dir)
+        run_git(["reset", "--mixed", "FETCH_HEAD"], staging_dir)
+    return run_git(["ls-files", "-z"], staging_dir).stdout.split("\0")[:-1]
+
+
+def commit_and_push_changes(repo_url: str, repo_name="xalt-chatbot-repo", source_dir=".",
+                            message="Update chatbot", branch="main") -> dict:
+    """
+    Push the project to the deployment repo, sending only what changed since the last deploy.
+
+    The staging repo `repo_name` is kept between deployments; its files are
+    synced by content hash (`utils.deploy_package`), large vectorstore files
+    are compressed, and only the changed paths are staged. Nothing is
+    committed or pushed when nothing changed.
+
+    Args:
+        repo_url (str): Remote to push to (GitHub URL or any git remote, e.g. a local bare repo)
+        repo_name (str): Staging directory of the deployment repo
+        source_dir (str): Project root
+        message (str): Commit message
+        branch (str): Branch to push
+
+    Returns:
+        dict: "changed", "removed", "unchanged", "bytes_written", "staged" (paths in the commit),
+        "pushed" and per-phase "timings"
+    """
+    from utils.deploy_package import package_files, timed_phase, format_timings
+
+    timings = {}
+
+    # (1) Reuse or set up the staging repo
+    with timed_phase(timings, "prepare"):
+        tracked = prepare_staging_repo(repo_name, repo_url, branch)
+        with open(os.path.join(repo_name, ".gitignore"), "w") as f:
+            f.write(".env\n.deploy_manifest.json\n")
+
+    # (2) Sync changed files only
+    with timed_phase(timings, "package"):
+        result = package_files(source_dir, repo_name, tracked=tracked)
+
+    # (3) Stage just those paths
+    with timed_phase(timings, "stage"):
+        paths = [".gitignore"] + result["changed"] + result["removed"]
+        for i in range(0, len(paths), 500):
+            run_git(["add", "-A", "--", *paths[i:i + 500]], repo_name)
+        staged = run_git(["diff", "--cached", "--name-only", "-z"], repo_name).stdout.split("\0")[:-1]
+
+    # (4) Commit and push
+    with timed_phase(timings, "push"):
+        if staged:
+            run_git(["commit", "-q", "-m", message], repo_name)
+            run_git(["push", "-u", "origin", branch], repo_name)
+
+    result.update(staged=staged, pushed=bool(staged), timings=timings)
+    if staged:
+        print(f"[✅] Pushed {len(staged)} changed file(s), {result['unchanged']} unchanged · {format_timings(timings)}")
+    else:
+        print(f"[✅] Nothing changed since the last deploy ({result['unchanged']} files) · {format_timings(timings)}")
+    return result
@@ -0,0 +1,162 @@
+# utils/history_summary.py
+
+import os
+import asyncio
+import threading
+from utils.context_builder import estimate_tokens
+from utils.metrics import span
+from utils.mongo_utils import (
+    ensure_indexes,
+    format_history,
+    fetch_chat_records,
+    afetch_chat_records,
+    fetch_chat_records_since,
+    afetch_chat_records_since,
+    fetch_summary,
+    afetch_summary,
+    asave_summary,
+    history_cache,
+)
+
+# Prompts carry the rolling summary plus the turns not folded into it yet:
+# between HISTORY_VERBATIM_TURNS and HISTORY_VERBATIM_TURNS + SUMMARY_FOLD_EVERY - 1,
+# more if a fold was skipped or failed (no unsummarized turn is ever dropped)
+HISTORY_VERBATIM_TURNS = int(os.getenv("HISTORY_VERBATIM_TURNS", "3"))
+SUMMARY_FOLD_EVERY = int(os.getenv("SUMMARY_FOLD_EVERY", "3"))
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "300"))
+
+# Every prompt reads the last HISTORY_VERBATIM_TURNS + SUMMARY_FOLD_EVERY turns,
+# which must fit in the per-session history buffer
+if HISTORY_VERBATIM_TURNS < 0 or SUMMARY_FOLD_EVERY < 1:
+    raise ValueError("HISTORY_VERBATIM_TURNS must be >= 0 and SUMMARY_FOLD_EVERY >= 1")
+if HISTORY_VERBATIM_TURNS + SUMMARY_FOLD_EVERY > history_cache.max_turns:
+    raise ValueError(
+        f"HISTORY_VERBATIM_TURNS + SUMMARY_FOLD_EVERY ({HISTORY_VERBATIM_TURNS + SUMMARY_FOLD_EVERY}) "
+        f"must not exceed HISTORY_BUFFER_TURNS ({history_cache.max_turns})"
+    )
+
+SUMMARY_PROMPT = """
+You maintain a running summary of a conversation between a user and an assistant.
+Update the summary with the new turns below. Keep facts, names, numbers, decisions and
+open questions the assistant may need later; drop greetings and repetition.
+Write at most {max_words} words of plain prose.
+
+Current Summary:
+{summary}
+
+New Turns:
+{turns}
+
+Updated Summary:
+"""
+
+_folding = set()
+_folding_lock = threading.Lock()
+
+
+def _history_window() -> int:
+    return HISTORY_VERBATIM_TURNS + SUMMARY_FOLD_EVERY
+
+
+def _unsummarized(records, summarized_until):
+    if summarized_until is None:
+        return list(records)
+    return [r for r in records if r["timestamp"] > summarized_until]
+
+
+def _complete(state, records) -> bool:
+    # The last _history_window() turns hold every unsummarized turn unless all
+    # of them are unsummarized (a fold was skipped or failed): older ones may exist
+    return len(records) < _history_window() or len(_unsummarized(records, state["summarized_until"])) < len(records)
+
+
+def _prompt_history(state, records):
+    return state["summary"], format_history(_unsummarized(records, state["summarized_until"]))
+
+
+def get_prompt_history(user_id: str, session_id: str) -> tuple:
+    """
+    Return the history to put in the prompt: the session summary plus the
+    turns that have not been folded into it yet.
+
+    Args:
+        user_id (str): Unique user ID
+        session_id (str): Unique session ID
+
+    Returns:
+        tuple: (summary string, formatted recent turns)
+    """
+    state = fetch_summary(user_id, session_id)
+    records = fetch_chat_records(user_id, session_id, limit=_history_window())
+    if not _complete(state, records):
+        records = fetch_chat_records_since(user_id, session_id, state["summarized_until"])
+    return _prompt_history(state, records)
+
+
+async def _aunsummarized_records(user_id, session_id, state, records):
+    if _complete(state, records):
+        return records
+    return await afetch_chat_records_since(user_id, session_id, state["summarized_until"])
+
+
+async def aget_prompt_history(user_id: str, session_id: str) -> tuple:
+    """Async `get_prompt_history`; the summary and the turns are read concurrently."""
+    state, records = await asyncio.gather(
+        afetch_summary(user_id, session_id),
+        afetch_chat_records(user_id, session_id, limit=_history_window()),
+    )
+    return _prompt_history(state, await _aunsummarized_records(user_id, session_id, state, records))
+
+
+async def afold_history(llm, user_id: str, session_id: str):
+    """
+    Fold the session's older turns into its rolling summary.
+
+    Runs after the reply has been sent. Nothing happens until
+    HISTORY_VERBATIM_TURNS + SUMMARY_FOLD_EVERY turns are unsummarized;
+    then everything but the last HISTORY_VERBATIM_TURNS is summarized with
+    one LLM call, so the summary model is called once every
+    SUMMARY_FOLD_EVERY turns. The summary is saved only if no other worker
+    advanced it meanwhile.
+
+    Args:
+        llm (BaseChatModel): Model used to write the summary
+        user_id (str): Unique user ID
+        session_id (str): Unique session ID
+    """
+    key = (user_id, session_id)
+    with _folding_lock:
+        if key in _folding:
+            return
+        _folding.add(key)
+    try:
+        await asyncio.to_thread(ensure_indexes)
+        state, records = await asyncio.gather(
+            afetch_summary(user_id, session_id),
+            afetch_chat_records(user_id, session_id, limit=_history_window()),
+        )
+        records = await _aunsummarized_records(user_id, session_id, state, records)
+        pending = _unsummarized(records, state["summarized_until"])
+        if len(pending) < _history_window():
+            return
+
+        # (1) Summarize everything older than the verbatim window
+        fold = pending[:-HISTORY_VERBATIM_TURNS] if HISTORY_VERBATIM_TURNS else pending
+        with span("summary_fold") as s:
+            message = await llm.ainvoke(SUMMARY_PROMPT.format(
+                summary=state["summary"] or "(none yet)",
+                turns=format_history(fold),
+                max_words=int(SUMMARY_MAX_TOKENS * 0.75),
+            ))
+            summary = message.content.strip()
+            s["tokens"] = estimate_tokens(summary)
+        if estimate_tokens(summary) > SUMMARY_MAX_TOKENS:
+            summary = summary[:SUMMARY_MAX_TOKENS * 4]
+
+        # (2) Save it unless another worker got there first
+        saved = await asave_summary(user_id, session_id, state, summary, fold[-1]["timestamp"], len(fold))
+        if saved:
+            print(f"[🧾] Folded {len(fold)} turns into the summary of session {session_id}")
+    finally:
+        with _folding_lock:
+            _folding.discard(key)
@@ -0,0 +1,95 @@
+# utils/hybrid_search.py
+
+import re
+
+# Candidate tokens, word parts joined by - _ . / kept together ("ERR-1042")
+_TOKEN = re.compile(r"\w+(?:[-./]\w+)*")
+_ACRONYM = re.compile(r"[A-Z]{3,}(?:[-_./][A-Z0-9]+)*")
+
+
+def _doc_key(doc):
+    return doc.id or (doc.metadata.get("source"), doc.metadata.get("start_index"), doc.page_content)
+
+
+def lexical_search(faiss_db, query, k=10, match_all=False):
+    """
+    BM25 hits from the vectorstore's docstore, or [] when it has no keyword index
+    (legacy pickled stores, or stores loaded writable for ingestion).
+    """
+    search = getattr(faiss_db.docstore, "lexical_search", None)
+    return search(query, k, match_all=match_all) if search else []
+
+
+def _is_identifier(token: str, shouting: bool) -> bool:
+    has_letter = any(c.isalpha() for c in token)
+    if has_letter and any(c.isdigit() for c in token):
+        return True  # letters and digits mixed: "ZX4410", "v2", "ERR-1042"
+    if "_" in token.strip("_") or re.search(r"[a-z][A-Z]", token):
+        return True  # code-like: "max_tokens", "maxTokens"
+    # Acronyms ("SKU", "OAUTH"), unless the whole query is in capitals
+    return not shouting and bool(_ACRONYM.fullmatch(token))
+
+
+def exact_terms(query: str) -> list:
+    """
+    Product names, SKUs, error codes and similar tokens in `query`.
+
+    Plain numbers and years ("2024"), and ordinary words joined by
+    punctuation ("and/or", "e-mail"), are not identifiers.
+    """
+    letters = [c for c in query if c.isalpha()]
+    shouting = bool(letters) and sum(c.isupper() for c in letters) > len(letters) / 2
+    return [m.group(0) for m in _TOKEN.finditer(query) if _is_identifier(m.group(0), shouting)]
+
+
+def confident_lexical_hits(faiss_db, query, max_hits=4):
+    """
+    Return keyword hits that make vector search unnecessary, or None.
+
+    The query must contain identifier-like terms and at most `max_hits`
+    chunks may contain all of them: a rare exact term pins down the answer
+    far better than an embedding of it would.
+
+    Args:
+        faiss_db (FAISS): Vectorstore with a keyword-searchable docstore
+        query (str): User's query
+        max_hits (int): Most chunks the exact terms may match
+
+    Returns:
+        list[tuple[Document, float]] | None: The matching chunks, best first
+    """
+    terms = exact_terms(query)
+    if not terms:
+        return None
+    hits = lexical_search(faiss_db, " ".join(terms), max_hits + 1, match_all=True)
+    if not hits or len(hits) > max_hits:
+        return None
+    return hits
+
+
+def reciprocal_rank_fusion(*result_lists, k=60, limit=None):
+    """
+    Merge ranked (doc, score) lists with reciprocal-rank fusion.
+
+    Each document scores sum(1 / (k + rank)) over the lists it appears in,
+    so raw scores on different scales (L2 distance, BM25) never need to be
+    compared. The fused score is returned negated to keep the "lower is
+    better" convention of FAISS distances.
+
+    Args:
+        *result_lists (list[tuple[Document, float]]): Rankings, best first
+        k (int): RRF damping constant
+        limit (int): Maximum number of results
+
+    Returns:
+        list[tuple[Document, float]]: Fused ranking, best first
+    """
+    fused = {}
+    for results in result_lists:
+        for rank, (doc, _) in enumerate(results, start=1):
+            key = _doc_key(doc)
+            entry = fused.setdefault(key, [doc, 0.0])
+            entry[1] += 1.0 / (k + rank)
+
+    ranked = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)
+    return [(doc, -score) for doc, score in ranked[:limit]]
@@ -0,0 +1,110 @@
+# utils/index_manager.py
+
+import time
+import threading
+from utils.vectorstore_utils import get_vectorstore_version, VectorstoreChanged
+
+LOAD_ATTEMPTS = 5
+LOAD_RETRY_DELAY = 0.1  # seconds; a save's renames take milliseconds
+
+
+class IndexManager:
+    """
+    Process-wide holder for a loaded FAISS vectorstore.
+
+    The store is loaded once and shared by every caller. A daemon thread
+    watches the vectorstore version on disk and, when it changes, loads the
+    new store in the background and swaps the reference in one assignment.
+    Queries that already hold the old store keep using it until they finish.
+    """
+
+    def __init__(self, path, loader, poll_interval=5.0):
+        """
+        Args:
+            path (str): Vectorstore directory to watch
+            loader (callable): Function returning a freshly loaded store
+            poll_interval (float): Seconds between version checks
+        """
+        self.path = path
+        self.loader = loader
+        self.poll_interval = poll_interval
+        self._current = None  # (store, version), swapped as one reference
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    @property
+    def version(self):
+        current = self._current
+        return current[1] if current else None
+
+    def get(self):
+        """Return the current store, loading it on first use."""
+        return self.snapshot()[0]
+
+    def snapshot(self):
+        """
+        Return the current store together with the version it was loaded from.
+
+        Returns:
+            tuple: (store, version string)
+        """
+        current = self._current
+        if current is None:
+            with self._lock:
+                if self._current is None:
+                    self._load()
+                    self.start()
+                current = self._current
+        return current
+
+    def refresh(self):
+        """
+        Reload the store if the version on disk differs from the loaded one.
+
+        Returns:
+            bool: True if a new store was swapped in
+        """
+        if get_vectorstore_version(self.path) == self.version:
+            return False
+        with self._lock:
+            if get_vectorstore_version(self.path) == self.version:
+                return False
+            self._load()
+        return True
+
+    def _load(self):
+        # Retry if the store is rewritten while we are reading it, so a
+        # half-old/half-new pair of files is never published.
+        for attempt in range(LOAD_ATTEMPTS):
+            if attempt:
+                time.sleep(LOAD_RETRY_DELAY)
+            version = get_vectorstore_version(self.path)
+            try:
+                index = self.loader()
+            except VectorstoreChanged:
+                continue
+            if get_vectorstore_version(self.path) == version:
+                self._current = (index, version)
+                return
+        raise VectorstoreChanged(f"{self.path} kept changing during {LOAD_ATTEMPTS} load attempts")
+
+    def start(self):
+        """Start the background watcher thread (idempotent)."""
+        if self._watcher is not None or self.poll_interval <= 0:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch, name="faiss-index-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if self.refresh():
+                    print(f"[🔄] Reloaded FAISS index (version {self.version})")
+            except Exception as e:
+                print(f"[⚠️] FAISS index reload failed, keeping current index: {e}")
@@ -0,0 +1,174 @@
+# utils/index_registry.py
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from utils.index_manager import IndexManager
+
+# Tenant / site ids: letters, digits, "-", "_" and "." (not leading), so a
+# namespace is always one directory level below the vectorstore root
+_NAMESPACE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+# Files that are read into RAM when a store is loaded (docs.sqlite stays on disk)
+_RESIDENT_FILES = ("index.faiss", "index.pkl")
+
+
+def validate_namespace(namespace):
+    """
+    Check a namespace id and return it (None/"" means the default index).
+
+    Raises:
+        ValueError: If the id could escape the vectorstore root or is malformed
+    """
+    if not namespace:
+        return None
+    if not isinstance(namespace, str) or not _NAMESPACE.match(namespace) or ".." in namespace:
+        raise ValueError(f"Invalid namespace '{namespace}': use letters, digits, '-', '_' or '.'")
+    return namespace
+
+
+def namespace_path(root, namespace=None):
+    """
+    Vectorstore directory of a namespace: `<root>/<namespace>`, or `<root>` itself for the default index.
+
+    Args:
+        root (str): Vectorstore root directory
+        namespace (str): Tenant or site id
+
+    Returns:
+        str: Directory holding that namespace's index files
+    """
+    namespace = validate_namespace(namespace)
+    return os.path.join(root, namespace) if namespace else root
+
+
+def list_namespaces(root):
+    """Namespaces under `root` that have an index."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if _NAMESPACE.match(name) and os.path.exists(os.path.join(root, name, "index.faiss"))
+    )
+
+
+def resident_size_mb(path) -> float:
+    """Approximate RAM a loaded store takes: the size of its index files."""
+    total = 0
+    for name in _RESIDENT_FILES:
+        file_path = os.path.join(path, name)
+        if os.path.exists(file_path):
+            total += os.path.getsize(file_path)
+    return total / (1024 * 1024)
+
+
+class IndexRegistry:
+    """
+    Bounded LRU of open vectorstores, one `IndexManager` per namespace.
+
+    A namespace's index is loaded on first use and kept hot-swappable like
+    the single shared index. When more than `max_indexes` are open, or their
+    index files add up to more than `memory_budget_mb`, the least recently
+    used ones are closed (the most recent one always stays). Queries that
+    already hold an evicted store keep using it until they finish.
+    """
+
+    def __init__(self, root, loader, poll_interval=5.0, max_indexes=32, memory_budget_mb=1024):
+        """
+        Args:
+            root (str): Vectorstore root; namespaces live in its subdirectories
+            loader (callable): loader(path) returning a freshly loaded store
+            poll_interval (float): Seconds between version checks of each open index
+            max_indexes (int): Most indexes kept open at once
+            memory_budget_mb (float): Total size of open index files before evicting (0 = no limit)
+        """
+        self.root = root
+        self.loader = loader
+        self.poll_interval = poll_interval
+        self.max_indexes = max_indexes
+        self.memory_budget_mb = memory_budget_mb
+        self.evictions = 0
+        self._managers = OrderedDict()  # namespace -> IndexManager, least recently used first
+        self._sizes = {}  # namespace -> MB, measured when loaded
+        self._lock = threading.Lock()
+
+    def get(self, namespace=None) -> IndexManager:
+        """Return the manager of a namespace, creating it (unloaded) if needed."""
+        namespace = validate_namespace(namespace)
+        with self._lock:
+            manager = self._managers.get(namespace)
+            if manager is None:
+                path = namespace_path(self.root, namespace)
+                manager = IndexManager(path, lambda: self.loader(path), poll_interval=self.poll_interval)
+                self._managers[namespace] = manager
+            self._managers.move_to_end(namespace)
+            return manager
+
+    def version(self, namespace=None):
+        """Version of the namespace's open index, or None if it is not loaded (nothing is created)."""
+        with self._lock:
+            manager = self._managers.get(validate_namespace(namespace))
+        return manager.version if manager is not None else None
+
+    def snapshot(self, namespace=None):
+        """
+        Return (store, version) for a namespace, loading it on first use.
+
+        Raises:
+            FileNotFoundError: If the namespace has no index
+        """
+        namespace = validate_namespace(namespace)  # one key for None and ""
+        path = namespace_path(self.root, namespace)
+        if not os.path.exists(os.path.join(path, "index.faiss")):
+            # Checked before creating a manager, so unknown ids never take a slot
+            raise FileNotFoundError(f"❌ No index for namespace '{namespace or 'default'}' at {path}")
+        manager = self.get(namespace)
+        first_load = manager.version is None
+        try:
+            current = manager.snapshot()  # loads outside the registry lock
+        except Exception:
+            with self._lock:
+                if self._managers.get(namespace) is manager and manager.version is None:
+                    del self._managers[namespace]
+            raise
+        if first_load:
+            with self._lock:
+                self._sizes[namespace] = resident_size_mb(manager.path)
+            self._evict()
+        return current
+
+    def _evict(self):
+        with self._lock:
+            evicted = []
+            while len(self._managers) > 1 and (
+                len(self._managers) > self.max_indexes
+                or (self.memory_budget_mb and self._memory_mb() > self.memory_budget_mb)
+            ):
+                namespace, manager = self._managers.popitem(last=False)
+                self._sizes.pop(namespace, None)
+                manager.stop()
+                evicted.append(namespace)
+            self.evictions += len(evicted)
+        for namespace in evicted:
+            print(f"[♻️] Closed index '{namespace or 'default'}' (least recently used)")
+
+    def _memory_mb(self) -> float:
+        return sum(self._sizes.get(namespace, 0.0) for namespace in self._managers)
+
+    def close(self):
+        """Stop every index watcher and forget the open indexes."""
+        with self._lock:
+            for manager in self._managers.values():
+                manager.stop()
+            self._managers.clear()
+            self._sizes.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open": len(self._managers),
+                "memory_mb": round(self._memory_mb(), 1),
+                "budget_mb": self.memory_budget_mb,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,125 @@
+# utils/ingest_manifest.py
+
+import os
+import json
+import hashlib
+import tempfile
+
+MANIFEST_FILE = "ingest_manifest.json"
+
+
+def chunk_id(source: str, text: str) -> str:
+    """Deterministic docstore id for a chunk: hash of its source and content."""
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()
+
+
+def load_manifest(path):
+    """
+    Load the ingestion manifest ({"sources": {source: [chunk ids]}, "offsets": {source: [start_index]}}).
+
+    Returns:
+        dict | None: The manifest, or None if the vectorstore has none yet
+    """
+    manifest_file = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_file):
+        return None
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path, manifest):
+    """Atomically write the ingestion manifest."""
+    os.makedirs(path, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path, prefix=".manifest-", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+
+
+def manifest_from_index(faiss_db):
+    """
+    Rebuild a manifest from an existing index by grouping its docs by `source` metadata.
+
+    Used once for vectorstores that were built before the manifest existed.
+    """
+    sources, offsets = {}, {}
+    for doc_id in faiss_db.index_to_docstore_id.values():
+        doc = faiss_db.docstore.search(doc_id)
+        metadata = getattr(doc, "metadata", {})
+        source = metadata.get("source", "")
+        sources.setdefault(source, []).append(doc_id)
+        offsets.setdefault(source, []).append(metadata.get("start_index"))
+    return {"sources": sources, "offsets": offsets}
+
+
+def diff_source(manifest, source, chunks):
+    """
+    Compare freshly split chunks of one source against the manifest.
+
+    Args:
+        manifest (dict): Current manifest (updated in place)
+        source (str): Source file the chunks came from
+        chunks (list[Document]): All chunks of that source
+
+    Returns:
+        tuple: (chunks to add, their ids, ids of stale chunks to remove,
+        (id, chunk) pairs of kept chunks whose `start_index` moved)
+    """
+    known_ids = manifest["sources"].get(source, [])
+    known = set(known_ids)
+    # Manifests written before offsets were tracked report every kept chunk as moved once
+    known_offsets = dict(zip(known_ids, manifest.setdefault("offsets", {}).get(source) or []))
+    current, offsets, seen, new_chunks, new_ids, moved = [], [], set(), [], [], []
+    for chunk in chunks:
+        cid = chunk_id(source, chunk.page_content)
+        if cid in seen:
+            continue  # identical chunk repeated in the same file
+        seen.add(cid)
+        current.append(cid)
+        start = chunk.metadata.get("start_index")
+        offsets.append(start)
+        if cid not in known:
+            new_chunks.append(chunk)
+            new_ids.append(cid)
+        elif cid not in known_offsets or known_offsets[cid] != start:
+            moved.append((cid, chunk))  # same text, shifted by an edit earlier in the file
+
+    stale_ids = sorted(known - seen)
+    manifest["sources"][source] = current
+    manifest["offsets"][source] = offsets
+    return new_chunks, new_ids, stale_ids, moved
+
+
+def refresh_metadata(faiss_db, moved):
+    """
+    Give kept chunks the metadata (start_index) of their fresh split, in place.
+
+    Args:
+        faiss_db (FAISS): Writable vectorstore (in-memory docstore)
+        moved (list[tuple[str, Document]]): (id, fresh chunk) pairs from `diff_source`
+
+    Returns:
+        int: Number of chunks updated
+    """
+    updated = 0
+    for cid, chunk in moved:
+        doc = faiss_db.docstore.search(cid)
+        if not isinstance(doc, str) and doc.metadata != chunk.metadata:
+            doc.metadata = dict(chunk.metadata)
+            updated += 1
+    return updated
+
+
+def drop_missing_sources(manifest):
+    """
+    Forget sources whose files no longer exist.
+
+    Returns:
+        list[str]: Ids of the chunks that belonged to them
+    """
+    stale_ids = []
+    for source in list(manifest["sources"]):
+        if source and not os.path.exists(source):
+            stale_ids.extend(manifest["sources"].pop(source))
+            manifest.get("offsets", {}).pop(source, None)
+    return stale_ids
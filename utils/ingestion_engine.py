@@ -0,0 +1,124 @@
+# utils/ingestion_engine.py
+
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.embedding_store import text_hash
+
+
+def is_rate_limited(error) -> bool:
+    """Best-effort detection of HTTP 429 / rate-limit errors from any client library."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429:
+        return True
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message or "too many requests" in message
+
+
+def print_progress(progress):
+    print(
+        f"[📈] Embedded {progress['done']}/{progress['total']} chunks · "
+        f"{progress['chunks_per_sec']:.1f} chunks/s · ETA {progress['eta_sec']:.0f}s"
+    )
+
+
+class IngestionEngine:
+    """
+    Batched, concurrent and resumable corpus embedding.
+
+    Texts are embedded in batches of `batch_size` with at most `concurrency`
+    requests in flight. Each finished batch is written straight to the
+    `EmbeddingStore`, which doubles as the checkpoint: an interrupted run
+    simply skips every text that is already stored when it is restarted.
+    Rate-limit errors pause all workers with exponential backoff.
+    """
+
+    def __init__(self, embeddings, store, model_name, batch_size=96, concurrency=4,
+                 max_retries=6, base_delay=1.0, max_delay=60.0, progress=print_progress):
+        """
+        Args:
+            embeddings (Embeddings): Backend whose `embed_documents` does the real work
+            store (EmbeddingStore): Where vectors are persisted
+            model_name (str): Model identity used as the store key
+            batch_size (int): Texts per embedding request
+            concurrency (int): Maximum requests in flight
+            max_retries (int): Attempts per batch before giving up
+            base_delay (float): First backoff delay in seconds
+            max_delay (float): Backoff ceiling in seconds
+            progress (callable): Called with a progress dict after every batch (None to disable)
+        """
+        self.embeddings = embeddings
+        self.store = store
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.progress = progress
+        self._pause_until = 0.0
+        self._pause_lock = threading.Lock()
+
+    def _wait_if_paused(self):
+        delay = self._pause_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _embed_batch(self, keys, texts):
+        for attempt in range(self.max_retries):
+            self._wait_if_paused()
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+                self.store.put_many(self.model_name, keys, vectors)
+                return len(keys)
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt) * (0.5 + random.random() / 2)
+                if is_rate_limited(e):
+                    retry_after = getattr(e, "retry_after", None)
+                    delay = max(delay, float(retry_after or 0))
+                    # Back off every worker, not just this one
+                    with self._pause_lock:
+                        self._pause_until = max(self._pause_until, time.monotonic() + delay)
+                    print(f"[⏳] Rate limited, pausing embedding for {delay:.1f}s")
+                else:
+                    print(f"[⚠️] Embedding batch failed ({e}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+
+    def embed_all(self, texts):
+        """
+        Make sure every text has a stored embedding.
+
+        Args:
+            texts (list[str]): Chunk texts (duplicates and already stored texts are skipped)
+
+        Returns:
+            dict: Final progress stats ("done", "total", "skipped", "elapsed_sec", "chunks_per_sec")
+        """
+        unique = {}
+        for text in texts:
+            unique.setdefault(text_hash(text), text)
+        stored = self.store.get_many(self.model_name, list(unique))
+        pending = [(k, t) for k, t in unique.items() if k not in stored]
+
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        stats = {"done": 0, "total": len(pending), "skipped": len(stored),
+                 "elapsed_sec": 0.0, "chunks_per_sec": 0.0, "eta_sec": 0.0}
+        start = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as pool:
+            futures = [
+                pool.submit(self._embed_batch, [k for k, _ in batch], [t for _, t in batch])
+                for batch in batches
+            ]
+            for future in as_completed(futures):
+                stats["done"] += future.result()
+                stats["elapsed_sec"] = time.monotonic() - start
+                stats["chunks_per_sec"] = stats["done"] / stats["elapsed_sec"] if stats["elapsed_sec"] else 0.0
+                remaining = stats["total"] - stats["done"]
+                stats["eta_sec"] = remaining / stats["chunks_per_sec"] if stats["chunks_per_sec"] else 0.0
+                if self.progress:
+                    self.progress(dict(stats))
+        return stats
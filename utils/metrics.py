@@ -0,0 +1,340 @@
+# utils/metrics.py
+
+import os
+import json
+import time
+import bisect
+import tempfile
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 = no /metrics endpoint
+METRICS_JSON_LOGS = os.getenv("METRICS_JSON_LOGS", "0") == "1"
+# Directory shared by the worker processes of one server; each writes its
+# numbers there and a scrape of any worker reports the sum
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", "5"))
+
+# Seconds; covers cache hits (sub-ms) up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_str(labels):
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _keys(series):
+    # JSON turns label tuples into lists; turn them back
+    return [(tuple(tuple(label) for label in key), value) for key, value in series]
+
+
+class Counter:
+    """Monotonic counter with labels, rendered in Prometheus text format."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def state(self):
+        with self._lock:
+            return [[key, value] for key, value in self._values.items()]
+
+    def merge(self, series):
+        with self._lock:
+            for key, value in _keys(series):
+                self._values[key] = self._values.get(key, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_str(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with labels, rendered in Prometheus text format.
+
+    `observe` is a bisect plus a few additions under a lock, cheap enough
+    to stay on for every request.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 3)
+            series[slot] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self):
+        """Copy of every series: labels -> {"buckets", "sum", "count"}."""
+        with self._lock:
+            return {
+                key: {"buckets": list(s[:len(self.buckets) + 1]), "sum": s[-2], "count": s[-1]}
+                for key, s in self._series.items()
+            }
+
+    def state(self):
+        with self._lock:
+            return [[key, list(series)] for key, series in self._series.items()]
+
+    def merge(self, series):
+        with self._lock:
+            for key, values in _keys(series):
+                if len(values) != len(self.buckets) + 3:
+                    continue  # written with other buckets
+                mine = self._series.setdefault(key, [0] * len(values))
+                for i, value in enumerate(values):
+                    mine[i] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_label_str(key + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(key)} {series['sum']}")
+            lines.append(f"{self.name}_count{_label_str(key)} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named counters and histograms of this process."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text)
+            return metric
+
+    def counter(self, name, help_text=""):
+        return self._get(Counter, name, help_text)
+
+    def histogram(self, name, help_text=""):
+        return self._get(Histogram, name, help_text)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def state(self) -> dict:
+        """JSON-serializable copy of every metric, for `merge` in another process."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name: {"type": m.kind, "help": m.help, "series": m.state()} for m in metrics}
+
+    def merge(self, state):
+        """Add the numbers of another registry's `state()` to this one."""
+        for name, metric in state.items():
+            cls = Histogram if metric["type"] == "histogram" else Counter
+            self._get(cls, name, metric["help"]).merge(metric["series"])
+
+
+registry = MetricsRegistry()
+stage_seconds = registry.histogram("rag_stage_duration_seconds", "Time spent per pipeline stage")
+stage_errors = registry.counter("rag_stage_errors_total", "Stages that raised")
+
+
+def record(stage, seconds=None, **counts):
+    """
+    Record one finished stage: its duration and counters such as tokens, docs or cache_hits.
+
+    Each counter `x` is exported as `rag_x_total{stage=...}`.
+    """
+    if seconds is not None:
+        stage_seconds.observe(seconds, stage=stage)
+    for name, value in counts.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            registry.counter(f"rag_{name}_total", f"{name} counted per stage").inc(value, stage=stage)
+        elif value is True:
+            registry.counter(f"rag_{name}_total", f"{name} counted per stage").inc(1, stage=stage)
+    if METRICS_JSON_LOGS:
+        event = {"event": "span", "stage": stage, "ts": time.time(), **counts}
+        if seconds is not None:
+            event["duration_ms"] = round(seconds * 1000, 3)
+        print(json.dumps(event, default=str))
+
+
+@contextmanager
+def span(stage, **counts):
+    """
+    Time a pipeline stage.
+
+    Yields a dict the caller can add counters to (e.g. `s["docs"] = 4`);
+    they are recorded together with the duration when the block exits.
+
+    Usage:
+        with span("vector_search") as s:
+            hits = search(...)
+            s["docs"] = len(hits)
+    """
+    start = time.perf_counter()
+    try:
+        yield counts
+    except Exception:
+        stage_errors.inc(stage=stage)
+        raise
+    finally:
+        record(stage, time.perf_counter() - start, **counts)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # scrapes every few seconds would flood the logs
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None):
+    """
+    Serve the registry at http://0.0.0.0:<port>/metrics for Prometheus (once per process).
+
+    Args:
+        port (int): Port to listen on (METRICS_PORT by default; 0 disables)
+
+    Returns:
+        ThreadingHTTPServer | None: The running server
+    """
+    global _server
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError as e:
+                print(f"[⚠️] Metrics endpoint not started on port {port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            print(f"[📊] Metrics at http://0.0.0.0:{port}/metrics")
+        return _server
+
+
+def dump_metrics(metrics_dir=None):
+    """Write this process's registry to `<metrics_dir>/worker-<pid>.json` (atomically)."""
+    metrics_dir = metrics_dir or METRICS_DIR
+    fd, tmp_path = tempfile.mkstemp(dir=metrics_dir, prefix=".worker-", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(registry.state(), f)
+    os.replace(tmp_path, os.path.join(metrics_dir, f"worker-{os.getpid()}.json"))
+
+
+def render_workers(metrics_dir=None) -> str:
+    """
+    Render the metrics of every worker process sharing `metrics_dir`.
+
+    This process's numbers are current; other workers' are at most
+    METRICS_DUMP_INTERVAL seconds old. Without a directory only this
+    process's registry is rendered.
+
+    Args:
+        metrics_dir (str): Shared directory (METRICS_DIR by default)
+
+    Returns:
+        str: Prometheus text format
+    """
+    metrics_dir = metrics_dir or METRICS_DIR
+    if not metrics_dir:
+        return registry.render()
+    dump_metrics(metrics_dir)
+    merged = MetricsRegistry()
+    for name in sorted(os.listdir(metrics_dir)):
+        if not (name.startswith("worker-") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(metrics_dir, name), "r", encoding="utf-8") as f:
+                merged.merge(json.load(f))
+        except (OSError, ValueError):
+            continue  # being replaced or written by an older version
+    return merged.render()
+
+
+_dumper = None
+
+
+def start_metrics_dump(metrics_dir=None, interval=None):
+    """
+    Write this process's metrics to the shared directory every `interval` seconds (once per process).
+
+    Args:
+        metrics_dir (str): Shared directory (METRICS_DIR by default; unset disables)
+        interval (float): Seconds between writes (METRICS_DUMP_INTERVAL by default)
+
+    Returns:
+        threading.Thread | None: The running writer
+    """
+    global _dumper
+    metrics_dir = metrics_dir or METRICS_DIR
+    interval = METRICS_DUMP_INTERVAL if interval is None else interval
+    if not metrics_dir or interval <= 0:
+        return None
+
+    def dump_forever():
+        while True:
+            try:
+                dump_metrics(metrics_dir)
+            except OSError as e:
+                print(f"[⚠️] Could not write metrics to {metrics_dir}: {e}")
+            time.sleep(interval)
+
+    with _server_lock:
+        if _dumper is None:
+            os.makedirs(metrics_dir, exist_ok=True)
+            _dumper = threading.Thread(target=dump_forever, name="metrics-dump", daemon=True)
+            _dumper.start()
+        return _dumper
@@ -1,37 +1,506 @@
 import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import asyncio
+import weakref
+import threading
+from collections import OrderedDict, deque
 from datetime import datetime
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne, ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
 from dotenv import load_dotenv
+from utils.resources import lazy_resource
 
 # Load environment variables
 load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 DB_NAME = "chat_db"
+CHAT_LOG_QUEUE_SIZE = int(os.getenv("CHAT_LOG_QUEUE_SIZE", "10000"))
+CHAT_LOG_BATCH_SIZE = int(os.getenv("CHAT_LOG_BATCH_SIZE", "100"))
+CHAT_LOG_FLUSH_INTERVAL = float(os.getenv("CHAT_LOG_FLUSH_INTERVAL", "0.5"))
+CHAT_LOG_RETRY_MAX = float(os.getenv("CHAT_LOG_RETRY_MAX", "30"))  # longest backoff between retries (seconds)
+# Turns still unwritten when the process exits; written back once MongoDB accepts writes again
+CHAT_LOG_SPILL_PATH = os.getenv("CHAT_LOG_SPILL_PATH", ".cache/chat_log_spill.jsonl")
+HISTORY_BUFFER_TURNS = int(os.getenv("HISTORY_BUFFER_TURNS", "10"))
+HISTORY_BUFFER_SESSIONS = int(os.getenv("HISTORY_BUFFER_SESSIONS", "10000"))
+# Check buffered history against the newest turn in MongoDB before serving it
+# (needed whenever more than one process serves the same sessions)
+HISTORY_BUFFER_VERIFY = os.getenv("HISTORY_BUFFER_VERIFY", "1") == "1"
+HISTORY_PROJECTION = {"_id": 0, "turn_id": 1, "query": 1, "response": 1, "timestamp": 1}
+NEWEST_TURN_PROJECTION = {"_id": 0, "turn_id": 1, "timestamp": 1}
 
-# Connect to MongoDB
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
-chats_collection = db["chat_history"]
 
+@lazy_resource
+def get_client():
+    """Process-wide MongoClient (one connection pool), created on first use."""
+    return MongoClient(MONGO_URI)
 
-def store_chat(user_id, session_id, query, response):
+
+def get_collection(name="chat_history"):
+    """Return the collection `name` of the chat database."""
+    return get_client()[DB_NAME][name]
+
+
+def __getattr__(name):
+    # Module attributes of earlier versions, resolved lazily so importing this module never connects
+    if name == "client":
+        return get_client()
+    if name == "db":
+        return get_client()[DB_NAME]
+    if name == "chats_collection":
+        return get_collection("chat_history")
+    if name == "summaries_collection":
+        return get_collection("chat_summaries")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Async (motor) collections, one per event loop since motor clients are loop-bound
+_async_collections = weakref.WeakKeyDictionary()
+
+_indexes_ready = False
+_indexes_lock = threading.Lock()
+
+
+def ensure_indexes():
+    """
+    Create the chat_history and chat_summaries indexes once per process.
+
+    (user_id, session_id, timestamp) serves the history query without a
+    collection scan; the unique turn_id index makes persistence idempotent
+    and the unique (user_id, session_id) index keeps one summary per session.
+    """
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    with _indexes_lock:
+        if _indexes_ready:
+            return
+        try:
+            chats = get_collection("chat_history")
+            chats.create_index(
+                [("user_id", ASCENDING), ("session_id", ASCENDING), ("timestamp", DESCENDING)],
+                name="user_session_timestamp",
+            )
+            chats.create_index("turn_id", unique=True, sparse=True)
+            get_collection("chat_summaries").create_index(
+                [("user_id", ASCENDING), ("session_id", ASCENDING)], name="user_session", unique=True
+            )
+        except Exception as e:
+            print(f"[⚠️] Could not create chat indexes: {e}")
+        _indexes_ready = True
+
+
+class SessionHistoryCache:
+    """
+    Per-session ring buffer of the most recent turns.
+
+    A session is cached once its history has been read from Mongo (or is
+    known to be empty); from then on new turns are appended on write and
+    history reads are served from memory once a single-document query
+    confirms MongoDB holds no newer turn (`HISTORY_BUFFER_VERIFY`), so turns
+    written by other processes and cleared chats are picked up. Sessions are
+    evicted LRU beyond `max_sessions`.
+    """
+
+    def __init__(self, max_turns=10, max_sessions=10000):
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, limit):
+        """Return the last `limit` turns (oldest first), or None if the session is not cached."""
+        if limit > self.max_turns:
+            return None
+        with self._lock:
+            turns = self._sessions.get(key)
+            if turns is None:
+                return None
+            self._sessions.move_to_end(key)
+            return list(turns)[-limit:] if limit else []
+
+    def fill(self, key, records):
+        """Cache a session from Mongo records (oldest first)."""
+        with self._lock:
+            self._sessions[key] = deque(records, maxlen=self.max_turns)
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def append(self, key, record):
+        with self._lock:
+            turns = self._sessions.get(key)
+            if turns is not None:
+                turns.append(record)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._sessions.pop(key, None)
+
+
+history_cache = SessionHistoryCache(max_turns=HISTORY_BUFFER_TURNS, max_sessions=HISTORY_BUFFER_SESSIONS)
+
+# Rolling summaries read by this process: key -> {"summary", "summarized_until"}.
+# Only served with HISTORY_BUFFER_VERIFY=0: checking a summary costs the same
+# single-document read as fetching it.
+_summary_cache = OrderedDict()
+_summary_lock = threading.Lock()
+
+
+def get_async_collection(name="chat_history"):
+    """Return the collection `name` bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    database = _async_collections.get(loop)
+    if database is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        database = AsyncIOMotorClient(MONGO_URI)[DB_NAME]
+        _async_collections[loop] = database
+    return database[name]
+
+
+def _chat_record(user_id, session_id, query, response, turn_id=None):
+    now = datetime.utcnow()
+    return {
+        "turn_id": turn_id or uuid.uuid4().hex,
+        "user_id": user_id,
+        "session_id": session_id,
+        "query": query,
+        "response": response,
+        # Mongo keeps milliseconds; truncate so cached and stored turns compare equal
+        "timestamp": now.replace(microsecond=now.microsecond // 1000 * 1000),
+    }
+
+
+def format_history(records):
+    """Format records given oldest first."""
+    history = [
+        f"User: {record['query']}\nAssistant: {record['response']}"
+        for record in records
+    ]
+    return "\n\n".join(history)
+
+
+def _history_query(user_id, session_id):
+    return {"user_id": user_id, "session_id": session_id}, HISTORY_PROJECTION
+
+
+def _remember_turn(record):
+    history_cache.append(
+        (record["user_id"], record["session_id"]),
+        {field: record[field] for field in ("turn_id", "query", "response", "timestamp")},
+    )
+
+
+def _with_queued(key, records, limit=None):
+    """
+    Add a session's turns that are still queued for writing to records read from Mongo.
+
+    Other sessions' queued writes are never waited for, so the first read
+    of a new session costs one query even while the writer is busy.
+    """
+    queued = chat_log.queued(key)
+    if not queued:
+        return records
+    seen = {(r["timestamp"], r["query"], r["response"]) for r in records}
+    for record in queued:
+        if (record["timestamp"], record["query"], record["response"]) not in seen:
+            records.append({field: record[field] for field in ("turn_id", "query", "response", "timestamp")})
+    records.sort(key=lambda r: r["timestamp"])
+    return records[-limit:] if limit else records
+
+
+def _turn_mark(record):
+    return (record.get("turn_id"), record.get("timestamp")) if record else None
+
+
+def _buffer_stale(key, newest):
+    """
+    Check a buffered session against `newest`, its newest turn in MongoDB.
+
+    The buffer is only current if its newest turn this process has already
+    written is that same turn. Anything else means another process added
+    turns or the chat was cleared since the buffer was filled.
+    """
+    buffered = history_cache.get(key, history_cache.max_turns) or []
+    queued = {record["turn_id"] for record in chat_log.queued(key)}
+    written = [record for record in buffered if record.get("turn_id") not in queued]
+    return _turn_mark(newest) != _turn_mark(written[-1] if written else None)
+
+
+def _upsert(record):
+    # Keyed on turn_id: replaying the same turn never creates a second document
+    return UpdateOne({"turn_id": record["turn_id"]}, {"$setOnInsert": record}, upsert=True)
+
+
+class ChatLogWriter:
+    """
+    Buffered write-behind logger for chat turns.
+
+    Records go into a bounded in-process queue and a background thread
+    writes them with one unordered `bulk_write` per batch, when
+    `batch_size` records are waiting or every `flush_interval` seconds.
+    Each record is upserted on its `turn_id`, so a turn is stored exactly
+    once even if it is submitted twice. When the queue is full, `submit`
+    blocks for up to `put_timeout` seconds and then writes the record
+    itself, slowing the producer down instead of dropping data. Without a
+    `collection`, records go to chat_history, looked up when written.
+
+    A batch that cannot be written is retried with exponential backoff (up
+    to `retry_max` seconds apart) and stays visible to `queued` meanwhile.
+    Whatever is still unwritten at `close` is appended to `spill_path` and
+    written back by the first successful batch after that, in this process
+    or the next one.
+    """
+
+    def __init__(self, collection=None, max_queue=10000, batch_size=100, flush_interval=0.5, put_timeout=1.0,
+                 retry_max=30.0, spill_path=None):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.retry_max = retry_max
+        self.spill_path = spill_path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._queued = {}  # (user_id, session_id) -> {turn_id: record} not yet written
+        self._retry = []  # batch that failed to write, retried before anything newer
+        self._wake = threading.Event()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chat-log-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, record, block=True):
+        """
+        Queue a chat record for writing.
+
+        Args:
+            record (dict): Record with a `turn_id`
+            block (bool): Wait for queue space (backpressure) instead of failing fast
+
+        Returns:
+            bool: False if the record was not taken (queue full, or writer
+            closed) and `block` is False; the caller writes it itself
+        """
+        if self._closed:
+            if not block:
+                return False
+            self._write_or_spill([record])
+            return True
+        self._start()
+        self._track([record])
+        try:
+            self._queue.put(record, block=block, timeout=self.put_timeout if block else None)
+            return True
+        except queue.Full:
+            if not block:
+                self._untrack([record])
+                return False
+            print("[⚠️] Chat log queue full, writing synchronously")
+            try:
+                self._write_or_spill([record])
+            finally:
+                self._untrack([record])
+            return True
+
+    def _track(self, records):
+        with self._lock:
+            for record in records:
+                key = (record.get("user_id"), record.get("session_id"))
+                self._queued.setdefault(key, {})[record["turn_id"]] = record
+
+    def _untrack(self, records):
+        with self._lock:
+            for record in records:
+                key = (record.get("user_id"), record.get("session_id"))
+                session = self._queued.get(key)
+                if session is not None:
+                    session.pop(record["turn_id"], None)
+                    if not session:
+                        del self._queued[key]
+
+    def queued(self, key) -> list:
+        """Records of one (user_id, session_id) submitted but not yet written, oldest first."""
+        with self._lock:
+            return list(self._queued.get(key, {}).values())
+
+    @property
+    def pending(self) -> int:
+        """Records submitted but not yet written."""
+        return self._queue.unfinished_tasks
+
+    def flush(self, timeout=10.0, key=None):
+        """
+        Block until queued records have been written (or `timeout` passes).
+
+        With a (user_id, session_id) `key`, only that session's records are
+        waited for, not the turns other sessions have queued.
+        """
+        self._wake.set()  # cut a retry backoff short
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if key is None and not self._queue.unfinished_tasks:
+                return
+            if key is not None and not self.queued(key):
+                return
+            time.sleep(0.01)
+
+    def close(self):
+        """Flush what is queued and spill what could not be written; later submits are written synchronously."""
+        self._closed = True
+        if self._thread is None:
+            return
+        self.flush()
+        with self._lock:
+            unwritten = [r for session in self._queued.values() for r in session.values()]
+        if unwritten:
+            self._spill(unwritten)
+
+    def _write(self, records) -> bool:
+        try:
+            collection = self.collection if self.collection is not None else get_collection()
+            collection.bulk_write([_upsert(r) for r in records], ordered=False)
+            return True
+        except Exception as e:
+            print(f"[⚠️] Chat log write of {len(records)} records failed: {e}")
+            return False
+
+    def _write_or_spill(self, records):
+        if self._write(records):
+            self._replay_spill()
+        else:
+            self._spill(records)
+
+    def _spill(self, records):
+        if not self.spill_path:
+            print(f"[❌] Lost {len(records)} chat records: MongoDB unreachable and no spill file configured")
+            return
+        with self._spill_lock:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps({**record, "timestamp": record["timestamp"].isoformat()}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        print(f"[💾] Spilled {len(records)} unwritten chat records to {self.spill_path}")
+
+    def _replay_spill(self):
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        with self._spill_lock:
+            records = []
+            with open(self.spill_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line of a crashed spill
+                    record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+                    records.append(record)
+            for i in range(0, len(records), self.batch_size):
+                if not self._write(records[i:i + self.batch_size]):
+                    return  # keep the file (upserts make the next replay idempotent)
+            os.remove(self.spill_path)
+        print(f"[✅] Wrote back {len(records)} spilled chat records")
+
+    def _next_batch(self):
+        batch = list(self._retry)
+        if not batch:
+            batch.append(self._queue.get())
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        delay = 0.0
+        while True:
+            batch = self._next_batch()
+            if self._write(batch):
+                self._retry, delay = [], 0.0
+                self._untrack(batch)
+                for _ in batch:
+                    self._queue.task_done()
+                self._replay_spill()  # MongoDB is reachable: write back earlier spills
+                continue
+            # Keep the batch (still visible to readers) and retry it after a backoff
+            self._retry = batch
+            delay = min(max(delay * 2, 0.5), self.retry_max)
+            print(f"[⚠️] Retrying {len(batch)} chat records in {delay:.1f}s")
+            self._wake.wait(delay)
+            self._wake.clear()
+
+
+# Writes to chat_history (resolved on the first write)
+chat_log = ChatLogWriter(
+    max_queue=CHAT_LOG_QUEUE_SIZE,
+    batch_size=CHAT_LOG_BATCH_SIZE,
+    flush_interval=CHAT_LOG_FLUSH_INTERVAL,
+    retry_max=CHAT_LOG_RETRY_MAX,
+    spill_path=CHAT_LOG_SPILL_PATH,
+)
+atexit.register(chat_log.close)
+
+
+def store_chat(user_id, session_id, query, response, turn_id=None):
     """
-    Store a chat interaction in MongoDB.
+    Store a chat interaction in MongoDB (write-behind, off the request path).
     
     Args:
         user_id (str): ID of the user
         session_id (str): ID of the session
         query (str): The user's query
         response (str): The assistant's response
+        turn_id (str): Idempotency key of the turn (generated if omitted)
     """
-    chat_record = {
-        "user_id": user_id,
-        "session_id": session_id,
-        "query": query,
-        "response": response,
-        "timestamp": datetime.utcnow()
-    }
-    chats_collection.insert_one(chat_record)
+    record = _chat_record(user_id, session_id, query, response, turn_id)
+    _remember_turn(record)
+    chat_log.submit(record)
+
+
+def fetch_chat_records(user_id: str, session_id: str, limit: int = 5) -> list:
+    """
+    Fetch the last `limit` chat records (oldest first) for a specific user and session.
+
+    Args:
+        user_id (str): Unique user ID
+        session_id (str): Unique session ID
+        limit (int): Number of recent turns to fetch
+
+    Returns:
+        list[dict]: Records with "turn_id", "query", "response" and "timestamp"
+    """
+    key = (user_id, session_id)
+    cached = history_cache.get(key, limit)
+    if cached is not None and HISTORY_BUFFER_VERIFY:
+        query, _ = _history_query(user_id, session_id)
+        newest = get_collection().find_one(query, NEWEST_TURN_PROJECTION, sort=[("timestamp", -1)])
+        cached = None if _buffer_stale(key, newest) else cached
+    if cached is not None:
+        return cached
+
+    # Cold (or stale) session: read Mongo, plus this session's turns still in the write queue
+    ensure_indexes()
+    query, projection = _history_query(user_id, session_id)
+    fetch = max(limit, history_cache.max_turns)
+    records = list(get_collection().find(query, projection).sort("timestamp", -1).limit(fetch))[::-1]
+    records = _with_queued(key, records, fetch)
+    history_cache.fill(key, records)
+    return records[-limit:] if limit else []
 
 
 def fetch_chat_history(user_id: str, session_id: str, limit: int = 5) -> str:
@@ -46,16 +515,182 @@ def fetch_chat_history(user_id: str, session_id: str, limit: int = 5) -> str:
     Returns:
         str: A formatted string of chat history
     """
-    records = (
-        chats_collection.find({"user_id": user_id, "session_id": session_id})
-        .sort("timestamp", -1)
-        .limit(limit)
-    )
-    history = [
-        f"User: {record['query']}\nAssistant: {record['response']}"
-        for record in reversed(list(records))
-    ]
-    return "\n\n".join(history)
+    return format_history(fetch_chat_records(user_id, session_id, limit))
+
+
+async def astore_chat(user_id, session_id, query, response, turn_id=None):
+    """
+    Async `store_chat`: queued on the write-behind logger without blocking the
+    event loop, or upserted through motor if the queue is full.
+    """
+    record = _chat_record(user_id, session_id, query, response, turn_id)
+    _remember_turn(record)
+    if not chat_log.submit(record, block=False):
+        await get_async_collection().bulk_write([_upsert(record)], ordered=False)
+
+
+async def afetch_chat_records(user_id: str, session_id: str, limit: int = 5) -> list:
+    """Async `fetch_chat_records` using the motor driver."""
+    key = (user_id, session_id)
+    cached = history_cache.get(key, limit)
+    if cached is not None and HISTORY_BUFFER_VERIFY:
+        query, _ = _history_query(user_id, session_id)
+        newest = await get_async_collection().find_one(query, NEWEST_TURN_PROJECTION, sort=[("timestamp", -1)])
+        cached = None if _buffer_stale(key, newest) else cached
+    if cached is not None:
+        return cached
+
+    if not _indexes_ready:
+        await asyncio.to_thread(ensure_indexes)
+    query, projection = _history_query(user_id, session_id)
+    fetch = max(limit, history_cache.max_turns)
+    cursor = get_async_collection().find(query, projection).sort("timestamp", -1).limit(fetch)
+    records = _with_queued(key, (await cursor.to_list(length=fetch))[::-1], fetch)
+    history_cache.fill(key, records)
+    return records[-limit:] if limit else []
+
+
+async def afetch_chat_history(user_id: str, session_id: str, limit: int = 5) -> str:
+    """Async `fetch_chat_history` using the motor driver."""
+    return format_history(await afetch_chat_records(user_id, session_id, limit))
+
+
+def _since_query(user_id, session_id, since):
+    query, projection = _history_query(user_id, session_id)
+    if since is not None:
+        query["timestamp"] = {"$gt": since}
+    return query, projection
+
+
+def fetch_chat_records_since(user_id: str, session_id: str, since=None) -> list:
+    """
+    Fetch every chat record (oldest first) of a session newer than `since`.
+
+    Used for the turns not folded into the rolling summary yet, which can
+    outnumber the history buffer when folds are skipped or fail.
+
+    Args:
+        user_id (str): Unique user ID
+        session_id (str): Unique session ID
+        since (datetime): Only turns after this timestamp (None = all turns)
+
+    Returns:
+        list[dict]: Records with "turn_id", "query", "response" and "timestamp"
+    """
+    ensure_indexes()
+    query, projection = _since_query(user_id, session_id, since)
+    records = list(get_collection().find(query, projection).sort("timestamp", 1))
+    return _with_queued((user_id, session_id), records)
+
+
+async def afetch_chat_records_since(user_id: str, session_id: str, since=None) -> list:
+    """Async `fetch_chat_records_since` using the motor driver."""
+    if not _indexes_ready:
+        await asyncio.to_thread(ensure_indexes)
+    query, projection = _since_query(user_id, session_id, since)
+    records = await get_async_collection().find(query, projection).sort("timestamp", 1).to_list(length=None)
+    return _with_queued((user_id, session_id), records)
+
+
+def _remember_summary(key, state):
+    with _summary_lock:
+        _summary_cache[key] = state
+        _summary_cache.move_to_end(key)
+        while len(_summary_cache) > HISTORY_BUFFER_SESSIONS:
+            _summary_cache.popitem(last=False)
+
+
+def _summary_state(doc):
+    doc = doc or {}
+    return {"summary": doc.get("summary", ""), "summarized_until": doc.get("summarized_until")}
+
+
+def fetch_summary(user_id: str, session_id: str) -> dict:
+    """
+    Fetch the rolling summary of a session's older turns.
+
+    Returns:
+        dict: "summary" (empty if none yet) and "summarized_until", the
+        timestamp of the last turn folded into it (None if none)
+    """
+    key = (user_id, session_id)
+    with _summary_lock:
+        state = None if HISTORY_BUFFER_VERIFY else _summary_cache.get(key)
+    if state is None:
+        doc = get_collection("chat_summaries").find_one({"user_id": user_id, "session_id": session_id})
+        state = _summary_state(doc)
+        _remember_summary(key, state)
+    return state
+
+
+async def afetch_summary(user_id: str, session_id: str) -> dict:
+    """Async `fetch_summary` using the motor driver."""
+    key = (user_id, session_id)
+    with _summary_lock:
+        state = None if HISTORY_BUFFER_VERIFY else _summary_cache.get(key)
+    if state is None:
+        doc = await get_async_collection("chat_summaries").find_one({"user_id": user_id, "session_id": session_id})
+        state = _summary_state(doc)
+        _remember_summary(key, state)
+    return state
+
+
+async def _aturn_stored(user_id, session_id, timestamp) -> bool:
+    """True while the turn at `timestamp` is in MongoDB or queued here to be written."""
+    if any(record["timestamp"] == timestamp for record in chat_log.queued((user_id, session_id))):
+        return True
+    query = {"user_id": user_id, "session_id": session_id, "timestamp": timestamp}
+    return await get_async_collection().find_one(query, {"_id": 1}) is not None
+
+
+async def asave_summary(user_id, session_id, previous, summary, summarized_until, turns) -> bool:
+    """
+    Replace a session's summary if nobody else has advanced it since `previous` was read.
+
+    Args:
+        user_id (str): ID of the user
+        session_id (str): ID of the session
+        previous (dict): The state the new summary was built from
+        summary (str): The new summary text
+        summarized_until (datetime): Timestamp of the last turn it covers
+        turns (int): Number of turns newly folded in
+
+    Returns:
+        bool: False if another worker updated the summary first, or the
+        chat was cleared while the summary was being written
+    """
+    key = (user_id, session_id)
+    # The last folded turn is gone once clear_chat has run: saving would bring the chat back
+    if not await _aturn_stored(user_id, session_id, summarized_until):
+        with _summary_lock:
+            _summary_cache.pop(key, None)
+        return False
+    try:
+        result = await get_async_collection("chat_summaries").update_one(
+            {"user_id": user_id, "session_id": session_id, "summarized_until": previous["summarized_until"]},
+            {
+                "$set": {"summary": summary, "summarized_until": summarized_until, "updated_at": datetime.utcnow()},
+                "$inc": {"turns_summarized": turns},
+            },
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        result = None
+    if result is None or not (result.matched_count or result.upserted_id):
+        with _summary_lock:
+            _summary_cache.pop(key, None)  # stale: re-read on next use
+        return False
+    # clear_chat deletes the turns before the summaries, so if the turn is
+    # gone now, a clear may have deleted the summaries before this write
+    if not await _aturn_stored(user_id, session_id, summarized_until):
+        await get_async_collection("chat_summaries").delete_one(
+            {"user_id": user_id, "session_id": session_id, "summarized_until": summarized_until}
+        )
+        with _summary_lock:
+            _summary_cache.pop(key, None)
+        return False
+    _remember_summary(key, {"summary": summary, "summarized_until": summarized_until})
+    return True
 
 
 def clear_chat(user_id, session_id):
@@ -67,6 +702,12 @@ def clear_chat(user_id, session_id):
         session_id (str): ID of the session
     """
     try:
-        chats_collection.delete_many({"user_id": user_id, "session_id": session_id})
+        history_cache.invalidate((user_id, session_id))
+        with _summary_lock:
+            _summary_cache.pop((user_id, session_id), None)
+        chat_log.flush(key=(user_id, session_id))  # so queued turns cannot reappear after the delete
+        # Turns before summaries: asave_summary relies on this order to undo a racing save
+        get_collection("chat_history").delete_many({"user_id": user_id, "session_id": session_id})
+        get_collection("chat_summaries").delete_many({"user_id": user_id, "session_id": session_id})
     except Exception as e:
         print(f"Error clearing chat: {e}")
@@ -0,0 +1,158 @@
+# utils/query_batcher.py
+
+import time
+import asyncio
+import weakref
+import threading
+import numpy as np
+from utils.metrics import span, record
+from utils.async_utils import run_in_background
+
+
+def batch_similarity_search(faiss_db, vectors, k):
+    """
+    `similarity_search_with_score_by_vector` for many query vectors with one FAISS `search` call.
+
+    Args:
+        faiss_db (FAISS): The vectorstore
+        vectors (list[list[float]]): Query vectors
+        k (int): Hits per query
+
+    Returns:
+        list[list[tuple]]: (Document, distance) hits for each vector, as the single-vector call returns them
+    """
+    import faiss
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if faiss_db._normalize_L2:
+        faiss.normalize_L2(matrix)
+    scores, indices = faiss_db.index.search(matrix, k)
+
+    results = []
+    for row_scores, row_indices in zip(scores, indices):
+        hits = []
+        for score, i in zip(row_scores, row_indices):
+            if i == -1:
+                continue  # fewer than k vectors in the index
+            doc_id = faiss_db.index_to_docstore_id[i]
+            doc = faiss_db.docstore.search(doc_id)
+            if isinstance(doc, str):
+                raise ValueError(f"Could not find document for id {doc_id}, got {doc}")
+            hits.append((doc, score))
+        results.append(hits)
+    return results
+
+
+class QueryBatcher:
+    """
+    Coalesces the retrieval step of concurrent turns into batches.
+
+    Queries submitted within `window` seconds of the first one in a batch
+    (or until `max_batch` are waiting) are embedded with one model call and
+    searched with one FAISS `search` per vectorstore; each caller gets its
+    own (vector, candidates) back. A query waits at most `window` before its
+    batch starts, which is the latency added in exchange for fewer, larger
+    calls.
+
+    Batches are formed per event loop: sync callers share the loop of
+    `run_sync`, the API workers use their own.
+    """
+
+    def __init__(self, embed_batch, search_batch, window=0.01, max_batch=32):
+        """
+        Args:
+            embed_batch (callable): async f(texts) -> (vectors, cache-hit flags)
+            search_batch (callable): f(store, vectors) -> candidate lists, run in a worker thread
+            window (float): Seconds to wait for more queries after the first
+            max_batch (int): Start the batch as soon as this many are waiting
+        """
+        self.embed_batch = embed_batch
+        self.search_batch = search_batch
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.queries = 0
+        self.largest_batch = 0
+        self.total_wait = 0.0
+        self._pending = weakref.WeakKeyDictionary()  # loop -> [(store, query, future, enqueued_at)]
+        self._timers = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    async def submit(self, faiss_db, query):
+        """
+        Queue a query for the next batch and wait for its result.
+
+        Returns:
+            tuple: (query vector, list of (Document, score) candidates)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            pending = self._pending.setdefault(loop, [])
+            pending.append((faiss_db, query, future, time.perf_counter()))
+            size = len(pending)
+            if size == 1 and self.max_batch > 1:
+                self._timers[loop] = loop.call_later(self.window, self._flush, loop)
+        if size >= self.max_batch:
+            self._flush(loop)
+        return await future
+
+    def _flush(self, loop):
+        with self._lock:
+            timer = self._timers.pop(loop, None)
+            batch = self._pending.pop(loop, [])
+        if timer is not None:
+            timer.cancel()
+        if batch:
+            run_in_background(self._run(batch))
+
+    async def _run(self, batch):
+        start = time.perf_counter()
+        waits = [start - enqueued_at for _, _, _, enqueued_at in batch]
+        for wait in waits:
+            record("query_batch_wait", wait)
+        with self._lock:
+            self.batches += 1
+            self.queries += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.total_wait += sum(waits)
+
+        try:
+            # (1) One embedding call for every query not in the cache
+            with span("query_embedding_batch", docs=len(batch)) as s:
+                vectors, hits = await self.embed_batch([query for _, query, _, _ in batch])
+                s["cache_hits"] = sum(hits)
+
+            # (2) One FAISS search per vectorstore (namespace) in the batch
+            groups = {}
+            for i, (faiss_db, _, _, _) in enumerate(batch):
+                groups.setdefault(id(faiss_db), (faiss_db, []))[1].append(i)
+            with span("faiss_search_batch", docs=len(batch)):
+                results = await asyncio.to_thread(self._search_groups, groups, vectors)
+        except Exception as e:
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for i, (_, _, future, _) in enumerate(batch):
+            if not future.done():
+                future.set_result((vectors[i], results[i]))
+
+    def _search_groups(self, groups, vectors):
+        results = {}
+        for faiss_db, rows in groups.values():
+            for i, hits in zip(rows, self.search_batch(faiss_db, [vectors[i] for i in rows])):
+                results[i] = hits
+        return results
+
+    def stats(self) -> dict:
+        """Batches formed, queries served, mean/largest batch size and mean added wait."""
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "queries": self.queries,
+                "mean_batch": round(self.queries / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+                "mean_wait_ms": round(self.total_wait / self.queries * 1000, 3) if self.queries else 0.0,
+            }
@@ -1,15 +1,129 @@
 import os
+import re
 import sys
+import time
 import asyncio
 import httpx
 from utils.load_env import load_env_file
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from utils.deploy_package import timed_phase, format_timings
 
 if sys.platform.startswith("win"):
     from asyncio import WindowsProactorEventLoopPolicy
     asyncio.set_event_loop_policy(WindowsProactorEventLoopPolicy())
 
+# Status polling: the first check comes DEPLOY_POLL_INITIAL seconds after the
+# deploy starts, the gap then grows up to DEPLOY_POLL_MAX (and drops back
+# when the status moves), until DEPLOY_TIMEOUT
+DEPLOY_TIMEOUT = float(os.getenv("DEPLOY_TIMEOUT", "600"))
+DEPLOY_POLL_INITIAL = float(os.getenv("DEPLOY_POLL_INITIAL", "5"))
+DEPLOY_POLL_MAX = float(os.getenv("DEPLOY_POLL_MAX", "60"))
+DEPLOY_PROBE_TIMEOUT = float(os.getenv("DEPLOY_PROBE_TIMEOUT", "15"))
+RENDER_API_URL = os.getenv("RENDER_API_URL", "https://api.render.com/v1")
+
+# Render deploy statuses that will never turn into "live"
+_FAILED_STATUSES = {"build_failed", "update_failed", "pre_deploy_failed", "canceled", "deactivated"}
+
+
+class DeployFailed(Exception):
+    pass
+
+
+def http_probe(url, client):
+    """Probe that reports live once `url` answers 200."""
+    async def probe():
+        res = await client.get(url, timeout=DEPLOY_PROBE_TIMEOUT)
+        return True if res.status_code == 200 else res.status_code
+    return probe
+
+
+def render_api_probe(service_id, api_key, client, api_url=None):
+    """
+    Probe reading the status of a service's latest deploy from the Render API.
+
+    Raises:
+        DeployFailed: When the deploy failed or was canceled
+    """
+    url = f"{(api_url or RENDER_API_URL).rstrip('/')}/services/{service_id}/deploys"
+
+    async def probe():
+        res = await client.get(url, params={"limit": 1}, timeout=DEPLOY_PROBE_TIMEOUT,
+                               headers={"Authorization": f"Bearer {api_key}", "Accept": "application/json"})
+        res.raise_for_status()
+        deploys = res.json()
+        if not deploys:
+            return None
+        status = deploys[0].get("deploy", deploys[0]).get("status")
+        if status in _FAILED_STATUSES:
+            raise DeployFailed(f"Render deploy {status}")
+        return True if status == "live" else status
+    return probe
+
+
+async def wait_until_live(probes, timeout=None, initial_interval=None, max_interval=None, factor=2.0,
+                          initial_delay=None) -> int:
+    """
+    Run all `probes` concurrently, with exponential backoff between rounds, until one reports live.
+
+    A probe is an async callable returning True when the app is live, or any
+    other value describing its current status. A probe that errors (timeout,
+    connection refused while the service starts) just counts as not live.
+    When a status changes, the next check comes quickly again, since the
+    deploy is moving.
+
+    Args:
+        probes (list[callable]): Status checks
+        timeout (float): Seconds before giving up (DEPLOY_TIMEOUT)
+        initial_interval (float): First gap between rounds (DEPLOY_POLL_INITIAL)
+        max_interval (float): Largest gap between rounds (DEPLOY_POLL_MAX)
+        factor (float): Gap growth per round without progress
+        initial_delay (float): Wait before the first round (`initial_interval` by default;
+            0 checks at once, e.g. when the app is expected to be up already)
+
+    Returns:
+        int: Number of polling rounds it took
+
+    Raises:
+        DeployFailed: A probe reported a failed deploy
+        TimeoutError: Not live within `timeout`
+    """
+    timeout = DEPLOY_TIMEOUT if timeout is None else timeout
+    initial_interval = DEPLOY_POLL_INITIAL if initial_interval is None else initial_interval
+    max_interval = DEPLOY_POLL_MAX if max_interval is None else max_interval
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    interval, previous, rounds = initial_interval, None, 0
+    initial_delay = initial_interval if initial_delay is None else initial_delay
+
+    async def check(probe):
+        try:
+            return await asyncio.wait_for(probe(), DEPLOY_PROBE_TIMEOUT)
+        except DeployFailed:
+            raise
+        except Exception as e:
+            return type(e).__name__
+
+    if initial_delay > 0:
+        await asyncio.sleep(min(initial_delay, timeout))
+    while True:
+        rounds += 1
+        statuses = await asyncio.gather(*(check(probe) for probe in probes))
+        if any(status is True for status in statuses):
+            return rounds
+
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise TimeoutError(f"App did not go live in {timeout:g}s (last status: {statuses})")
+        if previous is not None and statuses != previous:
+            interval = initial_interval
+        print(f"[⌛] Not live yet ({', '.join(map(str, statuses))}); next check in {min(interval, remaining):.0f}s")
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(interval * factor, max_interval)
+        previous = statuses
+
+
 async def deploy_to_render() -> str:
+    from playwright.async_api import async_playwright
+
     # Load .env variables
     env_vars = load_env_file()
     email = env_vars.get("RENDER_EMAIL")
@@ -18,6 +132,7 @@ async def deploy_to_render() -> str:
     if not email or not password:
         raise ValueError("Missing Render credentials in environment variables.")
 
+    timings = {}
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=False)
         page = await browser.new_page()
@@ -29,14 +144,16 @@ async def deploy_to_render() -> str:
         # Step 2: Login
         if "login" in page.url:
             print("[🔐] Logging in to Render...")
-            await page.fill('input[name="email"]', email)
-            await page.fill('input[name="password"]', password)
-            await page.click('button[type="submit"]')
-            await page.wait_for_load_state("networkidle")
+            with timed_phase(timings, "login"):
+                await page.fill('input[name="email"]', email)
+                await page.fill('input[name="password"]', password)
+                await page.click('button[type="submit"]')
+                await page.wait_for_load_state("networkidle")
             print("[✅] Logged in!")
 
         # Step 3: Wait for GitHub repo section to load
         print("[📦] Waiting for GitHub repo list to load...")
+        configure_start = time.perf_counter()
         await page.wait_for_selector('h2:has-text("Git Provider")', timeout=60000)
 
         # Step 4: Click latest GitHub repo link (not Public Git)
@@ -73,43 +190,51 @@ async def deploy_to_render() -> str:
         print("[🚀] Clicking 'Deploy Web Service'...")
         await page.click('text="Deploy Web Service"')
 
-        # Step 8: Wait for deployment to go Live
+        # Step 8: Wait for deployment to go Live, checking the dashboard, the
+        # Render API (RENDER_API_KEY) and the app URL concurrently
+        timings["configure"] = round(time.perf_counter() - configure_start, 3)
         print("[⌛] Waiting for app to go live...")
-        for i in range(5):
-            print(f"[⌛] Checking deployment status... Attempt {i + 1}/5")
-            await asyncio.sleep(120)
-            await page.reload()
-            live = await page.query_selector('text=Live')
-            if live:
-                print("[✅] App is now live!")
-                break
-        else:
-            raise TimeoutError("App did not go live in 10 minutes.")
-
-        # Step 9: Get live URL
-        print("[🔗] Getting live URL...")
-        link = await page.query_selector('a[href^="https://"]')
+        await page.wait_for_load_state("networkidle")
+        link = await page.query_selector('a[href*=".onrender.com"]')
         live_url = await link.get_attribute("href") if link else None
+        service = re.search(r"srv-[a-z0-9]+", page.url)
 
-        if not live_url:
-            print("[⚠️] Unable to fetch live URL.")
-            return "❌ Deployment completed, but live URL not found."
-
-        # Step 10: Verify the live app is accessible
-        print("[📡] Verifying the live app is reachable (HTTP 200)...")
-        for _ in range(3):
+        async def dashboard_probe():
+            await page.reload()
+            return True if await page.query_selector('text=Live') else "dashboard: not live"
+
+        async with httpx.AsyncClient(follow_redirects=True) as client:
+            probes = [dashboard_probe]
+            if live_url:
+                probes.append(http_probe(live_url, client))
+            api_key = os.getenv("RENDER_API_KEY")
+            if api_key and service:
+                probes.append(render_api_probe(service.group(0), api_key, client))
+            with timed_phase(timings, "wait_live"):
+                rounds = await wait_until_live(probes)
+            print(f"[✅] App is now live! ({rounds} checks)")
+
+            # Step 9: Get live URL
+            if not live_url:
+                print("[🔗] Getting live URL...")
+                link = await page.query_selector('a[href^="https://"]')
+                live_url = await link.get_attribute("href") if link else None
+
+            if not live_url:
+                print("[⚠️] Unable to fetch live URL.")
+                return "❌ Deployment completed, but live URL not found."
+
+            # Step 10: Verify the live app is accessible
+            print("[📡] Verifying the live app is reachable (HTTP 200)...")
             try:
-                async with httpx.AsyncClient() as client:
-                    res = await client.get(live_url, timeout=30)
-                    if res.status_code == 200:
-                        print(f"[🎉] Successfully Deployed: {live_url}")
-                        break
-            except:
-                await asyncio.sleep(5)
-        else:
-            raise Exception("Deployment succeeded but app did not return 200 OK")
+                with timed_phase(timings, "verify"):
+                    await wait_until_live([http_probe(live_url, client)], timeout=120, initial_delay=0)
+            except TimeoutError:
+                raise Exception("Deployment succeeded but app did not return 200 OK")
+            print(f"[🎉] Successfully Deployed: {live_url}")
 
         await browser.close()
+        print(f"[⏱️] Render phases: {format_timings(timings)}")
 
         # Return iframe embed
         embed_code = f"""<iframe src="{live_url}" width="100%" height="800px" frameborder="0"></iframe>"""
@@ -0,0 +1,51 @@
+# utils/resources.py
+
+import threading
+import functools
+
+
+class LazyResource:
+    """
+    Process-wide object built by `factory` on first use.
+
+    Construction happens exactly once per process, even when several
+    threads ask for it at the same time; later calls return the same object
+    without locking. Streamlit reruns, API workers and background threads
+    all share it.
+    """
+
+    def __init__(self, factory):
+        functools.update_wrapper(self, factory)
+        self.factory = factory
+        self._value = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    self._value = self.factory()
+                    self._ready = True
+        return self._value
+
+    @property
+    def loaded(self) -> bool:
+        return self._ready
+
+    def override(self, value):
+        """Use `value` instead of building the resource (benchmarks, alternative entry points)."""
+        with self._lock:
+            self._value = value
+            self._ready = True
+
+    def reset(self):
+        """Drop the instance; the next call builds a new one."""
+        with self._lock:
+            self._value = None
+            self._ready = False
+
+
+def lazy_resource(factory):
+    """Decorator turning a zero-argument factory into a `LazyResource`."""
+    return LazyResource(factory)
@@ -0,0 +1,193 @@
+# utils/vectorstore_utils.py
+
+import os
+import json
+import time
+import uuid
+import shutil
+import tempfile
+from utils.faiss_index import mmap_io_flags, apply_search_params
+from utils.embedding_providers import check_embedding_model
+
+META_FILE = "meta.json"
+INDEX_FILES = ("index.faiss", "index.pkl")
+
+
+class VectorstoreChanged(Exception):
+    """The vectorstore was replaced on disk while it was being loaded."""
+
+
+def read_vectorstore_meta(path):
+    """
+    Read the metadata manifest stored next to a FAISS vectorstore.
+
+    Args:
+        path (str): Vectorstore directory
+
+    Returns:
+        dict: The manifest contents, or an empty dict if none was written
+    """
+    meta_file = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_file):
+        return {}
+    try:
+        with open(meta_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_vectorstore_meta(path, version=None, **fields):
+    """
+    Atomically write the metadata manifest with a fresh version stamp.
+
+    Existing fields are kept unless overridden. The manifest is written last
+    by `save_vectorstore`, so a changed version means the files are complete.
+
+    Args:
+        path (str): Vectorstore directory
+        version (str): Version to stamp (a new random one by default)
+        **fields: Extra metadata to record
+
+    Returns:
+        dict: The manifest that was written
+    """
+    meta = read_vectorstore_meta(path)
+    meta.update(fields)
+    meta["version"] = version or uuid.uuid4().hex
+    meta["updated_at"] = time.time()
+
+    fd, tmp_path = tempfile.mkstemp(dir=path, prefix=".meta-", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, META_FILE))
+    return meta
+
+
+def get_vectorstore_version(path):
+    """
+    Return a string that changes whenever the vectorstore on disk changes.
+
+    Uses the manifest version when present and falls back to the mtimes and
+    sizes of the index files for stores built before the manifest existed.
+
+    Args:
+        path (str): Vectorstore directory
+
+    Returns:
+        str | None: Version string, or None if no index exists
+    """
+    version = read_vectorstore_meta(path).get("version")
+    if version:
+        return version
+
+    parts = []
+    for name in INDEX_FILES:
+        file_path = os.path.join(path, name)
+        if not os.path.exists(file_path):
+            return None
+        stat = os.stat(file_path)
+        parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+    return "|".join(parts)
+
+
+def save_vectorstore(faiss_db, path, **meta):
+    """
+    Save a FAISS vectorstore so concurrent readers never see partial files.
+
+    The FAISS index goes to `index.faiss` and the chunks to `docs.sqlite`
+    (no pickle, with its BM25 keyword index). Both are written to a temporary directory first, moved
+    into place with atomic renames, and the manifest is bumped last.
+
+    The docstore carries the new version and is renamed before the index, so
+    a reader never sees a new index with an old docstore, and a new docstore
+    next to an older manifest tells `load_vectorstore` to retry.
+
+    Args:
+        faiss_db (FAISS): The vectorstore to save
+        path (str): Target directory
+        **meta: Extra metadata to record in the manifest
+
+    Returns:
+        dict: The manifest that was written
+    """
+    import faiss
+    from utils.docstore import DOCSTORE_FILE, write_docstore
+
+    os.makedirs(path, exist_ok=True)
+    version = uuid.uuid4().hex
+    tmp_dir = tempfile.mkdtemp(dir=path, prefix=".tmp-")
+    try:
+        faiss.write_index(faiss_db.index, os.path.join(tmp_dir, "index.faiss"))
+        write_docstore(os.path.join(tmp_dir, DOCSTORE_FILE), faiss_db, version=version)
+        for name in (DOCSTORE_FILE, "index.faiss"):  # docstore first (see above)
+            os.replace(os.path.join(tmp_dir, name), os.path.join(path, name))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # Drop the pickled docstore of stores saved by older versions
+    legacy_pickle = os.path.join(path, "index.pkl")
+    if os.path.exists(legacy_pickle):
+        os.remove(legacy_pickle)
+    return write_vectorstore_meta(path, version=version, **meta, docstore="sqlite", lexical="fts5_bm25")
+
+
+def load_vectorstore(path, embeddings, mmap=True, nprobe=None, ef_search=None, writable=False, embedding_model=None):
+    """
+    Open a saved FAISS vectorstore.
+
+    For querying (`writable=False`) chunks stay in SQLite and only the top-k
+    hits are read, so open time does not grow with the corpus. With
+    `mmap=True` the index is also opened read-only and memory-mapped, so
+    worker processes on the same host share its pages instead of each
+    holding a private copy. `writable=True` loads everything into memory for
+    ingestion. Stores saved before the SQLite docstore existed are read from
+    their pickle once and converted on the next save.
+
+    Args:
+        path (str): Vectorstore directory
+        embeddings (Embeddings): Query embedder
+        mmap (bool): Memory-map the index read-only (ignored when writable)
+        nprobe (int): IVF lists to probe per query
+        ef_search (int): HNSW search breadth
+        writable (bool): Load for adding/deleting documents
+        embedding_model (str): Identity of `embeddings`; refuses stores
+            stamped with a different model
+
+    Returns:
+        FAISS: The loaded vectorstore
+
+    Raises:
+        VectorstoreChanged: If the docstore belongs to a newer save than the
+            manifest (a save is in progress; load again). Not checked when writable
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from utils.docstore import DOCSTORE_FILE, SQLiteDocstore
+
+    meta = read_vectorstore_meta(path)
+    if embedding_model:
+        check_embedding_model(meta, embedding_model)
+    index_type = meta.get("index", {}).get("index_type", "flat")
+    io_flags = mmap_io_flags(index_type) if mmap and not writable else 0
+    docstore_file = os.path.join(path, DOCSTORE_FILE)
+
+    if os.path.exists(docstore_file):
+        index = faiss.read_index(os.path.join(path, "index.faiss"), io_flags)
+        docstore = SQLiteDocstore(docstore_file)
+        # Ingestion (writable) is the only writer, so it never races a save
+        stamped = None if writable else docstore.version
+        if stamped and meta.get("version") and stamped != meta["version"]:
+            raise VectorstoreChanged(f"{path} is being replaced (docstore {stamped}, manifest {meta['version']})")
+        if writable:
+            id_map = dict(docstore.id_map().items())
+            docstore = InMemoryDocstore({i: docstore.search(i) for i in id_map.values()})
+            faiss_db = FAISS(embeddings, index, docstore, id_map)
+        else:
+            faiss_db = FAISS(embeddings, index, docstore, docstore.id_map())
+    else:
+        faiss_db = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True, io_flags=io_flags)
+
+    apply_search_params(faiss_db.index, nprobe=nprobe, ef_search=ef_search)
+    return faiss_db
@@ -1,10 +1,22 @@
 import os
+import argparse
+import numpy as np
 from dotenv import load_dotenv
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_cohere import CohereEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 import streamlit as st
+from utils.vectorstore_utils import save_vectorstore, load_vectorstore, read_vectorstore_meta
+from utils.faiss_index import resolve_index_params, new_faiss_index, training_sample, supports_remove
+from utils.embedding_store import EmbeddingStore, StoredEmbeddings
+from utils.ingestion_engine import IngestionEngine
+from utils.embedding_providers import get_embedding_backend, embedding_model_id
+from utils.metrics import span
+from utils.index_registry import namespace_path
+from utils.ingest_manifest import (
+    load_manifest, save_manifest, manifest_from_index, diff_source, drop_missing_sources, refresh_metadata
+)
 
 # Load .env
 load_dotenv()
@@ -14,10 +26,34 @@ TXT_DIRECTORY = 'txt/'
 FILE_PATH = os.path.join(TXT_DIRECTORY, '.txt')
 FAISS_DB_PATH = "vectorstore"
 INDEX_FILE = os.path.join(FAISS_DB_PATH, "index.faiss")
+# Namespaced indexes (one per tenant / site id): sources in NAMESPACE_TXT_DIRECTORY/<namespace>/,
+# index in FAISS_DB_PATH/<namespace>/
+NAMESPACE_TXT_DIRECTORY = os.getenv("NAMESPACE_TXT_DIRECTORY", "txt_namespaces/")
 COHERE_API_KEY = os.getenv("COHERE_API_KEY")
+EMBEDDING_MODEL_NAME = embedding_model_id()  # EMBEDDING_PROVIDER: cohere or local
+EMBEDDING_STORE_PATH = os.getenv("EMBEDDING_STORE_PATH", ".cache/embeddings")
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float32")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "96"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+
+# FAISS index type for new builds/rebuilds: flat, ivf_flat, hnsw, ivf_pq or ivf_sq
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "0")) or None  # IVF lists (default ~4*sqrt(n))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "16"))
+FAISS_SQ_BITS = int(os.getenv("FAISS_SQ_BITS", "8"))
+FAISS_TRAIN_SAMPLE = int(os.getenv("FAISS_TRAIN_SAMPLE", "50000"))
+
+
+# Step 1: Find and load text files
+def list_txt_files(directory):
+    """All .txt files under `directory`, recursively, in a stable order."""
+    found = []
+    for root, _, files in os.walk(directory):
+        found.extend(os.path.normpath(os.path.join(root, f)) for f in files if f.endswith(".txt"))
+    return sorted(found)
 
 
-# Step 1: Load text file
 def load_txt(file_path):
     if not os.path.exists(file_path):
         st.error("❌ Text file not found. Please check the file path.")
@@ -28,50 +64,188 @@ def load_txt(file_path):
 
 # Step 2: Split documents into chunks
 def create_chunks(documents): 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    # start_index lets retrieval merge overlapping neighbours instead of repeating them
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True)
     return splitter.split_documents(documents)
 
 
-# Step 3: Get Cohere embeddings
-def get_embedding_model():
-    return CohereEmbeddings(model="embed-english-v3.0")  # or embed-multilingual-v3.0
+# Step 3: Get embeddings from the configured provider, backed by the persistent embedding store
+def get_embedding_store():
+    return EmbeddingStore(EMBEDDING_STORE_PATH, dtype=EMBEDDING_STORE_DTYPE)
+
+
+def get_embedding_model(offline=False, backend=None):
+    # Offline mode never calls the model: every vector must already be stored
+    if backend is None and not offline:
+        backend = get_embedding_backend()
+    return StoredEmbeddings(backend, get_embedding_store(), EMBEDDING_MODEL_NAME, offline=offline)
+
+
+def get_ingestion_engine(backend=None):
+    # `backend` lets the engine run offline against a fake (see benchmarks.fakes.FakeEmbeddings)
+    backend = backend or get_embedding_backend()
+    return IngestionEngine(
+        backend,
+        get_embedding_store(),
+        EMBEDDING_MODEL_NAME,
+        batch_size=EMBED_BATCH_SIZE,
+        # Local models parallelise internally; concurrent batches only help remote APIs
+        concurrency=getattr(backend, "max_concurrency", EMBED_CONCURRENCY),
+    )
+
+
+# Step 4: Create a FAISS vectorstore of the configured index type
+def create_vectorstore(docs, ids, embeddings):
+    texts = [d.page_content for d in docs]
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    params = resolve_index_params(
+        FAISS_INDEX_TYPE, len(vectors), vectors.shape[1],
+        nlist=FAISS_NLIST, hnsw_m=FAISS_HNSW_M, pq_m=FAISS_PQ_M, sq_bits=FAISS_SQ_BITS,
+    )
+    index = new_faiss_index(vectors.shape[1], params, training_sample(vectors, FAISS_TRAIN_SAMPLE))
+
+    faiss_db = FAISS(embeddings, index, InMemoryDocstore(), {})
+    faiss_db.add_embeddings(zip(texts, vectors), metadatas=[d.metadata for d in docs], ids=list(ids))
+    return faiss_db, params
 
 
-# Step 4: Build or update vector DB
-def build_or_update_vector_db(txt_path=None):
+def get_index_params(db_path=FAISS_DB_PATH):
+    """Index type and build parameters recorded for the vectorstore in `db_path`."""
+    return read_vectorstore_meta(db_path).get("index", {"index_type": "flat"})
+
+
+# Step 5: Apply adds/removals to an existing FAISS index
+def apply_changes(faiss_db, new_chunks, new_ids, stale_ids, embeddings, db_path=FAISS_DB_PATH):
+    """
+    Returns:
+        tuple: (updated vectorstore, new index params or None if unchanged)
+    """
+    # Filter against the index itself so a stale manifest can never cause
+    # duplicate adds or deletes of ids that are already gone.
+    existing = set(faiss_db.index_to_docstore_id.values())
+    stale_ids = [i for i in stale_ids if i in existing]
+    pending = [(c, i) for c, i in zip(new_chunks, new_ids) if i not in existing]
+
+    if stale_ids and not supports_remove(get_index_params(db_path)["index_type"]):
+        # HNSW/IVF cannot delete safely: rebuild from stored vectors (no embedding calls for kept chunks)
+        stale = set(stale_ids)
+        keep = [(faiss_db.docstore.search(i), i) for i in faiss_db.index_to_docstore_id.values() if i not in stale]
+        if not keep + pending:
+            params = {"index_type": "flat"}
+            return FAISS(embeddings, new_faiss_index(faiss_db.index.d, params), InMemoryDocstore(), {}), params
+        docs, ids = zip(*(keep + pending))
+        return create_vectorstore(docs, ids, embeddings)
+
+    if stale_ids:
+        faiss_db.delete(stale_ids)
+    if pending:
+        chunks, ids = zip(*pending)
+        faiss_db.add_documents(list(chunks), ids=list(ids))
+    return faiss_db, None
+
+
+# Step 6: Build or update vector DB (only embeds chunks that changed)
+def build_or_update_vector_db(txt_path=None, backend=None, namespace=None):
+    """
+    Ingest one text file, or every .txt file under a directory (TXT_DIRECTORY by default).
+
+    New chunks are embedded in resumable batches by the ingestion engine
+    before they are added to the FAISS index. With a `namespace`, the
+    sources default to NAMESPACE_TXT_DIRECTORY/<namespace>/ and the index
+    is FAISS_DB_PATH/<namespace>/, built independently of every other
+    namespace (the embedding store is shared, so identical chunks are
+    embedded once).
+    """
     try:
+        db_path = namespace_path(FAISS_DB_PATH, namespace)
+        index_file = os.path.join(db_path, "index.faiss")
         st.info("📄 Loading and chunking documents...")
-        documents = load_txt(txt_path or FILE_PATH)
-        if not documents:
+        target = txt_path or (os.path.join(NAMESPACE_TXT_DIRECTORY, namespace) if namespace else TXT_DIRECTORY)
+        sources = list_txt_files(target) if os.path.isdir(target) else [os.path.normpath(target)]
+
+        chunks_by_source = {}
+        with span("ingest_chunking") as s:
+            for source in sources:
+                documents = load_txt(source)
+                if documents:
+                    chunks_by_source[source] = create_chunks(documents)
+            s["docs"] = sum(len(chunks) for chunks in chunks_by_source.values())
+        if not chunks_by_source:
             return False  # Exit early if document loading failed
 
-        chunks = create_chunks(documents)
-        st.success("✅ Text successfully split into chunks!")
+        st.success(f"✅ {len(chunks_by_source)} file(s) successfully split into chunks!")
 
-        st.info("🧠 Generating embeddings with Cohere...")
-        embeddings = get_embedding_model()
+        embeddings = get_embedding_model(backend=backend)
 
         # Ensure vectorstore directory exists
-        os.makedirs(FAISS_DB_PATH, exist_ok=True)
+        os.makedirs(db_path, exist_ok=True)
+
+        # Work out which chunks are new, changed or gone
+        faiss_db = None
+        manifest = load_manifest(db_path)
+        if manifest is None:
+            manifest = {"sources": {}}
+            if os.path.exists(index_file):
+                # Index built before the manifest existed: derive it once
+                faiss_db = load_vectorstore(db_path, embeddings, writable=True, embedding_model=EMBEDDING_MODEL_NAME)
+                manifest = manifest_from_index(faiss_db)
+
+        new_chunks, new_ids, stale_ids, moved = [], [], [], []
+        with span("ingest_diff") as s:
+            for source, chunks in chunks_by_source.items():
+                source_chunks, source_ids, source_stale, source_moved = diff_source(manifest, source, chunks)
+                new_chunks += source_chunks
+                new_ids += source_ids
+                stale_ids += source_stale
+                moved += source_moved
+            stale_ids += drop_missing_sources(manifest)
+            s.update(docs=len(new_chunks), stale_docs=len(stale_ids))
+
+        if not new_chunks and not stale_ids and not moved:
+            save_manifest(db_path, manifest)
+            st.success("✅ Vector DB already up to date, nothing to embed.")
+            return True
+
+        st.info(f"🧠 Generating embeddings with {EMBEDDING_MODEL_NAME} for {len(new_chunks)} new/changed chunks "
+                f"({len(stale_ids)} stale chunks to remove)...")
+
+        # Batched, concurrent, checkpointed embedding; FAISS then reads every vector from the store
+        with span("ingest_embedding") as s:
+            stats = get_ingestion_engine(backend).embed_all([c.page_content for c in new_chunks])
+            s.update(docs=stats["done"], cache_hits=stats["skipped"])
+        st.success(f"✅ Embedded {stats['done']} chunks ({stats['skipped']} already stored) "
+                   f"at {stats['chunks_per_sec']:.1f} chunks/s")
 
         # Check if index file exists
-        if os.path.exists(INDEX_FILE):
+        if faiss_db is None and os.path.exists(index_file):
             # Load and update existing FAISS index
-            faiss_db = FAISS.load_local(
-                FAISS_DB_PATH,
-                embeddings,
-                allow_dangerous_deserialization=True
-            )
-            faiss_db.add_documents(chunks)
+            faiss_db = load_vectorstore(db_path, embeddings, writable=True, embedding_model=EMBEDDING_MODEL_NAME)
+
+        if faiss_db is not None:
+            with span("ingest_index_update") as s:
+                # Kept chunks carry their new offsets, so span merging stays exact
+                refresh_metadata(faiss_db, moved)
+                faiss_db, index_params = apply_changes(faiss_db, new_chunks, new_ids, stale_ids, embeddings, db_path)
+                s["docs"] = faiss_db.index.ntotal
             st.success("🔄 Vector DB updated!")
-        else:
+        elif new_chunks:
             # Create a new FAISS index from documents
-            faiss_db = FAISS.from_documents(chunks, embeddings)
-            st.success("🆕 Vector DB created!")
+            with span("ingest_index_build") as s:
+                faiss_db, index_params = create_vectorstore(new_chunks, new_ids, embeddings)
+                s["docs"] = faiss_db.index.ntotal
+            st.success(f"🆕 Vector DB created ({index_params['index_type']} index)!")
+        else:
+            save_manifest(db_path, manifest)
+            return True
 
-        # Save the FAISS vectorstore
-        faiss_db.save_local(FAISS_DB_PATH)
-        st.success(f"📦 Vector DB saved at `{FAISS_DB_PATH}`")
+        # Save the FAISS vectorstore (atomically, bumping its version), then the manifest
+        with span("ingest_save"):
+            if index_params:
+                save_vectorstore(faiss_db, db_path, index=index_params, embedding_model=EMBEDDING_MODEL_NAME)
+            else:
+                save_vectorstore(faiss_db, db_path, embedding_model=EMBEDDING_MODEL_NAME)
+            save_manifest(db_path, manifest)
+        st.success(f"📦 Vector DB saved at `{db_path}`")
 
         return True
 
@@ -80,6 +254,59 @@ def build_or_update_vector_db(txt_path=None):
         return False
 
 
+# Rebuild the FAISS index from stored vectors only (no embedding calls),
+# e.g. after changing FAISS_INDEX_TYPE or its parameters
+def rebuild_vector_db(namespace=None):
+    try:
+        db_path = namespace_path(FAISS_DB_PATH, namespace)
+        index_file = os.path.join(db_path, "index.faiss")
+        if not os.path.exists(index_file):
+            st.error("❌ No vector DB to rebuild. Run the embedding pipeline first.")
+            return False
+
+        embeddings = get_embedding_model(offline=True)
+        old_db = load_vectorstore(db_path, embeddings, mmap=False, embedding_model=EMBEDDING_MODEL_NAME)
+        ids = list(old_db.index_to_docstore_id.values())
+        docs = [old_db.docstore.search(doc_id) for doc_id in ids]
+        if not docs:
+            st.error("❌ Vector DB is empty, nothing to rebuild.")
+            return False
+
+        st.info(f"🧱 Rebuilding {FAISS_INDEX_TYPE} index from {len(docs)} stored embeddings (offline)...")
+        faiss_db, index_params = create_vectorstore(docs, ids, embeddings)
+        save_vectorstore(faiss_db, db_path, index=index_params, embedding_model=EMBEDDING_MODEL_NAME)
+        st.success(f"📦 Vector DB rebuilt at `{db_path}` ({index_params})")
+        return True
+
+    except Exception as e:
+        st.error(f"❌ Rebuild failed: {e}")
+        return False
+
+
+# Share one embedding run between deployments
+def export_embeddings(out_path):
+    count = get_embedding_store().export(out_path, EMBEDDING_MODEL_NAME)
+    print(f"[✅] Exported {count} embeddings to {out_path}")
+
+
+def import_embeddings(in_path):
+    model, added = get_embedding_store().import_(in_path)
+    print(f"[✅] Imported {added} new embeddings for {model}")
+
+
 # Run if executed directly
 if __name__ == "__main__":
-    build_or_update_vector_db()
+    parser = argparse.ArgumentParser(description="Build and maintain the FAISS vector DB")
+    parser.add_argument("command", nargs="?", default="build", choices=["build", "rebuild", "export", "import"])
+    parser.add_argument("path", nargs="?", help="Text file for build, .npz file for export/import")
+    parser.add_argument("--namespace", help="Tenant / site id: build or rebuild vectorstore/<namespace>")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        rebuild_vector_db(args.namespace)
+    elif args.command == "export":
+        export_embeddings(args.path or "embeddings.npz")
+    elif args.command == "import":
+        import_embeddings(args.path or "embeddings.npz")
+    else:
+        build_or_update_vector_db(args.path, namespace=args.namespace)